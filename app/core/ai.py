@@ -1,22 +1,33 @@
 import pandas as pd
-from .io_pipeline import fetch_data
+from . import disk_cache, incremental, io_pipeline
+from .instrumentation import timed
 
+@timed()
+@disk_cache.cached(io_pipeline.data_version)
 def predict_sales_trend():
-    df = fetch_data()
-    df.columns = df.columns.str.lower()
+    # Mean/median come from the incrementally maintained aggregates, not a table scan
+    conn = io_pipeline.connect()
+    try:
+        return _predict_sales_trend(conn)
+    finally:
+        conn.close()
+
+
+def _predict_sales_trend(conn):
+    measures = incremental.measures(conn)
 
     # Case 1: dataset has 'quantity'
-    if "quantity" in df.columns:
-        avg_sales = df["quantity"].mean()
+    if "quantity" in measures:
+        avg_sales = incremental.column_stats(conn, "quantity")["mean"]
         if avg_sales > 50:
             return "📈 Sales trend is UP (high average quantity sold)."
         else:
             return "📉 Sales trend is DOWN (low average quantity sold)."
 
     # Case 2: dataset has 'sales'
-    elif "sales" in df.columns:
-        avg_sales = df["sales"].mean()
-        if avg_sales > df["sales"].median():
+    elif "sales" in measures:
+        avg_sales = incremental.column_stats(conn, "sales")["mean"]
+        if avg_sales > incremental.median(conn, "sales"):
             return "📈 Sales trend is UP (above median sales)."
         else:
             return "📉 Sales trend is DOWN (below median sales)."
@@ -1,16 +1,79 @@
 import pandas as pd
 import matplotlib.pyplot as plt
+from . import disk_cache, incremental, io_pipeline, out_of_core, time_index
 from .io_pipeline import fetch_data
+from .instrumentation import timed
 
-def sales_summary():
-    df = fetch_data()
-    df.columns = df.columns.str.lower()
+@timed()
+@disk_cache.cached(io_pipeline.data_version)
+def sales_summary(chunksize=None):
+    """Totals per region; with `chunksize`, scans the table in chunks instead of loading it."""
+    if chunksize:
+        return _sales_summary_chunked(chunksize)
+
+    conn = io_pipeline.connect()
+    try:
+        summary = _sales_summary_materialized(conn)
+    finally:
+        conn.close()
+    if summary is not None:
+        return summary
+
+    return summarize_frame(fetch_data())
+
+
+def summarize_frame(df):
+    """Totals per region of a loaded sales table (the pandas path of `sales_summary`)."""
+    df = df.rename(columns=str.lower)
 
     # Handle different possible column sets
     if {"quantity", "price"}.issubset(df.columns):
-        summary = df.groupby("region")[["quantity", "price"]].sum()
+        summary = df.groupby("region", observed=True)[["quantity", "price"]].sum()
     elif {"sales"}.issubset(df.columns):
-        summary = df.groupby("region", as_index=False)["sales"].sum()
+        summary = df.groupby("region", as_index=False, observed=True)["sales"].sum()
+        summary.rename(columns={"sales": "total_sales"}, inplace=True)
+    else:
+        summary = pd.DataFrame({"error": ["Expected columns not found in dataset"]})
+
+    return summary
+
+
+@timed()
+def period_summary(measure="sales", asof=None):
+    """MTD/QTD/YTD and rolling totals of a measure with year-over-year change, from the calendar index."""
+    index = time_index.for_sales_db()
+    if index is None or measure not in index.measures:
+        return pd.DataFrame({"error": [f"No dated '{measure}' column in dataset"]})
+    periods = index.periods(measure, asof)
+    return pd.DataFrame.from_dict(periods, orient="index").rename_axis("period").reset_index()
+
+
+def _sales_summary_materialized(conn):
+    """Same result as the pandas path, read from the incrementally maintained aggregates."""
+    dims, measures = incremental.layout(conn)
+    if "region" not in dims:
+        return None
+    if {"quantity", "price"}.issubset(measures):
+        return incremental.summary(conn, "region", ["quantity", "price"]).set_index("region")
+    if "sales" in measures:
+        summary = incremental.summary(conn, "region", ["sales"])
+        return summary.rename(columns={"sales": "total_sales"})
+    return None
+
+
+def _sales_summary_chunked(chunksize):
+    io_pipeline.init_db()
+    chunks = (
+        c.rename(columns=str.lower)
+        for c in out_of_core.scan_sqlite(io_pipeline.DB_PATH, chunksize=chunksize)
+    )
+    first, chunks = out_of_core.peek(chunks)
+    columns = set(first.columns) if first is not None else set()
+
+    if {"quantity", "price"}.issubset(columns):
+        summary = out_of_core.groupby_agg(chunks, "region", ["quantity", "price"])
+    elif {"sales"}.issubset(columns):
+        summary = out_of_core.groupby_agg(chunks, "region", "sales").reset_index()
         summary.rename(columns={"sales": "total_sales"}, inplace=True)
     else:
         summary = pd.DataFrame({"error": ["Expected columns not found in dataset"]})
@@ -19,18 +82,17 @@ def sales_summary():
 
 
 def visualize_sales():
-    df = fetch_data()
-    df.columns = df.columns.str.lower()
+    df = fetch_data().rename(columns=str.lower)
 
     if {"region", "sales"}.issubset(df.columns):
-        sales_by_region = df.groupby("region")["sales"].sum()
+        sales_by_region = df.groupby("region", observed=True)["sales"].sum()
         sales_by_region.plot(kind="bar", title="Sales by Region")
         plt.xlabel("Region")
         plt.ylabel("Total Sales")
         plt.tight_layout()
         plt.show()
     elif {"region", "quantity"}.issubset(df.columns):
-        sales_by_region = df.groupby("region")["quantity"].sum()
+        sales_by_region = df.groupby("region", observed=True)["quantity"].sum()
         sales_by_region.plot(kind="bar", title="Quantity Sold by Region")
         plt.xlabel("Region")
         plt.ylabel("Total Quantity")
@@ -0,0 +1,551 @@
+"""Local JSON API over the analytics and the trained model.
+
+Run from the `app` directory:
+
+    python -m core.api_server --port 6020
+
+Endpoints (GET unless noted):
+
+    /health, /metrics                     liveness, Prometheus counters
+    /summary                              totals per region (`analysis.sales_summary`)
+    /trend                                `ai.predict_sales_trend`
+    /kpis?measure=&start=&end=&region=&product=
+                                          filtered total/count/mean from the calendar index
+    /periods?measure=&asof=               MTD/QTD/YTD/rolling totals with YoY
+    /report?by=region,product&format=csv  aggregate report (streamed)
+    /report?format=pdf                    the PDF of `export.export_report`
+    /rows?region=&product=&start=&end=&limit=
+                                          raw sales rows as NDJSON (streamed)
+    POST /predict {"rows": [{feature: value, ...}, ...]}
+                                          batch predictions from the model bundle
+
+Multi-value filters are comma separated. Responses are cached in memory per
+(request, data version), identical concurrent requests are computed once,
+and SQLite reads go through a small connection pool. Work runs on a thread
+pool so the event loop only parses requests and writes responses. A streamed
+response that fails after its headers went out is logged and its connection
+dropped without the final chunk, so clients see it as incomplete.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from . import ai, analysis, incremental, inference, io_pipeline, time_index
+from .instrumentation import export_prometheus, incr, record
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+DEFAULT_PORT = 6020
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "trained_ai_model.pkl")
+POOL_SIZE = 8
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Larger bodies are sent with chunked transfer encoding and never cached
+STREAM_ROWS = 10_000
+MAX_BODY_BYTES = 64 * 1024 * 1024
+MAX_HEADER_LINES = 100
+
+_pool = []
+_pool_lock = threading.Lock()
+_version_lock = threading.Lock()
+_version = (None, None)
+_cache = OrderedDict()
+_cache_bytes = 0
+_inflight = {}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Response:
+    def __init__(self, body=b"", status=200, content_type="application/json", chunks=None):
+        self.body = body
+        self.status = status
+        self.content_type = content_type
+        # Iterator of byte strings for a streamed body
+        self.chunks = chunks
+
+
+def _json(obj, status=200):
+    return Response(json.dumps(obj, default=str).encode(), status)
+
+
+def _frame(df):
+    return Response(df.to_json(orient="records", date_format="iso").encode())
+
+
+# ---------------- SQLite connection pool ----------------
+def _checkout():
+    with _pool_lock:
+        if _pool:
+            return _pool.pop()
+    io_pipeline.init_db()
+    return sqlite3.connect(io_pipeline.DB_PATH, timeout=10, check_same_thread=False)
+
+
+def _checkin(conn):
+    with _pool_lock:
+        if len(_pool) < POOL_SIZE:
+            _pool.append(conn)
+            return
+    conn.close()
+
+
+def _stamp():
+    stamp = []
+    for path in (io_pipeline.DB_PATH, io_pipeline.DB_PATH + "-wal"):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def data_version():
+    """Sales table version, re-read only when the database files change on disk."""
+    global _version
+    stamp = _stamp()
+    with _version_lock:
+        if _version[0] == stamp:
+            return _version[1]
+        conn = _checkout()
+        try:
+            version = incremental.data_version(conn)
+        finally:
+            _checkin(conn)
+        # refresh() may itself write, so stamp the files after it ran
+        _version = (_stamp(), version)
+        return version
+
+
+def model_version():
+    try:
+        return os.path.getmtime(MODEL_PATH)
+    except FileNotFoundError:
+        raise ApiError(404, "No trained model; train one on the AI Copilot page.")
+
+
+# ---------------- Handlers ----------------
+def _param(query, name, default=None):
+    values = query.get(name)
+    return values[-1] if values else default
+
+
+def _list_param(query, name):
+    values = [v for raw in query.get(name, []) for v in raw.split(",") if v]
+    return values or None
+
+
+def _filters(query, columns):
+    return {c: vals for c in columns if (vals := _list_param(query, c))}
+
+
+def health(query, body):
+    return _json({"status": "ok"})
+
+
+def metrics(query, body):
+    return Response(export_prometheus().encode(), content_type="text/plain; version=0.0.4")
+
+
+def summary(query, body):
+    return _frame(analysis.sales_summary())
+
+
+def trend(query, body):
+    return _json({"trend": ai.predict_sales_trend()})
+
+
+def kpis(query, body):
+    index = time_index.for_sales_db()
+    measure = _param(query, "measure", "sales")
+    if index is None or measure not in index.measures:
+        raise ApiError(404, f"No dated '{measure}' column in the sales table.")
+    start = pd.Timestamp(_param(query, "start", index.first_day))
+    end = pd.Timestamp(_param(query, "end", index.last_day))
+    filters = _filters(query, time_index.GROUP_COLUMNS)
+    unsupported = index.unsupported(filters)
+    if unsupported:
+        raise ApiError(400, f"Cannot filter on {', '.join(unsupported)}: the calendar index groups by "
+                            f"{', '.join(index.groups.columns) or 'nothing'} only.")
+    total = index.total(measure, start, end, filters)
+    rows = index.total(None, start, end, filters)
+    return _json({
+        "measure": measure, "start": start.date().isoformat(), "end": end.date().isoformat(),
+        "filters": filters, "total": total, "rows": int(rows), "mean": total / rows if rows else None,
+    })
+
+
+def periods(query, body):
+    out = analysis.period_summary(_param(query, "measure", "sales"), _param(query, "asof"))
+    if "error" in out.columns:
+        raise ApiError(404, out["error"].iloc[0])
+    return _frame(out)
+
+
+def _csv_chunks(df):
+    yield df.iloc[:0].to_csv(index=False).encode()
+    for start in range(0, len(df), STREAM_ROWS):
+        yield df.iloc[start:start + STREAM_ROWS].to_csv(index=False, header=False).encode()
+
+
+def _json_array_chunks(df):
+    yield b"["
+    for start in range(0, len(df), STREAM_ROWS):
+        part = df.iloc[start:start + STREAM_ROWS].to_json(orient="records", date_format="iso")
+        yield (b"," if start else b"") + part[1:-1].encode()
+    yield b"]"
+
+
+def _pdf_report():
+    try:
+        from .export import export_report
+    except ImportError:
+        raise ApiError(503, "PDF reports need the fpdf package.")
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        export_report(path)
+        with open(path, "rb") as f:
+            return Response(f.read(), content_type="application/pdf")
+    finally:
+        os.remove(path)
+
+
+def report(query, body):
+    if _param(query, "format", "json") == "pdf":
+        return _pdf_report()
+    conn = _checkout()
+    try:
+        dims, measures = incremental.layout(conn)
+        by = _list_param(query, "by") or dims[:1]
+        unknown = [b for b in by if b not in dims]
+        if unknown:
+            raise ApiError(400, f"Cannot group by {', '.join(unknown)}; choose from {', '.join(dims)}.")
+        out = incremental.summary(conn, by, measures)
+    finally:
+        _checkin(conn)
+    if _param(query, "format", "json") == "csv":
+        if len(out) <= STREAM_ROWS:
+            return Response(out.to_csv(index=False).encode(), content_type="text/csv")
+        return Response(content_type="text/csv", chunks=_csv_chunks(out))
+    if len(out) <= STREAM_ROWS:
+        return _frame(out)
+    return Response(chunks=_json_array_chunks(out))
+
+
+def rows(query, body):
+    conn = _checkout()
+    try:
+        cols = {r[1].lower(): r[1] for r in conn.execute('PRAGMA table_info("sales")')}
+    finally:
+        _checkin(conn)
+    where, params = [], []
+    for name in ("region", "product"):
+        values = _list_param(query, name)
+        if values and name in cols:
+            where.append(f'"{cols[name]}" IN ({", ".join("?" * len(values))})')
+            params += values
+    if "date" in cols:
+        for name, op in (("start", ">="), ("end", "<=")):
+            value = _param(query, name)
+            if value:
+                where.append(f'date("{cols["date"]}") {op} date(?)')
+                params.append(value)
+    limit = int(_param(query, "limit", -1))
+    sql = "SELECT * FROM sales" + (" WHERE " + " AND ".join(where) if where else "") + " LIMIT ?"
+    conn = _checkout()
+    try:
+        cursor = conn.execute(sql, params + [limit])
+    except Exception:
+        _checkin(conn)
+        raise
+
+    def chunks():
+        try:
+            names = [d[0] for d in cursor.description]
+            while True:
+                batch = cursor.fetchmany(STREAM_ROWS)
+                if not batch:
+                    break
+                incr("api.rows_streamed", len(batch))
+                yield "".join(json.dumps(dict(zip(names, r))) + "\n" for r in batch).encode()
+        finally:
+            cursor.close()
+            _checkin(conn)
+    return Response(content_type="application/x-ndjson", chunks=chunks())
+
+
+def predict(query, body):
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise ApiError(400, "Body must be JSON.")
+    if "rows" in payload:
+        df = pd.DataFrame.from_records(payload["rows"])
+    elif "columns" in payload and "data" in payload:
+        df = pd.DataFrame(payload["data"], columns=payload["columns"])
+    else:
+        raise ApiError(400, 'Expected {"rows": [...]} or {"columns": [...], "data": [[...]]}.')
+    try:
+        model = inference.load(MODEL_PATH)
+    except FileNotFoundError:
+        raise ApiError(404, "No trained model; train one on the AI Copilot page.")
+    except inference.StaleArtifact as e:
+        raise ApiError(503, str(e))
+    # One-hot features (`Col_Value`) are derived from a `Col` column and may be absent
+    missing = [c for c in model.feature_columns
+               if c not in df.columns and not any(c.startswith(f"{col}_") for col in df.columns)]
+    if missing:
+        raise ApiError(400, f"Missing feature columns: {', '.join(missing)}")
+    preds = model.predict(model.feature_matrix(df)).astype(np.float64)
+    incr("api.predictions", len(preds))
+    head = f'{{"target": {json.dumps(model.target_col)}, "predictions": '
+    if len(preds) <= STREAM_ROWS:
+        return Response(f"{head}{json.dumps(preds.tolist())}}}".encode())
+
+    def chunks():
+        yield head.encode() + b"["
+        for start in range(0, len(preds), STREAM_ROWS):
+            part = json.dumps(preds[start:start + STREAM_ROWS].tolist())[1:-1]
+            yield (b"," if start else b"") + part.encode()
+        yield b"]}"
+    return Response(chunks=chunks())
+
+
+# (method, path): (handler, version function or None when the response must not be cached)
+ROUTES = {
+    ("GET", "/health"): (health, None),
+    ("GET", "/metrics"): (metrics, None),
+    ("GET", "/summary"): (summary, data_version),
+    ("GET", "/trend"): (trend, data_version),
+    ("GET", "/kpis"): (kpis, data_version),
+    ("GET", "/periods"): (periods, data_version),
+    ("GET", "/report"): (report, data_version),
+    ("GET", "/rows"): (rows, None),
+    ("POST", "/predict"): (predict, model_version),
+}
+
+
+# ---------------- Response cache ----------------
+def _cache_get(key):
+    response = _cache.get(key)
+    if response is not None:
+        _cache.move_to_end(key)
+    return response
+
+
+def _cache_put(key, response):
+    global _cache_bytes
+    if response.chunks is not None or response.status != 200 or len(response.body) > CACHE_MAX_BYTES // 16:
+        return
+    _cache[key] = response
+    _cache_bytes += len(response.body)
+    while _cache_bytes > CACHE_MAX_BYTES:
+        _, old = _cache.popitem(last=False)
+        _cache_bytes -= len(old.body)
+
+
+def clear_cache():
+    global _cache_bytes
+    _cache.clear()
+    _cache_bytes = 0
+
+
+async def dispatch(method, target, body, executor):
+    """Route one request; cached and in-flight results are shared between identical requests."""
+    loop = asyncio.get_running_loop()
+    url = urlsplit(target)
+    path = url.path.rstrip("/") or "/"
+    route = ROUTES.get((method, path))
+    if route is None:
+        known = any(p == path for _, p in ROUTES)
+        raise ApiError(405 if known else 404, f"No route for {method} {path}")
+    handler, version_of = route
+    query = parse_qs(url.query)
+    if version_of is None:
+        return await loop.run_in_executor(executor, handler, query, body)
+
+    version = await loop.run_in_executor(executor, version_of)
+    key = (method, path, tuple(sorted((k, tuple(v)) for k, v in query.items())),
+           hashlib.sha1(body).hexdigest() if body else None, version)
+    response = _cache_get(key)
+    if response is not None:
+        incr("api.cache_hits")
+        return response
+    future = _inflight.get(key)
+    if future is not None:
+        incr("api.coalesced")
+        return await asyncio.shield(future)
+    future = loop.run_in_executor(executor, handler, query, body)
+    _inflight[key] = future
+    try:
+        response = await future
+    finally:
+        _inflight.pop(key, None)
+    _cache_put(key, response)
+    return response
+
+
+# ---------------- HTTP/1.1 ----------------
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise ApiError(400, "Malformed request line")
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0) or 0)
+    if length > MAX_BODY_BYTES:
+        raise ApiError(413, f"Body larger than {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b""
+    keep_alive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+    return method.upper(), target, body, keep_alive
+
+
+def _head(response, keep_alive, chunked):
+    lines = [
+        f"HTTP/1.1 {response.status} {_REASONS.get(response.status, 'Unknown')}",
+        f"Content-Type: {response.content_type}",
+        "Transfer-Encoding: chunked" if chunked else f"Content-Length: {len(response.body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+class StreamAborted(Exception):
+    """A streamed response failed after its 200 headers were sent."""
+
+
+async def _write(writer, response, keep_alive, executor):
+    if response.chunks is None:
+        writer.write(_head(response, keep_alive, False) + response.body)
+        await writer.drain()
+        return
+    loop = asyncio.get_running_loop()
+    writer.write(_head(response, keep_alive, True))
+    chunks = iter(response.chunks)
+    try:
+        while True:
+            # Chunks are produced off the event loop (they may read SQLite or serialise)
+            try:
+                chunk = await loop.run_in_executor(executor, next, chunks, None)
+            except Exception as e:
+                incr("api.stream_errors")
+                print(f"❌ Streamed response aborted: {type(e).__name__}: {e}", file=sys.stderr)
+                # Too late for an error status; without the last chunk the client knows the body is cut short
+                writer.transport.abort()
+                raise StreamAborted() from e
+            if chunk is None:
+                break
+            if chunk:
+                writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                await writer.drain()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            await loop.run_in_executor(executor, close)
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+def _error_response(e):
+    if isinstance(e, ApiError):
+        return _json({"error": str(e)}, e.status)
+    if isinstance(e, (ValueError, KeyError, TypeError)):
+        return _json({"error": f"{type(e).__name__}: {e}"}, 400)
+    incr("api.errors")
+    return _json({"error": f"{type(e).__name__}: {e}"}, 500)
+
+
+async def _handle(reader, writer, executor):
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except ApiError as e:
+                await _write(writer, _error_response(e), False, executor)
+                break
+            if request is None:
+                break
+            method, target, body, keep_alive = request
+            start = time.perf_counter()
+            try:
+                response = await dispatch(method, target, body, executor)
+            except Exception as e:
+                response = _error_response(e)
+            incr(f"api.status_{response.status}")
+            await _write(writer, response, keep_alive, executor)
+            record(f"api.{urlsplit(target).path.strip('/') or 'root'}", time.perf_counter() - start)
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, StreamAborted):
+        pass
+    finally:
+        writer.close()
+
+
+async def _serve(host, port, workers):
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+    server = await asyncio.start_server(
+        lambda r, w: _handle(r, w, executor), host, port, reuse_address=True, backlog=1024
+    )
+    print(f"✅ API server listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        with _pool_lock:
+            for conn in _pool:
+                conn.close()
+            _pool.clear()
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, workers=None):
+    if uvloop is not None:
+        uvloop.install()
+    asyncio.run(_serve(host, port, workers or min(32, (os.cpu_count() or 1) + 4)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regional sales JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--model", default=MODEL_PATH, help="trained model bundle for /predict")
+    args = parser.parse_args()
+    MODEL_PATH = args.model
+    io_pipeline.migrate()
+    serve(args.host, args.port, args.workers)
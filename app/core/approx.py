@@ -0,0 +1,179 @@
+"""Approximate answers for large uploads, built once at ingestion.
+
+Per dataset we keep a stratified sample per (Region, Product), quantile
+sketches for the numeric measures and HyperLogLog distinct counts, so the
+dashboard can render KPIs and distributions with error bounds right away
+while exact results are computed in the background.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from . import dataset_store
+from .compute_tasks import TASKS, apply_filters, filter_mask
+from .instrumentation import incr, timed
+from .sketches import HyperLogLog, QuantileSketch, StratifiedReservoir
+
+APPROX_MIN_ROWS = 500_000
+SAMPLE_PER_STRATUM = 1_000
+STRATA = ["Region", "Product"]
+SKETCH_COLUMNS = ["Revenue", "Pipeline", "RevenueGoal", "Units_Sold", "quantity", "Quantity"]
+INGEST_CHUNKSIZE = 500_000
+# Exact results kept per process (one per dataset, task and filter combination)
+EXACT_CACHE = 64
+# Two-sided 95% normal quantile for the error bounds
+Z_95 = 1.96
+
+_lock = threading.Lock()
+_summaries = {}
+_exact = OrderedDict()
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="approx-exact")
+
+
+class ApproxSummary:
+    def __init__(self, columns):
+        self.strata = [c for c in STRATA if c in columns]
+        self.sketch_columns = [c for c in SKETCH_COLUMNS if c in columns]
+        self.reservoir = StratifiedReservoir(self.strata, k=SAMPLE_PER_STRATUM) if self.strata else None
+        self.sketches = {}
+        self.distinct = {}
+        self.rows = 0
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        if self.reservoir is not None:
+            self.reservoir.update(chunk)
+        keys = chunk.groupby(self.strata, observed=True, sort=False) if self.strata else [((), chunk)]
+        for key, part in keys:
+            key = key if isinstance(key, tuple) else (key,)
+            for col in self.sketch_columns:
+                self.sketches.setdefault((key, col), QuantileSketch()).update(part[col].to_numpy())
+        for col in chunk.columns:
+            if chunk[col].dtype == object or isinstance(chunk[col].dtype, pd.CategoricalDtype):
+                self.distinct.setdefault(col, HyperLogLog()).update(chunk[col].to_numpy())
+        return self
+
+    def _selected_strata(self, filters):
+        counts = self.reservoir.counts
+        mask = np.ones(len(counts), dtype=bool)
+        for i, col in enumerate(self.strata):
+            if filters and col in filters:
+                level = counts.index.get_level_values(i) if counts.index.nlevels > 1 else counts.index
+                mask &= level.isin(filters[col])
+        return counts[mask]
+
+    def sums(self, columns, filters=None):
+        """Estimated column sums with 95% error bounds: {col: (estimate, half_width)}."""
+        if self.reservoir is None:
+            return {}
+        counts = self._selected_strata(filters)
+        sample = self.reservoir.sample
+        other = {c: v for c, v in (filters or {}).items() if c not in self.strata}
+        passed = filter_mask(sample, other)
+        keys = [sample[c] for c in self.strata]
+        out = {}
+        for col in columns:
+            if col not in sample.columns:
+                continue
+            # Stratified estimator; rows failing non-strata filters count as 0
+            y = pd.Series(np.where(passed, sample[col].to_numpy(dtype=float), 0.0), index=sample.index)
+            stats = y.groupby(keys, observed=True).agg(["sum", "var", "count"]).reindex(counts.index)
+            stats = stats.dropna(subset=["count"])
+            n_stratum = counts.loc[stats.index].to_numpy(dtype=float)
+            n = stats["count"].to_numpy(dtype=float)
+            total = float(np.sum(n_stratum / n * stats["sum"].to_numpy()))
+            variance = np.nansum(n_stratum ** 2 * (1 - n / n_stratum) * stats["var"].to_numpy() / n)
+            out[col] = (total, Z_95 * float(np.sqrt(variance)))
+        return out
+
+    def quantiles(self, column, qs=(0.0, 0.25, 0.5, 0.75, 1.0), filters=None):
+        """Approximate quantiles; sketches when only strata are filtered, else the sample."""
+        other_filters = {c: v for c, v in (filters or {}).items() if c not in self.strata}
+        if not other_filters:
+            merged = QuantileSketch()
+            selected = set(self._selected_strata(filters).index) if self.reservoir is not None else None
+            for (key, col), sketch in self.sketches.items():
+                lookup = key if len(key) > 1 else key[0] if key else None
+                if col == column and (selected is None or lookup in selected):
+                    merged.merge(sketch)
+            return merged.quantiles(qs), merged.rank_error()
+        sample = self.reservoir.sample
+        # Each sampled row stands for stratum_count / stratum_sample_size rows
+        keys = [sample[c] for c in self.strata]
+        sampled = sample.groupby(keys, observed=True)[self.strata[0]].transform("size").to_numpy(dtype=float)
+        stratum = pd.MultiIndex.from_frame(sample[self.strata]) if len(self.strata) > 1 else pd.Index(sample[self.strata[0]])
+        counts = self.reservoir.counts.reindex(stratum).to_numpy(dtype=float)
+        passed = filter_mask(sample, filters)
+        values = sample[column].to_numpy(dtype=float)
+        keep = passed & ~np.isnan(values)
+        if not keep.any():
+            return [float("nan")] * len(qs), 1.0
+        return weighted_quantiles(values[keep], (counts / sampled)[keep], qs), 1.0 / np.sqrt(keep.sum())
+
+    def distinct_counts(self):
+        return {col: hll.count() for col, hll in self.distinct.items()}
+
+
+def weighted_quantiles(values, weights, qs):
+    """Inverse of the weighted empirical CDF at each of `qs`."""
+    order = np.argsort(values, kind="stable")
+    values, weights = values[order], weights[order]
+    cumulative = np.cumsum(weights)
+    targets = np.asarray(qs, dtype=float) * cumulative[-1]
+    positions = np.minimum(np.searchsorted(cumulative, targets, side="left"), len(values) - 1)
+    return values[positions].tolist()
+
+
+@timed("approx.build")
+def build(df, chunksize=INGEST_CHUNKSIZE):
+    """Build (or reuse) the approximate summary of a stored dataset."""
+    key = dataset_store.key_of(df) or dataset_store.dataset_hash(df)
+    with _lock:
+        if key in _summaries:
+            incr("approx.cache_hits")
+            return _summaries[key]
+    summary = ApproxSummary(df.columns)
+    for start in range(0, len(df), chunksize):
+        summary.update(df.iloc[start:start + chunksize])
+    with _lock:
+        _summaries[key] = summary
+        _prune()
+    return summary
+
+
+def _prune():
+    """Forget summaries and exact results of datasets evicted from the store."""
+    for k in [k for k in _summaries if dataset_store.get(k) is None]:
+        del _summaries[k]
+    for k in [k for k, f in _exact.items() if f.done() and dataset_store.get(k[0]) is None]:
+        del _exact[k]
+
+
+def get(df):
+    key = dataset_store.key_of(df)
+    with _lock:
+        return _summaries.get(key) if key else None
+
+
+def exact(df, task, **kwargs):
+    """Future for the exact result of a compute task, started once per (dataset, task, args).
+
+    The most recently used `EXACT_CACHE` futures are kept; older ones are
+    dropped, and cancelled if they have not started yet.
+    """
+    key = dataset_store.key_of(df) or dataset_store.dataset_hash(df)
+    cache_key = (key, task, repr(sorted(kwargs.items(), key=lambda kv: kv[0])))
+    with _lock:
+        future = _exact.get(cache_key)
+        if future is None:
+            future = _executor.submit(TASKS[task], df, **kwargs)
+            _exact[cache_key] = future
+            while len(_exact) > EXACT_CACHE:
+                _, old = _exact.popitem(last=False)
+                old.cancel()
+        else:
+            _exact.move_to_end(cache_key)
+    return future
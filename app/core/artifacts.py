@@ -0,0 +1,272 @@
+"""Content-addressed store for generated charts, reports and exports.
+
+Each artifact is a (user, name) entry in a small SQLite index pointing at a
+blob named by the SHA-256 of its content, so identical files saved by many
+users or many times are kept once. Blobs are zlib-compressed when that saves
+space (CSV, JSON, PDF text; not PNG). Users have a byte quota and the whole
+store a size cap; the least recently used artifacts are evicted first and
+blobs no artifact points at are deleted. Reads are streamed in chunks and
+can start at any byte offset, so downloads never need the whole file twice.
+"""
+import contextlib
+import hashlib
+import mimetypes
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from .instrumentation import incr, timed
+
+STORE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "artifacts")
+MAX_BYTES = 1024 * 1024 * 1024
+USER_QUOTA_BYTES = 100 * 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+# Compressed blobs are kept only if they are at most this fraction of the original
+MIN_SAVING = 0.9
+# Namespace of artifacts visible to everyone. Empty, so no signup can claim it
+SHARED_USER = ""
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def _conn():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(STORE_DIR, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(STORE_DIR, "index.db"), timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs (hash TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+            "stored_size INTEGER NOT NULL, codec TEXT NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts (user TEXT NOT NULL, name TEXT NOT NULL, "
+            "hash TEXT NOT NULL REFERENCES blobs(hash), content_type TEXT, created REAL NOT NULL, "
+            "accessed REAL NOT NULL, source_mtime REAL, PRIMARY KEY (user, name))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS artifacts_hash ON artifacts (hash)")
+        conn.execute("CREATE INDEX IF NOT EXISTS artifacts_accessed ON artifacts (accessed)")
+        _local.conn = conn
+    return conn
+
+
+def _blob_path(digest):
+    return os.path.join(STORE_DIR, "blobs", digest[:2], digest)
+
+
+def _write_blob(digest, data, compress):
+    """Write the blob file (again if it went missing); returns (stored size, codec)."""
+    path = _blob_path(digest)
+    codec, payload = "raw", data
+    if compress is not False and len(data) > 1024:
+        packed = zlib.compress(data, 6)
+        if compress or len(packed) <= MIN_SAVING * len(data):
+            codec, payload = "zlib", packed
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        f.write(payload)
+    os.replace(path + ".tmp", path)
+    return len(payload), codec
+
+
+@timed("artifacts.put")
+def put(user, name, data, content_type=None, compress=None, source_mtime=None):
+    """Save bytes as `name` in `user`'s namespace (replacing an older version).
+
+    `compress` None compresses when it pays off; True/False force it.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    content_type = content_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+    now = time.time()
+    conn = _conn()
+    # IMMEDIATE takes SQLite's write lock up front, so other processes' puts and
+    # garbage collection can't remove the blob between the check and the insert
+    with _write_lock, _transaction(conn):
+        row = conn.execute("SELECT hash FROM artifacts WHERE user = ? AND name = ?", (user, name)).fetchone()
+        if row and row[0] == digest:
+            conn.execute("UPDATE artifacts SET accessed = ?, source_mtime = ? WHERE user = ? AND name = ?",
+                         (now, source_mtime, user, name))
+            incr("artifacts.unchanged")
+        else:
+            known = conn.execute("SELECT codec FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            if known and os.path.exists(_blob_path(digest)):
+                incr("artifacts.dedup_hits")
+            else:
+                stored, codec = _write_blob(digest, data, compress if not known else known[0] == "zlib")
+                conn.execute(
+                    "INSERT INTO blobs (hash, size, stored_size, codec) VALUES (?, ?, ?, ?) ON CONFLICT(hash) "
+                    "DO UPDATE SET stored_size = excluded.stored_size, codec = excluded.codec",
+                    (digest, len(data), stored, codec),
+                )
+                incr("artifacts.bytes_written", stored)
+            conn.execute(
+                "INSERT INTO artifacts (user, name, hash, content_type, created, accessed, source_mtime) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(user, name) DO UPDATE SET hash = excluded.hash, "
+                "content_type = excluded.content_type, created = excluded.created, accessed = excluded.accessed, "
+                "source_mtime = excluded.source_mtime",
+                (user, name, digest, content_type, now, now, source_mtime),
+            )
+            _enforce_quotas(conn, user, keep=name)
+    return info(user, name)
+
+
+@contextlib.contextmanager
+def _transaction(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def put_figure(user, name, fig, fmt="png"):
+    """Save a matplotlib figure without writing it to a working directory first."""
+    import io
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, bbox_inches="tight")
+    return put(user, name, buf.getvalue())
+
+
+_INFO_SQL = (
+    "SELECT a.user, a.name, a.hash, a.content_type, b.size, b.stored_size, b.codec, a.created, a.accessed, "
+    "a.source_mtime FROM artifacts a JOIN blobs b ON a.hash = b.hash"
+)
+_INFO_KEYS = ("user", "name", "hash", "content_type", "size", "stored_size", "codec", "created", "accessed",
+              "source_mtime")
+
+
+def info(user, name):
+    row = _conn().execute(_INFO_SQL + " WHERE a.user = ? AND a.name = ?", (user, name)).fetchone()
+    return dict(zip(_INFO_KEYS, row)) if row else None
+
+
+def list_artifacts(user):
+    """Artifacts of a user, newest first."""
+    rows = _conn().execute(_INFO_SQL + " WHERE a.user = ? ORDER BY a.created DESC", (user,)).fetchall()
+    return [dict(zip(_INFO_KEYS, r)) for r in rows]
+
+
+def iter_chunks(user, name, start=0, end=None, chunk_size=CHUNK_SIZE):
+    """Stream bytes start..end (exclusive) of an artifact."""
+    meta = info(user, name)
+    if meta is None:
+        raise KeyError(f"No artifact {name!r} for {user!r}")
+    _conn().execute("UPDATE artifacts SET accessed = ? WHERE user = ? AND name = ?", (time.time(), user, name))
+    end = meta["size"] if end is None else min(end, meta["size"])
+    pos = 0
+    with open(_blob_path(meta["hash"]), "rb") as f:
+        if meta["codec"] == "raw":
+            f.seek(start)
+            pos = start
+            while pos < end:
+                chunk = f.read(min(chunk_size, end - pos))
+                if not chunk:
+                    break
+                pos += len(chunk)
+                incr("artifacts.bytes_read", len(chunk))
+                yield chunk
+            return
+        # Compressed: decompress from the start, skipping bytes before `start`
+        inflate = zlib.decompressobj()
+        while pos < end and not inflate.eof:
+            raw = inflate.unconsumed_tail or f.read(chunk_size)
+            if not raw:
+                break
+            # Bounded output per step, whatever the compression ratio
+            data = inflate.decompress(raw, chunk_size)
+            lo, hi = max(start - pos, 0), min(end - pos, len(data))
+            pos += len(data)
+            if lo < hi:
+                incr("artifacts.bytes_read", hi - lo)
+                yield data[lo:hi]
+
+
+def read(user, name, start=0, end=None):
+    return b"".join(iter_chunks(user, name, start, end))
+
+
+def delete(user, name):
+    conn = _conn()
+    with _write_lock, _transaction(conn):
+        conn.execute("DELETE FROM artifacts WHERE user = ? AND name = ?", (user, name))
+        _collect_garbage(conn)
+
+
+def usage(user=None):
+    """{"artifacts", "bytes" (logical), "stored_bytes" (on disk, shared blobs counted once)}."""
+    conn = _conn()
+    if user is None:
+        n = conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+        size, stored = conn.execute("SELECT COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs").fetchone()
+    else:
+        n, size, stored = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(b.size), 0), COALESCE(SUM(b.stored_size), 0) "
+            "FROM artifacts a JOIN blobs b ON a.hash = b.hash WHERE a.user = ?", (user,)
+        ).fetchone()
+    return {"artifacts": n, "bytes": size, "stored_bytes": stored}
+
+
+def _enforce_quotas(conn, user, keep=None):
+    """Evict least recently used artifacts: the user's over their quota, anyone's over the store cap."""
+    def lru(where, params=()):
+        return conn.execute(
+            "SELECT a.user, a.name, b.size FROM artifacts a JOIN blobs b ON a.hash = b.hash "
+            f"WHERE {where} AND NOT (a.user = ? AND a.name = ?) ORDER BY a.accessed", params + (user, keep)
+        ).fetchall()
+
+    def drop(u, n):
+        conn.execute("DELETE FROM artifacts WHERE user = ? AND name = ?", (u, n))
+        incr("artifacts.evictions")
+
+    over = usage(user)["bytes"] - USER_QUOTA_BYTES
+    for u, n, size in (lru("a.user = ?", (user,)) if over > 0 else []):
+        if over <= 0:
+            break
+        drop(u, n)
+        over -= size
+    _collect_garbage(conn)
+    # Blobs can be shared, so re-measure the store after each eviction
+    if usage()["stored_bytes"] > MAX_BYTES:
+        for u, n, _ in lru("1"):
+            drop(u, n)
+            _collect_garbage(conn)
+            if usage()["stored_bytes"] <= MAX_BYTES:
+                break
+
+
+def _collect_garbage(conn):
+    """Delete blobs no artifact refers to."""
+    orphans = conn.execute(
+        "SELECT hash FROM blobs WHERE hash NOT IN (SELECT DISTINCT hash FROM artifacts)"
+    ).fetchall()
+    for (digest,) in orphans:
+        try:
+            os.remove(_blob_path(digest))
+        except FileNotFoundError:
+            pass
+        conn.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+
+
+def import_directory(path, user=SHARED_USER):
+    """Add files written straight to `path` (older versions) as artifacts; unchanged files are skipped."""
+    if not os.path.isdir(path):
+        return 0
+    known = {a["name"]: a["source_mtime"] for a in list_artifacts(user)}
+    added = 0
+    for name in sorted(os.listdir(path)):
+        file_path = os.path.join(path, name)
+        if not os.path.isfile(file_path):
+            continue
+        mtime = os.path.getmtime(file_path)
+        if known.get(name) == mtime:
+            continue
+        with open(file_path, "rb") as f:
+            put(user, name, f.read(), source_mtime=mtime)
+        added += 1
+    return added
@@ -0,0 +1,144 @@
+"""Column-statistics catalog computed once per dataset.
+
+Dtypes, null counts, min/max, distinct counts, top values and numeric
+histograms are gathered in one pass when a dataset is ingested and stored
+under its content hash (the dataset version) in memory and in the disk
+cache. Pages build their pickers and filters and the copilot writes its
+summary from the catalog instead of rescanning the frame on every rerun.
+"""
+import io
+import threading
+
+import numpy as np
+import pandas as pd
+
+from . import chart_data, dataset_store, disk_cache
+from .instrumentation import incr, timed
+
+TOP_VALUES = 10
+HISTOGRAM_BINS = 20
+# Columns with at most this many distinct values keep them as filter options
+MAX_OPTIONS = 1_000
+
+_lock = threading.Lock()
+_catalogs = {}
+
+
+class Catalog:
+    def __init__(self, version, rows, columns):
+        self.version = version
+        self.rows = rows
+        # {column: stats dict}, in frame order
+        self.columns = columns
+
+    def __getitem__(self, col):
+        return self.columns[col]
+
+    def of_kind(self, *kinds):
+        return [c for c, s in self.columns.items() if s["kind"] in kinds]
+
+    def numeric_columns(self):
+        return self.of_kind("numeric")
+
+    def categorical_columns(self):
+        return self.of_kind("categorical")
+
+    def options(self, col):
+        """Sorted distinct values of a low-cardinality column, or None."""
+        return self.columns[col].get("values")
+
+    def to_frame(self):
+        """One row per column: dtype, nulls, distinct, min, max, mean and top value."""
+        rows = []
+        for col, s in self.columns.items():
+            top = s.get("top")
+            rows.append({
+                "column": col, "dtype": s["dtype"], "nulls": s["nulls"], "distinct": s["distinct"],
+                "min": s.get("min"), "max": s.get("max"), "mean": s.get("mean"),
+                "top value": f"{top[0][0]} ({top[0][1]:,})" if top else None,
+            })
+        frame = pd.DataFrame(rows)
+        # Keep integer and date bounds as they are instead of upcasting to float
+        for bound in ("min", "max"):
+            frame[bound] = pd.Series([r[bound] for r in rows], dtype=object)
+        return frame
+
+    def summary_text(self):
+        """Plain-text dataset summary (shape, dtypes, missing values, ranges)."""
+        buf = io.StringIO()
+        buf.write(f"Rows: {self.rows} | Columns: {len(self.columns)}\n\n")
+        buf.write(self.to_frame().set_index("column").to_string())
+        buf.write("\n")
+        return buf.getvalue()
+
+
+def _kind(dtype):
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    return "categorical"
+
+
+def _sorted(values):
+    try:
+        return sorted(values)
+    except TypeError:
+        return sorted(values, key=str)
+
+
+def column_stats(values):
+    """Statistics of one Series."""
+    kind = _kind(values.dtype)
+    stats = {"dtype": str(values.dtype), "kind": kind, "nulls": int(values.isna().sum())}
+    if kind == "numeric":
+        arr = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        arr = arr[np.isfinite(arr)]
+        uniques = pd.unique(values.dropna())
+        stats["distinct"] = len(uniques)
+        if arr.size:
+            stats.update(min=values.min(), max=values.max(), mean=float(arr.mean()),
+                         histogram=chart_data.histogram(arr, HISTOGRAM_BINS))
+        if len(uniques) <= MAX_OPTIONS:
+            stats["values"] = _sorted(np.asarray(uniques).tolist())
+        return stats
+    if kind == "datetime":
+        stats["distinct"] = int(values.nunique())
+        if stats["nulls"] < len(values):
+            stats.update(min=values.min(), max=values.max())
+        return stats
+    counts = values.value_counts(dropna=True, sort=True)
+    counts = counts[counts > 0]
+    stats["distinct"] = len(counts)
+    stats["top"] = list(zip(counts.index[:TOP_VALUES].tolist(), counts.iloc[:TOP_VALUES].tolist()))
+    if len(counts) <= MAX_OPTIONS:
+        stats["values"] = _sorted(counts.index.tolist())
+    return stats
+
+
+@timed("catalog.build")
+def build(df, version=None):
+    return Catalog(version, len(df), {col: column_stats(df[col]) for col in df.columns})
+
+
+def for_frame(df):
+    """Catalog of a dataset, built once per version and reused across reruns and restarts."""
+    key = dataset_store.key_of(df) or dataset_store.dataset_hash(df)
+    with _lock:
+        catalog = _catalogs.get(key)
+    if catalog is not None:
+        incr("catalog.cache_hits")
+        return catalog
+    catalog = disk_cache.get_or_compute("catalog.build", key, lambda: build(df, key))
+    with _lock:
+        _catalogs[key] = catalog
+        _prune()
+    return catalog
+
+
+def _prune():
+    """Forget catalogs of datasets evicted from the store."""
+    for k in [k for k in _catalogs if dataset_store.get(k) is None]:
+        del _catalogs[k]
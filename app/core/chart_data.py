@@ -0,0 +1,83 @@
+"""Fixed-size chart payloads computed server-side.
+
+Plotly serialises every point it is given, so instead of passing raw frames
+the pages send box-plot statistics, histogram bins or a downsampled series
+whose size does not depend on the number of rows.
+"""
+import numpy as np
+
+MAX_OUTLIERS = 200
+MAX_POINTS = 2_000
+
+
+def box_stats(values, max_outliers=MAX_OUTLIERS):
+    """Tukey box-plot statistics (1.5 IQR whiskers) plus a capped outlier sample."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return None
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    if outliers.size > max_outliers:
+        # Keep the extremes and an even spread of the rest
+        outliers = np.sort(outliers)
+        outliers = outliers[np.unique(np.linspace(0, outliers.size - 1, max_outliers).astype(int))]
+    return {
+        "q1": float(q1),
+        "median": float(median),
+        "q3": float(q3),
+        "lowerfence": float(inside.min()),
+        "upperfence": float(inside.max()),
+        "mean": float(values.mean()),
+        "outliers": outliers.tolist(),
+        "count": int(values.size),
+    }
+
+
+def histogram(values, bins=50):
+    """Bin counts and edges (NaNs dropped)."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    counts, edges = np.histogram(values, bins=bins)
+    return {"counts": counts.tolist(), "edges": edges.tolist()}
+
+
+def lttb(x, y, n_out=MAX_POINTS):
+    """Largest-Triangle-Three-Buckets downsampling of a series sorted by x.
+
+    Returns the indices of the kept points, always including the first and last.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = x.size
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        nxt_end = edges[i + 2] if i + 2 < len(edges) else n
+        # Average of the next bucket is the third triangle vertex
+        cx = x[end:nxt_end].mean() if nxt_end > end else x[-1]
+        cy = y[end:nxt_end].mean() if nxt_end > end else y[-1]
+        bx, by = x[start:end], y[start:end]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample_scatter(x, y, n_out=MAX_POINTS):
+    """Sort by x and LTTB-downsample a scatter to at most `n_out` points."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.size <= n_out:
+        return x, y
+    order = np.argsort(x, kind="stable")
+    idx = order[lttb(x[order], y[order], n_out)]
+    return x[idx], y[idx]
@@ -0,0 +1,117 @@
+import os
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import pyarrow as pa
+
+from . import dataset_store, disk_cache
+from .compute_server import DatasetMissing, authkey
+from .compute_tasks import TASKS
+from .instrumentation import incr, span
+
+ADDRESS_ENV = "SALES_COMPUTE_ADDRESS"
+# Tasks whose results are small enough to keep in the persistent cache
+CACHED_TASKS = {"groupby_sum", "column_sums", "top_n", "box_stats", "histogram", "fit_linear"}
+
+_pool = []
+_pool_lock = threading.Lock()
+
+
+def _address():
+    value = os.environ.get(ADDRESS_ENV)
+    if not value:
+        return None
+    host, _, port = value.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+def _checkout(address):
+    with _pool_lock:
+        if _pool:
+            return _pool.pop()
+    key = authkey()
+    if key is None:
+        raise ConnectionRefusedError("no compute server key; is the server running?")
+    return Client(address, authkey=key)
+
+
+def _checkin(conn):
+    with _pool_lock:
+        _pool.append(conn)
+
+
+def _request(conn, msg):
+    conn.send(msg)
+    status, result = conn.recv()
+    if status == "missing":
+        raise DatasetMissing(result)
+    if status != "ok":
+        raise RuntimeError(result)
+    return result
+
+
+def _to_ipc(df):
+    """Arrow IPC stream of `df` laid out so workers can map its numeric columns without copying."""
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    for i, field in enumerate(table.schema):
+        # Arrow turns NaN into nulls, and columns with nulls are copied on the way
+        # back to pandas; store NaN as a plain value instead
+        if pa.types.is_floating(field.type) and table.column(i).null_count:
+            values = table.column(i).to_numpy()
+            table = table.set_column(i, field, pa.array(values, type=field.type, from_pandas=False))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def run(task, df=None, **kwargs):
+    """Run a compute task on the shared backend, or in-process if none is configured.
+
+    Set SALES_COMPUTE_ADDRESS=host:port to use `core.compute_server`; if the
+    server is unreachable or can't take the dataset the task runs locally.
+    """
+    with span(f"compute.{task}"):
+        if task in CACHED_TASKS and df is not None:
+            # Stored datasets are identified by content hash, so results outlive restarts
+            return disk_cache.get_or_compute(
+                f"compute.{task}", dataset_store.key_of(df), lambda: _run(task, df, **kwargs), kwargs=kwargs
+            )
+        return _run(task, df, **kwargs)
+
+
+def _run(task, df=None, **kwargs):
+    address = _address()
+    if address is None:
+        return TASKS[task](df, **kwargs)
+    try:
+        conn = _checkout(address)
+    except (OSError, AuthenticationError):
+        return TASKS[task](df, **kwargs)
+
+    try:
+        key = None
+        if df is not None:
+            key = dataset_store.key_of(df) or dataset_store.dataset_hash(df)
+            if not _request(conn, ("has", key)):
+                try:
+                    payload = _to_ipc(df)
+                except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                    _checkin(conn)
+                    return TASKS[task](df, **kwargs)
+                _request(conn, ("publish", key, payload))
+        result = _request(conn, ("call", task, key, kwargs))
+    except DatasetMissing:
+        # Evicted between publish and call by other instances' datasets
+        _checkin(conn)
+        incr("compute.local_fallbacks")
+        return TASKS[task](df, **kwargs)
+    except (EOFError, OSError):
+        conn.close()
+        return TASKS[task](df, **kwargs)
+    except RuntimeError:
+        _checkin(conn)
+        raise
+    _checkin(conn)
+    return result
@@ -0,0 +1,183 @@
+"""Local compute backend shared by several Streamlit instances.
+
+Run from the `app` directory:
+
+    python -m core.compute_server --port 6010 --workers 8
+
+and start each Streamlit instance with SALES_COMPUTE_ADDRESS=127.0.0.1:6010.
+The server listens on loopback only. Connections are authenticated with a
+random key generated per launch and written to `KEY_FILE` (mode 0600), where
+clients on the same machine and account read it; SALES_COMPUTE_AUTHKEY (hex)
+overrides it for both sides.
+
+Datasets are published once per content hash as Arrow IPC streams in shared
+memory (one copy, made by the server). Workers map the block and build their
+pandas frame over it: numeric columns and categorical codes are read-only
+views of the shared Arrow buffers, not copies, so N workers share one copy
+of them. Only text columns (Python objects) and categorical dictionaries are
+materialized per worker. Each worker keeps its frames for later tasks, so
+tasks don't ship the data with every call.
+"""
+import argparse
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+
+import pyarrow as pa
+
+from .compute_tasks import TASKS
+
+DEFAULT_PORT = 6010
+HOST = "127.0.0.1"
+AUTHKEY_ENV = "SALES_COMPUTE_AUTHKEY"
+KEY_FILE = os.path.join(os.path.dirname(__file__), "..", "..", "data", "cache", "compute.key")
+MAX_SHARED_DATASETS = 32
+MAX_WORKER_FRAMES = 8
+
+_shared = OrderedDict()
+_shared_lock = threading.Lock()
+_worker_frames = OrderedDict()
+
+
+class DatasetMissing(Exception):
+    """The dataset was never published or has been evicted since."""
+
+
+def authkey():
+    """Key shared with clients: SALES_COMPUTE_AUTHKEY, else the current launch's key file (None if absent)."""
+    value = os.environ.get(AUTHKEY_ENV)
+    if value:
+        return bytes.fromhex(value)
+    try:
+        with open(KEY_FILE, "r", encoding="utf-8") as f:
+            return bytes.fromhex(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _new_authkey():
+    if os.environ.get(AUTHKEY_ENV):
+        return bytes.fromhex(os.environ[AUTHKEY_ENV])
+    key = secrets.token_bytes(32)
+    os.makedirs(os.path.dirname(KEY_FILE), exist_ok=True)
+    if os.path.exists(KEY_FILE):
+        os.remove(KEY_FILE)
+    fd = os.open(KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(key.hex())
+    return key
+
+
+def _publish(key, payload):
+    """Copy an Arrow IPC payload into a shared memory block owned by the server."""
+    with _shared_lock:
+        if key in _shared:
+            _shared.move_to_end(key)
+            return _shared[key].name
+        shm = shared_memory.SharedMemory(create=True, size=max(len(payload), 1))
+        shm.buf[:len(payload)] = payload
+        _shared[key] = shm
+        while len(_shared) > MAX_SHARED_DATASETS:
+            _, old = _shared.popitem(last=False)
+            old.close()
+            old.unlink()
+        return shm.name
+
+
+def _attach(key, shm_name):
+    """Map a published dataset inside a worker process (cached per worker)."""
+    hit = _worker_frames.get(key)
+    if hit is None:
+        try:
+            shm = shared_memory.SharedMemory(name=shm_name)
+        except FileNotFoundError:
+            # Evicted by a newer publish after the server looked it up
+            raise DatasetMissing(key) from None
+        # The server owns the block; don't let this worker's tracker unlink it.
+        resource_tracker.unregister(shm._name, "shared_memory")
+        # read_all() references the shared buffer; split_blocks keeps each
+        # numeric column a view of it instead of consolidating into copies
+        table = pa.ipc.open_stream(pa.py_buffer(shm.buf)).read_all()
+        hit = (shm, table.to_pandas(split_blocks=True))
+        _worker_frames[key] = hit
+        while len(_worker_frames) > MAX_WORKER_FRAMES:
+            _worker_frames.popitem(last=False)
+    else:
+        _worker_frames.move_to_end(key)
+    return hit[1]
+
+
+def _run_task(task, key, shm_name, kwargs):
+    df = _attach(key, shm_name) if key else None
+    return TASKS[task](df, **kwargs)
+
+
+def _handle(conn, pool):
+    with conn:
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                break
+            try:
+                op = msg[0]
+                if op == "has":
+                    with _shared_lock:
+                        result = msg[1] in _shared
+                elif op == "publish":
+                    result = _publish(msg[1], msg[2])
+                elif op == "call":
+                    _, task, key, kwargs = msg
+                    if task not in TASKS:
+                        raise KeyError(f"unknown task {task!r}")
+                    shm_name = None
+                    if key is not None:
+                        with _shared_lock:
+                            if key not in _shared:
+                                raise DatasetMissing(key)
+                            shm_name = _shared[key].name
+                    result = pool.submit(_run_task, task, key, shm_name, kwargs).result()
+                else:
+                    raise ValueError(f"unknown operation {op!r}")
+                conn.send(("ok", result))
+            except DatasetMissing as e:
+                conn.send(("missing", str(e)))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def serve(port=DEFAULT_PORT, workers=None):
+    # Messages are pickles, so the port must never be reachable from other machines
+    key = _new_authkey()
+    pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+    source = AUTHKEY_ENV if os.environ.get(AUTHKEY_ENV) else os.path.abspath(KEY_FILE)
+    print(f"✅ Compute server listening on {HOST}:{port} (key from {source})")
+    try:
+        with Listener((HOST, port), authkey=key) as listener:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, OSError, EOFError):
+                    # Wrong key or a client that hung up during the handshake
+                    continue
+                threading.Thread(target=_handle, args=(conn, pool), daemon=True).start()
+    finally:
+        pool.shutdown(cancel_futures=True)
+        with _shared_lock:
+            for shm in _shared.values():
+                shm.close()
+                shm.unlink()
+            _shared.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regional sales compute server")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    serve(args.port, args.workers)
@@ -0,0 +1,111 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import span
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "trained_ai_model.pkl")
+
+
+def filter_mask(df, filters=None):
+    """Boolean mask of rows whose column values are in the given lists ({column: values}).
+
+    A value of {"range": (start, stop)} keeps start <= value < stop instead.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for col, values in (filters or {}).items():
+        if col not in df.columns:
+            continue
+        if isinstance(values, dict):
+            start, stop = values["range"]
+            mask &= ((df[col] >= start) & (df[col] < stop)).to_numpy()
+        else:
+            mask &= df[col].isin(values).to_numpy()
+    return mask
+
+
+def apply_filters(df, filters=None):
+    """Keep rows whose column values are in the given lists ({column: values})."""
+    if not filters:
+        return df
+    return df[filter_mask(df, filters)]
+
+
+def groupby_sum(df, by, columns, filters=None):
+    df = apply_filters(df, filters)
+    return df.groupby(by, observed=True)[columns].sum()
+
+
+def column_sums(df, columns, filters=None):
+    df = apply_filters(df, filters)
+    return {c: df[c].sum() for c in columns if c in df.columns}
+
+
+def top_n(df, by, column, n, filters=None):
+    df = apply_filters(df, filters)
+    return df.groupby(by, observed=True)[column].sum().nlargest(n)
+
+
+def box_stats(df, column, filters=None):
+    from .chart_data import box_stats as _box_stats
+    return _box_stats(apply_filters(df, filters)[column].to_numpy())
+
+
+def histogram(df, column, bins=50, filters=None):
+    from .chart_data import histogram as _histogram
+    return _histogram(apply_filters(df, filters)[column].to_numpy(), bins=bins)
+
+
+def fit_linear(df, features, target, test_size=0.2, random_state=42):
+    """Train/test split + LinearRegression as done on the AI Predictions page."""
+    from sklearn.model_selection import train_test_split
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import mean_squared_error
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        df[features], df[target], test_size=test_size, random_state=random_state
+    )
+    model = LinearRegression().fit(X_train, y_train)
+    predictions = model.predict(X_test)
+    return {
+        "y_test": y_test,
+        "predictions": predictions,
+        "mse": mean_squared_error(y_test, predictions),
+    }
+
+
+def cluster_labels(df):
+    """KMeans labels of every row using the saved copilot bundle.
+
+    The bundle path is fixed: clients must not make the server load files of their choosing.
+    """
+    from . import inference
+
+    model = inference.load(MODEL_PATH)
+    with span("inference.features"):
+        X_all = model.feature_matrix(df)
+    return model.cluster(X_all)
+
+
+def sales_summary(df=None):
+    from .analysis import sales_summary as _sales_summary
+    return _sales_summary()
+
+
+def predict_sales_trend(df=None):
+    from .ai import predict_sales_trend as _predict_sales_trend
+    return _predict_sales_trend()
+
+
+TASKS = {
+    "groupby_sum": groupby_sum,
+    "column_sums": column_sums,
+    "top_n": top_n,
+    "box_stats": box_stats,
+    "histogram": histogram,
+    "fit_linear": fit_linear,
+    "cluster_labels": cluster_labels,
+    "sales_summary": sales_summary,
+    "predict_sales_trend": predict_sales_trend,
+}
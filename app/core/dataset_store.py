@@ -0,0 +1,148 @@
+import hashlib
+import threading
+import time
+import weakref
+
+import pandas as pd
+
+from .instrumentation import incr
+
+MEMORY_BUDGET_BYTES = 2 * 1024 ** 3
+
+_lock = threading.RLock()
+_datasets = {}
+_finalizers = {}
+
+
+def dataset_hash(df):
+    """Content hash of a DataFrame (values, index and column names)."""
+    h = hashlib.sha256()
+    h.update(repr(list(df.columns)).encode("utf-8"))
+    h.update(repr([str(t) for t in df.dtypes]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()[:32]
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def put(df, key=None):
+    """Add a frame to the store (deduplicated by content) and return its key.
+
+    Pass `key` when it is already known (e.g. reloading a spilled frame).
+    """
+    key = key or dataset_hash(df)
+    with _lock:
+        entry = _datasets.get(key)
+        if entry is None:
+            _datasets[key] = {
+                "frame": df,
+                "nbytes": frame_nbytes(df),
+                "refs": 0,
+                "last_used": time.time(),
+            }
+            _evict(keep=key)
+        else:
+            incr("dataset_store.hits")
+            entry["last_used"] = time.time()
+    return key
+
+
+def acquire(key):
+    """Return a shallow view of a stored dataset and count the reference.
+
+    Views are only safe to edit with pandas copy-on-write enabled, which the
+    web app turns on at startup.
+
+    The reference is dropped when the view is garbage collected or when
+    `release(view)` is called.
+    """
+    with _lock:
+        entry = _datasets.get(key)
+        if entry is None:
+            return None
+        view = entry["frame"].copy(deep=False)
+        entry["refs"] += 1
+        entry["last_used"] = time.time()
+        _finalizers[id(view)] = (key, weakref.finalize(view, _drop_ref, key, id(view)))
+    return view
+
+
+def share(df):
+    """Store `df` (or reuse an identical stored frame) and return a view of it."""
+    with _lock:
+        return acquire(put(df))
+
+
+def release(view):
+    """Drop the reference held by a view returned from `acquire`/`share`."""
+    ref = _finalizers.get(id(view))
+    if ref is not None:
+        ref[1]()
+
+
+def key_of(df):
+    """Dataset key of a view handed out by the store, or None."""
+    ref = _finalizers.get(id(df))
+    return ref[0] if ref else None
+
+
+def get(key):
+    with _lock:
+        entry = _datasets.get(key)
+        return entry["frame"] if entry else None
+
+
+def discard(key):
+    """Drop a dataset nobody references, regardless of the budget; returns True if dropped."""
+    with _lock:
+        entry = _datasets.get(key)
+        if entry is None or entry["refs"] > 0:
+            return False
+        del _datasets[key]
+        incr("dataset_store.discards")
+        return True
+
+
+def memory_usage():
+    """Per-dataset memory usage and reference counts."""
+    with _lock:
+        return pd.DataFrame(
+            [
+                {"key": k, "rows": len(e["frame"]), "columns": e["frame"].shape[1],
+                 "bytes": e["nbytes"], "refs": e["refs"], "last_used": e["last_used"]}
+                for k, e in _datasets.items()
+            ],
+            columns=["key", "rows", "columns", "bytes", "refs", "last_used"],
+        )
+
+
+def total_bytes():
+    with _lock:
+        return sum(e["nbytes"] for e in _datasets.values())
+
+
+def _drop_ref(key, view_id):
+    with _lock:
+        _finalizers.pop(view_id, None)
+        entry = _datasets.get(key)
+        if entry is not None:
+            entry["refs"] = max(0, entry["refs"] - 1)
+            entry["last_used"] = time.time()
+        _evict()
+
+
+def _evict(keep=None):
+    """Drop unreferenced datasets, least recently used first, while over budget."""
+    total = sum(e["nbytes"] for e in _datasets.values())
+    if total <= MEMORY_BUDGET_BYTES:
+        return
+    idle = sorted(
+        (k for k, e in _datasets.items() if e["refs"] == 0 and k != keep),
+        key=lambda k: _datasets[k]["last_used"],
+    )
+    for k in idle:
+        if total <= MEMORY_BUDGET_BYTES:
+            break
+        total -= _datasets.pop(k)["nbytes"]
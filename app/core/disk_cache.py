@@ -0,0 +1,163 @@
+"""Persistent result cache that survives process restarts.
+
+Results are pickled into a SQLite file keyed by function name, arguments and
+the version of the data they were computed from (the sales table's
+`data_version()` or an uploaded dataset's content hash), so a stale entry
+can never be returned. The file is kept under `MAX_BYTES` by evicting the
+least recently used entries.
+"""
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from .instrumentation import incr, span
+
+CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "cache", "results.db")
+MAX_BYTES = 256 * 1024 * 1024
+# Values bigger than this are recomputed rather than stored
+MAX_ENTRY_BYTES = 32 * 1024 * 1024
+DISABLE_ENV = "SALES_DISK_CACHE_DISABLED"
+
+_local = threading.local()
+_warm_lock = threading.Lock()
+_warm_thread = None
+
+
+def enabled():
+    return not os.environ.get(DISABLE_ENV)
+
+
+def _conn():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, func TEXT NOT NULL, "
+            "value BLOB NOT NULL, size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        _local.conn = conn
+    return conn
+
+
+def make_key(func, version, args=(), kwargs=None):
+    raw = repr((func, version, args, sorted((kwargs or {}).items(), key=lambda kv: kv[0])))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+MISSING = object()
+
+
+def get(key):
+    """Cached value for `key`, or `MISSING`."""
+    conn = _conn()
+    row = conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        incr("disk_cache.misses")
+        return MISSING
+    conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+    incr("disk_cache.hits")
+    with span("disk_cache.unpickle"):
+        return pickle.loads(row[0])
+
+
+def put(key, func, value):
+    try:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return False
+    if len(blob) > MAX_ENTRY_BYTES:
+        return False
+    now = time.time()
+    conn = _conn()
+    conn.execute(
+        "INSERT OR REPLACE INTO results (key, func, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+        (key, func, blob, len(blob), now, now),
+    )
+    _evict(conn)
+    return True
+
+
+def _evict(conn):
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+    if total <= MAX_BYTES:
+        return
+    freed = 0
+    victims = []
+    for key, size in conn.execute("SELECT key, size FROM results ORDER BY accessed"):
+        victims.append((key,))
+        freed += size
+        if total - freed <= MAX_BYTES:
+            break
+    conn.executemany("DELETE FROM results WHERE key = ?", victims)
+    incr("disk_cache.evictions", len(victims))
+
+
+def get_or_compute(func_name, version, compute, args=(), kwargs=None):
+    """Cached `compute()` result for (function, version, arguments)."""
+    if not enabled() or version is None:
+        return compute()
+    key = make_key(func_name, version, args, kwargs)
+    try:
+        value = get(key)
+    except sqlite3.Error:
+        return compute()
+    if value is not MISSING:
+        return value
+    value = compute()
+    try:
+        put(key, func_name, value)
+    except sqlite3.Error:
+        pass
+    return value
+
+
+def cached(version, name=None):
+    """Decorator: cache results on disk; `version()` identifies the data they depend on."""
+    def decorate(func):
+        func_name = name or f"{func.__module__.split('.')[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return get_or_compute(func_name, version(), lambda: func(*args, **kwargs), args, kwargs)
+        return wrapper
+    return decorate
+
+
+def stats():
+    """Entries and bytes per cached function."""
+    rows = _conn().execute(
+        "SELECT func, COUNT(*), SUM(size), MAX(accessed) FROM results GROUP BY func ORDER BY SUM(size) DESC"
+    ).fetchall()
+    return [{"function": f, "entries": n, "bytes": b, "last used": time.ctime(a)} for f, n, b, a in rows]
+
+
+def clear():
+    _conn().execute("DELETE FROM results")
+
+
+def warm_up(tasks):
+    """Run `tasks` (callables) once per process in a background thread."""
+    global _warm_thread
+    with _warm_lock:
+        if _warm_thread is not None:
+            return _warm_thread
+
+        def run():
+            for task in tasks:
+                try:
+                    with span("disk_cache.warm_up"):
+                        task()
+                except Exception:
+                    incr("disk_cache.warm_up_errors")
+
+        _warm_thread = threading.Thread(target=run, name="cache-warm-up", daemon=True)
+        _warm_thread.start()
+        return _warm_thread
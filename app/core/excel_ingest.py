@@ -0,0 +1,391 @@
+"""Fast Excel ingestion: cheap sheet listing, projection and parallel parsing.
+
+Sheet names and approximate row counts come straight from the workbook's
+XML (no cell parsing). Selected sheets are parsed in separate processes by a
+streaming reader that only converts cells of the chosen columns, and each
+result is written once to a Parquet cache keyed by workbook hash, sheet and
+columns, so re-uploading the same workbook skips Excel parsing entirely.
+The cache is kept under `MAX_CACHE_BYTES` and `MAX_CACHE_AGE` seconds,
+least recently used files first.
+"""
+import functools
+import hashlib
+import os
+import re
+import threading
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from .instrumentation import incr, timed
+
+try:
+    import python_calamine  # noqa: F401
+    ENGINE = "calamine"
+except ImportError:
+    # Without calamine, sheets go through the streaming XML reader below and
+    # openpyxl is only the fallback
+    ENGINE = "openpyxl"
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "cache", "excel")
+MAX_WORKERS = 4
+MAX_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+MAX_CACHE_AGE = 7 * 24 * 3600
+# Staged uploads already hashed this process: (name, size, stamp) -> (path, digest)
+STAGED_ENTRIES = 64
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_DIMENSION = re.compile(rb'<dimension ref="(?:[A-Z]+\d+:)?[A-Z]+(\d+)"')
+_ROW, _CELL, _VALUE, _INLINE = (f"{_NS_MAIN}{t}" for t in ("row", "c", "v", "is"))
+# Built-in number formats that display dates/times
+_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+_EXCEL_EPOCH = "1899-12-30"
+
+_staged_lock = threading.Lock()
+_staged = {}
+
+
+def stage(data, name=None, stamp=None):
+    """Write uploaded workbook bytes to the cache (once); returns (path, digest).
+
+    With a `name` and `stamp` (modification time or upload id) the workbook is
+    only hashed the first time that (name, size, stamp) is seen.
+    """
+    known = (name, len(data), stamp) if name is not None and stamp is not None else None
+    with _staged_lock:
+        hit = _staged.get(known) if known else None
+    if hit and os.path.exists(hit[0]):
+        _touch(hit[0])
+        return hit
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, digest + ".xlsx")
+    if os.path.exists(path):
+        _touch(path)
+    else:
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        prune_cache(keep={path})
+    if known:
+        with _staged_lock:
+            _staged[known] = (path, digest)
+            while len(_staged) > STAGED_ENTRIES:
+                del _staged[next(iter(_staged))]
+    return path, digest
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prune_cache(keep=(), max_bytes=MAX_CACHE_BYTES, max_age=MAX_CACHE_AGE):
+    """Delete cached workbooks and sheets older than `max_age`, then the least recently used over `max_bytes`."""
+    try:
+        names = os.listdir(CACHE_DIR)
+    except FileNotFoundError:
+        return 0
+    entries = []
+    for name in names:
+        path = os.path.join(CACHE_DIR, name)
+        if path in keep or name.endswith(".tmp"):
+            continue
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries) + sum(os.path.getsize(p) for p in keep if os.path.exists(p))
+    cutoff = time.time() - max_age
+    removed = 0
+    for mtime, size, path in entries:
+        if mtime >= cutoff and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    incr("excel_ingest.evictions", removed)
+    return removed
+
+
+def _dimension_rows(z, member):
+    """Data rows from the sheet's <dimension> tag, reading only the start of its XML."""
+    try:
+        with z.open(member) as f:
+            m = _DIMENSION.search(f.read(4096))
+    except KeyError:
+        return None
+    return max(int(m.group(1)) - 1, 0) if m else None
+
+
+def _sheet_members(z):
+    """{sheet name: zip member of its XML}, in workbook order."""
+    workbook = ET.fromstring(z.read("xl/workbook.xml"))
+    rels = ET.fromstring(z.read("xl/_rels/workbook.xml.rels"))
+    targets = {r.get("Id"): r.get("Target") for r in rels}
+    members = {}
+    for s in workbook.iter(f"{_NS_MAIN}sheet"):
+        target = targets.get(s.get(f"{_NS_REL}id"), "")
+        members[s.get("name")] = target.lstrip("/") if target.startswith("/") else "xl/" + target
+    return members
+
+
+def list_sheets(path):
+    """[{"sheet": name, "rows": approx data rows or None}] without parsing any cells."""
+    with zipfile.ZipFile(path) as z:
+        return [{"sheet": name, "rows": _dimension_rows(z, member)}
+                for name, member in _sheet_members(z).items()]
+
+
+def _header(row, strings):
+    """{column index: name} of a header row; blank cells are left out, repeated names get ".1", ".2"."""
+    header = {}
+    for pos, cell in enumerate(row):
+        ref = cell.get("r")
+        name = _cell_value(cell, strings)
+        if name is None:
+            continue
+        header[_column_index(ref) if ref else pos] = int(name) if isinstance(name, float) and name.is_integer() else name
+    return dict(zip(header, _dedupe(list(header.values()))))
+
+
+def _dedupe(names):
+    """Repeated names renamed as pandas' readers do ("x", "x.1", ...), skipping names already taken."""
+    counts = {}
+    out = list(names)
+    for i, name in enumerate(out):
+        count = counts.get(name, 0)
+        if count:
+            base = name
+            while count:
+                counts[base] = count + 1
+                name = f"{base}.{count}"
+                count = count + 1 if name in out else counts.get(name, 0)
+            out[i] = name
+        counts[name] = count + 1
+    return out
+
+
+def _header_row(z, member, strings):
+    """(row number, header) of the first non-empty row of a sheet, reading no further."""
+    for _, row in ET.iterparse(z.open(member)):
+        if row.tag == _ROW:
+            header = _header(row, strings)
+            if header:
+                return int(row.get("r", 1)), header
+            row.clear()
+    return None, {}
+
+
+@functools.lru_cache(maxsize=256)
+def sheet_columns(path, sheet):
+    """Header of one sheet, as `read_sheet` detects it; `path` is content-addressed."""
+    with zipfile.ZipFile(path) as z:
+        return list(_header_row(z, _sheet_members(z)[sheet], _shared_strings(z))[1].values())
+
+
+def _shared_strings(z):
+    if "xl/sharedStrings.xml" not in z.namelist():
+        return []
+    strings = []
+    for _, el in ET.iterparse(z.open("xl/sharedStrings.xml")):
+        if el.tag == f"{_NS_MAIN}si":
+            strings.append("".join(el.itertext()))
+            el.clear()
+    return strings
+
+
+def _date_styles(z):
+    """Per cell-style index: does its number format show a date/time?"""
+    try:
+        root = ET.fromstring(z.read("xl/styles.xml"))
+    except KeyError:
+        return []
+    custom = {int(f.get("numFmtId")): f.get("formatCode", "") for f in root.iter(f"{_NS_MAIN}numFmt")}
+    xfs = root.find(f"{_NS_MAIN}cellXfs")
+    flags = []
+    for xf in (xfs if xfs is not None else ()):
+        fmt = int(xf.get("numFmtId", 0))
+        # Ignore quoted literals, [colour]/[locale] tags and escaped characters
+        code = re.sub(r'"[^"]*"|\[[^\]]*\]|\\.', "", custom.get(fmt, ""))
+        flags.append(fmt in _DATE_FORMATS or (fmt in custom and re.search(r"[dmyhs]", code, re.I) is not None))
+    return flags
+
+
+def _column_index(ref):
+    index = 0
+    for ch in ref:
+        if ch.isdigit():
+            break
+        index = index * 26 + ord(ch) - 64
+    return index - 1
+
+
+def _cell_value(cell, strings):
+    kind = cell.get("t")
+    for child in cell:
+        if child.tag == _VALUE:
+            text = child.text
+            if text is None:
+                return None
+            if kind == "s":
+                return strings[int(text)]
+            if kind in ("str", "e"):
+                return text
+            if kind == "b":
+                return text == "1"
+            return float(text)
+        if child.tag == _INLINE:
+            return "".join(child.itertext())
+    return None
+
+
+def read_sheet(path, sheet, columns=None):
+    """One sheet as a DataFrame (first non-empty row = header), converting only `columns`.
+
+    Streams the sheet XML instead of building openpyxl cell objects; dates are
+    recognised from the cells' number formats like pandas/openpyxl do.
+    """
+    with zipfile.ZipFile(path) as z:
+        member = _sheet_members(z)[sheet]
+        strings = _shared_strings(z)
+        date_styles = _date_styles(z)
+        header = None
+        # Rows of each column whose cell is a number in a date format
+        data, dates = {}, {}
+        header_row = n_rows = 0
+        for _, row in ET.iterparse(z.open(member)):
+            if row.tag != _ROW:
+                continue
+            r = int(row.get("r", header_row + n_rows + 1))
+            if header is None:
+                header = _header(row, strings)
+                if not header:
+                    header = None
+                    row.clear()
+                    continue
+                header = {i: name for i, name in header.items() if columns is None or name in columns}
+                data = {i: {} for i in header}
+                header_row = r
+            else:
+                n = r - header_row - 1
+                n_rows = n + 1
+                for pos, cell in enumerate(row):
+                    ref = cell.get("r")
+                    i = _column_index(ref) if ref else pos
+                    if i not in data:
+                        continue
+                    value = _cell_value(cell, strings)
+                    if value is not None:
+                        data[i][n] = value
+                        if isinstance(value, float):
+                            style = int(cell.get("s", 0))
+                            if style < len(date_styles) and date_styles[style]:
+                                dates.setdefault(i, []).append(n)
+            row.clear()
+
+    frame = {}
+    for i, name in (header or {}).items():
+        col = pd.Series(data[i], dtype=float if not data[i] else None).reindex(range(n_rows))
+        if i in dates:
+            # Serial days -> whole milliseconds (Excel's precision), so 08:00 stays 08:00
+            serials = col[dates[i]].astype(float)
+            stamps = pd.to_datetime((serials * 86_400_000).round(), unit="ms", origin=_EXCEL_EPOCH)
+            if len(dates[i]) == col.notna().sum():
+                col = stamps.reindex(range(n_rows))
+            else:
+                # Other cells (text, plain numbers) keep their values, like openpyxl
+                col = col.astype(object)
+                col[dates[i]] = stamps.astype(object).to_numpy()
+        elif pd.api.types.is_float_dtype(col.dtype) and col.notna().all() and (col % 1 == 0).all():
+            col = col.astype("int64")
+        frame[name] = col
+    return pd.DataFrame(frame)
+
+
+def _cache_path(digest, sheet, columns):
+    key = hashlib.sha1(repr((sheet, sorted(columns, key=repr) if columns else None)).encode()).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"{digest}-{key}.parquet")
+
+
+def _parse_sheet(path, sheet, columns, out_path):
+    """Worker: parse one sheet (projected to `columns`) into a Parquet file.
+
+    Returns the counters to add in the parent, since workers' own are lost.
+    """
+    counters = {}
+    wanted = set(columns) if columns else None
+    df = None
+    if ENGINE == "openpyxl":
+        try:
+            df = read_sheet(path, sheet, wanted)
+        except (KeyError, ValueError, ET.ParseError):
+            counters["excel_ingest.fallbacks"] = 1
+    if df is None:
+        # Same header row and columns as `sheet_columns` reports
+        with zipfile.ZipFile(path) as z:
+            header_row, header = _header_row(z, _sheet_members(z)[sheet], _shared_strings(z))
+        keep = wanted or set(header.values())
+        df = pd.read_excel(path, sheet_name=sheet, engine=ENGINE, skiprows=max((header_row or 1) - 1, 0),
+                           usecols=lambda c: c in keep)
+    # Mixed-type object columns cannot be written to Parquet as-is
+    for col in df.columns[df.dtypes == object]:
+        if df[col].map(type).nunique() > 1:
+            df[col] = df[col].astype(str).where(df[col].notna(), None)
+    df.to_parquet(out_path + ".tmp", index=False)
+    os.replace(out_path + ".tmp", out_path)
+    return counters
+
+
+@timed("excel_ingest.load")
+def load(path, digest, sheets, columns=None, progress=None):
+    """Parse the chosen sheets (in parallel when more than one needs parsing).
+
+    `progress(done, total, sheet)` is called as each sheet finishes. With several
+    sheets the frames are stacked with a `Sheet` column.
+    """
+    jobs = {s: _cache_path(digest, s, columns) for s in sheets}
+    todo = {s: p for s, p in jobs.items() if not os.path.exists(p)}
+    incr("excel_ingest.cache_hits", len(jobs) - len(todo))
+    for s in set(jobs) - set(todo):
+        _touch(jobs[s])
+    done = len(jobs) - len(todo)
+    if progress:
+        progress(done, len(jobs), None)
+
+    if len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=min(MAX_WORKERS, len(todo))) as pool:
+            futures = {pool.submit(_parse_sheet, path, s, columns, p): s for s, p in todo.items()}
+            for future in as_completed(futures):
+                for name, value in future.result().items():
+                    incr(name, value)
+                done += 1
+                if progress:
+                    progress(done, len(jobs), futures[future])
+    else:
+        for s, p in todo.items():
+            for name, value in _parse_sheet(path, s, columns, p).items():
+                incr(name, value)
+            done += 1
+            if progress:
+                progress(done, len(jobs), s)
+
+    frames = [pd.read_parquet(jobs[s]) for s in sheets]
+    if todo:
+        prune_cache(keep={path, *jobs.values()})
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(
+        [f.assign(Sheet=s) for s, f in zip(sheets, frames)], ignore_index=True
+    ).astype({"Sheet": "category"})
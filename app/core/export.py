@@ -1,6 +1,8 @@
 from fpdf import FPDF
 from .analysis import sales_summary
+from .instrumentation import timed
 
+@timed()
 def export_report(filename="sales_report.pdf"):
     summary = sales_summary()
 
@@ -9,8 +11,11 @@ def export_report(filename="sales_report.pdf"):
     pdf.set_font("Arial", size=12)
     pdf.cell(200, 10, txt="Sales Report", ln=True, align="C")
 
+    # Per-region totals come back indexed by region (quantity/price) or with a region column (sales)
+    if "region" in summary.columns:
+        summary = summary.set_index("region")
     for region, row in summary.iterrows():
-        pdf.cell(200, 10, txt=f"{region}: Quantity={row['quantity']}, Price={row['price']}", ln=True)
+        pdf.cell(200, 10, txt=f"{region}: " + ", ".join(f"{c.title()}={v}" for c, v in row.items()), ln=True)
 
     pdf.output(filename)
     print(f"✅ Report saved as {filename}")
@@ -0,0 +1,281 @@
+"""Materialized sales aggregates maintained from a trigger-populated change log.
+
+Triggers on `sales` append every inserted/updated/deleted row to
+`sales_changes` with a +1/-1 sign. `refresh()` folds only the changes past
+the last high-water mark into `sales_agg` (per region/product/date sums and
+counts) and `sales_value_counts` (for medians), so summaries after an ingest
+cost O(changed rows) instead of a full table scan.
+
+Only `migrate()` creates or replaces these tables and triggers; it runs as an
+explicit step at startup and on every ingest. Readers fold pending changes
+when the aggregates exist and otherwise answer from a scan of `sales`.
+"""
+import os
+import time
+
+from .instrumentation import incr, timed
+
+DIMENSIONS = ["region", "product", "date"]
+MEASURES = ["quantity", "price", "sales"]
+# Measures whose median is needed (predict_sales_trend)
+MEDIAN_MEASURES = ["sales"]
+# Bump when the aggregate tables change shape, so `migrate()` rebuilds them
+SCHEMA_VERSION = 2
+# NULL keys are stored as an empty blob, which never equals a text key (not even '')
+NULL_KEY = "X''"
+
+
+def _columns(conn, table="sales"):
+    return {row[1].lower(): row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+
+
+def layout(conn):
+    cols = _columns(conn)
+    dims = [d for d in DIMENSIONS if d in cols]
+    measures = [m for m in MEASURES if m in cols]
+    return dims, measures
+
+
+def _state(conn, key, default=None):
+    row = conn.execute("SELECT value FROM sales_agg_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def _set_state(conn, key, value):
+    conn.execute(
+        "INSERT INTO sales_agg_state (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, value),
+    )
+
+
+def _layout_key(dims, measures):
+    return f"{SCHEMA_VERSION}:" + ",".join(dims) + "|" + ",".join(measures)
+
+
+def _installed(conn, dims, measures):
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+    if not {"sales_agg", "sales_changes", "sales_agg_state", "sales_changes_ins"} <= names:
+        return False
+    return _state(conn, "layout") == _layout_key(dims, measures)
+
+
+def installed(conn):
+    """Do the aggregates exist and match the current columns of `sales`?"""
+    dims, measures = layout(conn)
+    return bool(dims or measures) and _installed(conn, dims, measures)
+
+
+def _install(conn, dims, measures):
+    """(Re)create change log, triggers and aggregate tables, then build them from scratch."""
+    for name in ("sales_changes_ins", "sales_changes_del", "sales_changes_upd"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for name in ("sales_changes", "sales_agg", "sales_value_counts", "sales_agg_state"):
+        conn.execute(f"DROP TABLE IF EXISTS {name}")
+
+    cols = dims + measures
+    conn.execute(
+        "CREATE TABLE sales_changes (id INTEGER PRIMARY KEY AUTOINCREMENT, sign INTEGER"
+        + "".join(f", {c}" for c in cols) + ")"
+    )
+    col_list = ", ".join(["sign"] + cols)
+    new = ", ".join(["1"] + [f"NEW.{c}" for c in cols])
+    old = ", ".join(["-1"] + [f"OLD.{c}" for c in cols])
+    conn.execute(f"CREATE TRIGGER sales_changes_ins AFTER INSERT ON sales BEGIN "
+                 f"INSERT INTO sales_changes ({col_list}) VALUES ({new}); END")
+    conn.execute(f"CREATE TRIGGER sales_changes_del AFTER DELETE ON sales BEGIN "
+                 f"INSERT INTO sales_changes ({col_list}) VALUES ({old}); END")
+    conn.execute(f"CREATE TRIGGER sales_changes_upd AFTER UPDATE ON sales BEGIN "
+                 f"INSERT INTO sales_changes ({col_list}) VALUES ({old}); "
+                 f"INSERT INTO sales_changes ({col_list}) VALUES ({new}); END")
+
+    key_cols = dims or ["all_rows"]
+    conn.execute(
+        "CREATE TABLE sales_agg (" + ", ".join(f"{d} TEXT NOT NULL" for d in key_cols)
+        + ", row_count INTEGER NOT NULL"
+        # No declared type on sums so integer measures stay integers
+        + "".join(f", sum_{m}, n_{m} INTEGER" for m in measures)
+        + f", PRIMARY KEY ({', '.join(key_cols)}))"
+    )
+    conn.execute(
+        "CREATE TABLE sales_value_counts (measure TEXT NOT NULL, value REAL NOT NULL, "
+        "count INTEGER NOT NULL, PRIMARY KEY (measure, value))"
+    )
+    conn.execute("CREATE TABLE sales_agg_state (key TEXT PRIMARY KEY, value)")
+    _set_state(conn, "layout", _layout_key(dims, measures))
+    _set_state(conn, "version", 0)
+    # Distinguishes versions across rebuilds (e.g. after the table was replaced)
+    _set_state(conn, "epoch", time.time_ns())
+
+    # Seed from the current table contents, as if every row had just been inserted
+    source = f"(SELECT 1 AS sign{''.join(', ' + c for c in cols)} FROM sales)"
+    _fold(conn, source, "1 = 1", (), dims, measures)
+    return conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+
+
+def _apply_changes(conn, dims, measures):
+    """Fold pending change-log rows into the aggregates; returns rows consumed."""
+    hwm = conn.execute("SELECT MAX(id) FROM sales_changes").fetchone()[0]
+    if hwm is None:
+        return 0
+    pending = conn.execute("SELECT COUNT(*) FROM sales_changes WHERE id <= ?", (hwm,)).fetchone()[0]
+    _fold(conn, "sales_changes", "id <= ?", (hwm,), dims, measures)
+    conn.execute("DELETE FROM sales_changes WHERE id <= ?", (hwm,))
+    _set_state(conn, "version", int(_state(conn, "version", 0)) + 1)
+    incr("incremental.changes_applied", pending)
+    return pending
+
+
+def _fold(conn, source, where, params, dims, measures):
+    """Add signed rows from `source` into `sales_agg` and `sales_value_counts`."""
+    key_cols = dims or ["all_rows"]
+    key_exprs = [f"COALESCE({d}, {NULL_KEY})" for d in dims] or ["''"]
+    agg_cols = ["row_count"] + [c for m in measures for c in (f"sum_{m}", f"n_{m}")]
+    agg_exprs = ["SUM(sign)"] + [
+        e for m in measures for e in (f"SUM(sign * {m})", f"SUM(CASE WHEN {m} IS NULL THEN 0 ELSE sign END)")
+    ]
+    conn.execute(
+        f"INSERT INTO sales_agg ({', '.join(key_cols + agg_cols)}) "
+        f"SELECT {', '.join(key_exprs + agg_exprs)} FROM {source} WHERE {where} "
+        f"GROUP BY {', '.join(key_exprs)} "
+        f"ON CONFLICT ({', '.join(key_cols)}) DO UPDATE SET "
+        + ", ".join(f"{c} = COALESCE({c}, 0) + COALESCE(excluded.{c}, 0)" for c in agg_cols),
+        params,
+    )
+    conn.execute("DELETE FROM sales_agg WHERE row_count <= 0")
+
+    for m in MEDIAN_MEASURES:
+        if m not in measures:
+            continue
+        conn.execute(
+            f"INSERT INTO sales_value_counts (measure, value, count) "
+            f"SELECT ?, {m}, SUM(sign) FROM {source} WHERE {where} AND {m} IS NOT NULL GROUP BY {m} "
+            f"ON CONFLICT (measure, value) DO UPDATE SET count = count + excluded.count",
+            (m, *params),
+        )
+        conn.execute("DELETE FROM sales_value_counts WHERE count <= 0")
+
+
+def _in_transaction(conn, work):
+    """Run `work()` in the caller's open transaction, else in one of its own."""
+    if conn.in_transaction:
+        return work()
+    with conn:
+        return work()
+
+
+@timed("incremental.migrate")
+def migrate(conn):
+    """Create (or rebuild after a column change) the change log, triggers and aggregates.
+
+    The only place these are created; call it after creating or altering the
+    `sales` table. Returns the rows seeded or changes folded in.
+    """
+    dims, measures = layout(conn)
+    if not dims and not measures:
+        return 0
+
+    def work():
+        if not _installed(conn, dims, measures):
+            return _install(conn, dims, measures)
+        return _apply_changes(conn, dims, measures)
+    return _in_transaction(conn, work)
+
+
+@timed("incremental.refresh")
+def refresh(conn):
+    """Fold pending changes into the aggregates; False when they don't exist (scan instead)."""
+    dims, measures = layout(conn)
+    if not (dims or measures) or not _installed(conn, dims, measures):
+        incr("incremental.scan_fallbacks")
+        return False
+    _in_transaction(conn, lambda: _apply_changes(conn, dims, measures))
+    return True
+
+
+def _file_stamp(conn):
+    """Size and mtime of the database files, for versions without aggregates."""
+    path = next((r[2] for r in conn.execute("PRAGMA database_list") if r[1] == "main"), "")
+    stamp = []
+    for p in (path, path + "-wal"):
+        try:
+            st = os.stat(p)
+            stamp.append(f"{st.st_mtime_ns}-{st.st_size}")
+        except (FileNotFoundError, ValueError):
+            stamp.append("0")
+    return ".".join(stamp)
+
+
+def data_version(conn):
+    """Opaque version string that changes whenever the aggregated data changes."""
+    if not refresh(conn):
+        return "scan." + _file_stamp(conn)
+    return f"{_state(conn, 'epoch', 0)}.{_state(conn, 'version', 0)}"
+
+
+def measures(conn):
+    return layout(conn)[1]
+
+
+def summary(conn, by, measure_names):
+    """Sums of the given measures grouped by dimension columns, from the aggregates."""
+    import pandas as pd
+
+    by = [by] if isinstance(by, str) else list(by)
+    if refresh(conn):
+        select = ", ".join(by + [f"SUM(sum_{m}) AS {m}" for m in measure_names])
+        # Like pandas' groupby, NULL keys are left out ('' is a key of its own)
+        where = " AND ".join(f"{b} != {NULL_KEY}" for b in by)
+        source = "sales_agg"
+    else:
+        select = ", ".join([f"{b} AS {b}" for b in by] + [f"SUM({m}) AS {m}" for m in measure_names])
+        where = " AND ".join(f"{b} IS NOT NULL" for b in by)
+        source = "sales"
+    return pd.read_sql(
+        f"SELECT {select} FROM {source} WHERE {where} GROUP BY {', '.join(by)} ORDER BY {', '.join(by)}", conn
+    )
+
+
+def groups(conn):
+    """Row count and measure sums per (dimensions) group; NULL keys come back as None."""
+    import pandas as pd
+
+    dims, measures = layout(conn)
+    if refresh(conn):
+        select = [f"NULLIF({d}, {NULL_KEY}) AS {d}" for d in dims] + [f"sum_{m} AS {m}" for m in measures]
+        return pd.read_sql(f"SELECT {', '.join(select + ['row_count'])} FROM sales_agg", conn)
+    select = [f"{d} AS {d}" for d in dims] + [f"SUM({m}) AS {m}" for m in measures] + ["COUNT(*) AS row_count"]
+    group_by = f" GROUP BY {', '.join(dims)}" if dims else ""
+    return pd.read_sql(f"SELECT {', '.join(select)} FROM sales{group_by}", conn)
+
+
+def column_stats(conn, measure):
+    """Non-null count, sum and mean of a measure over the whole table."""
+    if refresh(conn):
+        sql = f"SELECT SUM(n_{measure}), SUM(sum_{measure}) FROM sales_agg"
+    else:
+        sql = f"SELECT COUNT({measure}), SUM({measure}) FROM sales"
+    n, total = conn.execute(sql).fetchone()
+    n = n or 0
+    return {"count": n, "sum": total, "mean": (total / n) if n else float("nan")}
+
+
+def median(conn, measure):
+    """Median (pandas convention: mean of the two middle values) from the value counts."""
+    if refresh(conn) and measure in MEDIAN_MEASURES:
+        sql, params = "SELECT value, count FROM sales_value_counts WHERE measure = ? ORDER BY value", (measure,)
+    else:
+        sql, params = f"SELECT {measure}, COUNT(*) FROM sales WHERE {measure} IS NOT NULL GROUP BY 1 ORDER BY 1", ()
+    rows = conn.execute(sql, params).fetchall()
+    n = sum(c for _, c in rows)
+    if n == 0:
+        return float("nan")
+    lo_rank, hi_rank = (n - 1) // 2, n // 2
+    seen, lo = 0, None
+    for value, count in rows:
+        if lo is None and seen + count > lo_rank:
+            lo = value
+        if seen + count > hi_rank:
+            return (lo + value) / 2
+        seen += count
+    return float("nan")
@@ -0,0 +1,214 @@
+"""NumPy-only inference for the copilot model bundle.
+
+`export()` turns the joblib bundle (StandardScaler, MLPRegressor,
+LinearRegression, KMeans) into contiguous float32 `.npy` arrays plus a small
+JSON header (feature columns, target column, source bundle mtime). `load()`
+memory-maps them back, so serving predictions and cluster labels needs
+neither scikit-learn nor an unpickle, and features are built straight from
+the frame without `get_dummies`. Exporting is an explicit step (training,
+app startup or `python -m core.inference BUNDLE`); `load()` refuses a
+missing or stale artifact instead of importing scikit-learn to re-export.
+"""
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import timed
+
+ARTIFACT_SUFFIX = ".inference"
+HEADER_FILE = "model.json"
+# Bump when the set of exported arrays changes, so older artifacts count as stale
+ARTIFACT_VERSION = 2
+ACTIVATIONS = {
+    "identity": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "tanh": np.tanh,
+    "logistic": lambda x: 1.0 / (1.0 + np.exp(-x)),
+}
+
+_lock = threading.Lock()
+_models = {}
+
+
+class StaleArtifact(Exception):
+    """The inference artifact is missing or older than its bundle; export it again."""
+
+
+def artifact_path(bundle_path):
+    return os.path.splitext(bundle_path)[0] + ARTIFACT_SUFFIX
+
+
+def _f32(a):
+    a = np.array(a, dtype=np.float32, order="C")
+    # Flush float32 subnormals (common in trained MLP weights) to zero; they
+    # are numerically irrelevant but make matrix products many times slower
+    a[np.abs(a) < np.finfo(np.float32).tiny] = 0
+    return a
+
+
+@timed("inference.export")
+def export(bundle_path, out_dir=None):
+    """Write the float32 inference artifact for a joblib bundle; returns its directory."""
+    import joblib
+
+    bundle = joblib.load(bundle_path)
+    out_dir = out_dir or artifact_path(bundle_path)
+    os.makedirs(out_dir, exist_ok=True)
+
+    scaler, ann, linreg, kmeans = bundle["scaler"], bundle["ann"], bundle["linreg"], bundle["kmeans"]
+    n = len(bundle["feature_columns"])
+    arrays = {
+        "scaler_mean": scaler.mean_ if getattr(scaler, "mean_", None) is not None else np.zeros(n),
+        "scaler_scale": scaler.scale_ if getattr(scaler, "scale_", None) is not None else np.ones(n),
+        "linear_coef": np.ravel(linreg.coef_),
+        "linear_intercept": np.atleast_1d(linreg.intercept_),
+        "centroids": kmeans.cluster_centers_,
+    }
+    for i, (w, b) in enumerate(zip(ann.coefs_, ann.intercepts_)):
+        arrays[f"ann_w{i}"] = w
+        arrays[f"ann_b{i}"] = b
+    for name, a in arrays.items():
+        np.save(os.path.join(out_dir, name + ".npy"), _f32(a))
+
+    header = {
+        "feature_columns": list(bundle["feature_columns"]),
+        "target_col": bundle["target_col"],
+        "layers": len(ann.coefs_),
+        "activation": ann.activation,
+        "out_activation": ann.out_activation_,
+        "source_mtime": os.path.getmtime(bundle_path),
+        "version": ARTIFACT_VERSION,
+    }
+    # Header last: its presence marks a complete artifact
+    with open(os.path.join(out_dir, HEADER_FILE), "w", encoding="utf-8") as f:
+        json.dump(header, f, indent=2)
+    return out_dir
+
+
+class InferenceModel:
+    def __init__(self, path, mmap=True):
+        with open(os.path.join(path, HEADER_FILE), encoding="utf-8") as f:
+            header = json.load(f)
+        mode = "r" if mmap else None
+
+        def arr(name):
+            return np.load(os.path.join(path, name + ".npy"), mmap_mode=mode)
+
+        self.feature_columns = header["feature_columns"]
+        self.target_col = header["target_col"]
+        self.source_mtime = header.get("source_mtime")
+        self.mean, self.scale = arr("scaler_mean"), arr("scaler_scale")
+        self.layers = [(arr(f"ann_w{i}"), arr(f"ann_b{i}")) for i in range(header["layers"])]
+        self.activation = ACTIVATIONS[header["activation"]]
+        self.out_activation = ACTIVATIONS[header["out_activation"]]
+        self.coef, self.intercept = arr("linear_coef"), arr("linear_intercept")
+        self.centroids = arr("centroids")
+        self._centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+
+    def transform(self, X):
+        """Standardize a (rows, features) matrix."""
+        return (np.asarray(X, dtype=np.float32) - self.mean) / self.scale
+
+    def predict(self, X):
+        """MLP forward pass over a batch of raw (unscaled) feature rows."""
+        h = self.transform(X)
+        for i, (w, b) in enumerate(self.layers):
+            h = h @ w + b
+            h = self.activation(h) if i < len(self.layers) - 1 else self.out_activation(h)
+        return h[:, 0] if h.shape[1] == 1 else h
+
+    def predict_linear(self, X):
+        return self.transform(X) @ self.coef + self.intercept[0]
+
+    def cluster(self, X):
+        """Index of the nearest centroid for each row."""
+        Z = self.transform(X)
+        # |z - c|^2 without the per-row |z|^2 term, which does not change the argmin
+        return np.argmin(self._centroid_norms - 2.0 * (Z @ self.centroids.T), axis=1)
+
+    def feature_matrix(self, df):
+        """Model features from a frame: numeric columns as-is, `Col_Value` as one-hot of `Col`.
+
+        Matches `get_dummies(..., drop_first=True).reindex(feature_columns, fill_value=0)`
+        without materializing the dummies.
+        """
+        X = np.zeros((len(df), len(self.feature_columns)), dtype=np.float32)
+        text_cols = [c for c in df.columns if df[c].dtype == object or isinstance(df[c].dtype, pd.CategoricalDtype)]
+        for j, feature in enumerate(self.feature_columns):
+            if feature in df.columns and feature not in text_cols:
+                X[:, j] = df[feature].to_numpy(dtype=np.float32, na_value=np.nan)
+                continue
+            for col in text_cols:
+                prefix = f"{col}_"
+                if feature.startswith(prefix):
+                    value = feature[len(prefix):]
+                    values = df[col]
+                    if isinstance(values.dtype, pd.CategoricalDtype):
+                        cats = values.cat.categories.astype(str)
+                        hit = np.flatnonzero(cats == value)
+                        X[:, j] = (values.cat.codes.to_numpy() == hit[0]) if hit.size else 0
+                    else:
+                        X[:, j] = values.astype(str).to_numpy() == value
+                    break
+        return X
+
+
+def _read_header(path):
+    try:
+        with open(os.path.join(path, HEADER_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _current(header, mtime):
+    return header is not None and header.get("version") == ARTIFACT_VERSION and header.get("source_mtime") == mtime
+
+
+@timed("inference.load")
+def load(bundle_path):
+    """Memory-mapped inference model for a bundle; raises StaleArtifact if it needs exporting."""
+    bundle_path = os.path.abspath(bundle_path)
+    path = artifact_path(bundle_path)
+    mtime = os.path.getmtime(bundle_path)
+    with _lock:
+        model = _models.get(bundle_path)
+        if model is not None and model.source_mtime == mtime:
+            return model
+        header = _read_header(path)
+        if header is None:
+            raise StaleArtifact(f"No inference artifact for {bundle_path}; "
+                                f"run `python -m core.inference {bundle_path}` or retrain.")
+        if not _current(header, mtime):
+            raise StaleArtifact(f"The inference artifact of {bundle_path} predates the bundle or this version; "
+                                f"run `python -m core.inference {bundle_path}` or retrain.")
+        model = _models[bundle_path] = InferenceModel(path)
+        return model
+
+
+def is_current(bundle_path):
+    """Does the bundle have an artifact exported from its current version?"""
+    bundle_path = os.path.abspath(bundle_path)
+    try:
+        mtime = os.path.getmtime(bundle_path)
+    except FileNotFoundError:
+        return False
+    return _current(_read_header(artifact_path(bundle_path)), mtime)
+
+
+def export_if_stale(bundle_path):
+    """Explicit export step for processes that can import scikit-learn; returns whether it exported."""
+    if is_current(bundle_path):
+        return False
+    export(bundle_path)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a copilot bundle for NumPy-only inference")
+    parser.add_argument("bundle", help="joblib bundle written by the AI Copilot page")
+    export(parser.parse_args().bundle)
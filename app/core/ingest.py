@@ -0,0 +1,191 @@
+"""Bulk upsert of uploaded or programmatic batches into the sales table."""
+import hashlib
+import sqlite3
+import time
+
+import pandas as pd
+
+from . import incremental, io_pipeline
+from .instrumentation import incr, timed
+
+BATCH_SIZE = 50_000
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -262144,  # KiB, i.e. 256 MB of page cache
+    "temp_store": "MEMORY",
+}
+# Columns that identify a row on their own; used as the key when one is present and unique
+ID_COLUMNS = {"id", "order_id", "orderid", "transaction_id", "invoice_id", "row_id"}
+# Upserts refuse to silently drop more than this share of the rows as duplicate keys
+MAX_DUPLICATE_SHARE = 0.01
+
+
+def default_key_columns(df):
+    """A declared ID column whose values are unique in `df`, else no key (rows are appended).
+
+    Dimension columns (region, product, year, ...) are never inferred as a key:
+    many distinct sales share them, so upserting on them would merge real rows.
+    """
+    for col in df.columns:
+        if str(col).lower() in ID_COLUMNS and df[col].notna().all() and df[col].is_unique:
+            return [col]
+    return []
+
+
+def duplicate_keys(df, key_columns):
+    """Rows of `df` that repeat an earlier row's key (and would be dropped by an upsert)."""
+    if not key_columns:
+        return 0
+    return int(df.duplicated(subset=list(key_columns), keep="last").sum())
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def _prepare(df):
+    """Values SQLite can bind: dates as ISO text, categoricals as their values."""
+    out = df.copy()
+    for col in out.columns:
+        dtype = out[col].dtype
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            out[col] = out[col].dt.strftime("%Y-%m-%d").where(out[col].notna(), None)
+        elif isinstance(dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype(object)
+    return out
+
+
+def _ensure_schema(conn, df):
+    """Create/extend the sales table; returns {frame column: table column}."""
+    existing = {row[1].lower(): row[1] for row in conn.execute('PRAGMA table_info("sales")')}
+    if not existing:
+        cols = ", ".join(f"{_quote(c)} {_sql_type(df[c].dtype)}" for c in df.columns)
+        conn.execute(f'CREATE TABLE sales ({cols})')
+        return {c: c for c in df.columns}
+    mapping = {}
+    for col in df.columns:
+        name = existing.get(str(col).lower())
+        if name is None:
+            conn.execute(f"ALTER TABLE sales ADD COLUMN {_quote(col)} {_sql_type(df[col].dtype)}")
+            name = col
+        mapping[col] = name
+    return mapping
+
+
+def _ensure_key_index(conn, key_cols):
+    """Non-unique lookup index on the key; unique key indexes of older versions are dropped.
+
+    A unique index would make every later upsert on a different key set fail
+    on rows that are legitimately duplicated under the old key.
+    """
+    for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'sales' AND name LIKE 'sales_key_%'"
+    ).fetchall():
+        if conn.execute("SELECT \"unique\" FROM pragma_index_list('sales') WHERE name = ?", (name,)).fetchone()[0]:
+            conn.execute(f"DROP INDEX {_quote(name)}")
+    name = "sales_lookup_" + hashlib.sha1("|".join(key_cols).lower().encode()).hexdigest()[:10]
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON sales ({', '.join(map(_quote, key_cols))})")
+
+
+@timed("ingest.upsert_frame")
+def upsert_frame(df, key_columns=None, db_path=None, batch_size=BATCH_SIZE,
+                 max_duplicate_share=MAX_DUPLICATE_SHARE):
+    """Insert or update `df` in the sales table, matching rows on `key_columns`.
+
+    Without key columns (none given and no ID column, see `default_key_columns`)
+    every row is appended. Key values are compared NULL-safely (`IS`).
+    Duplicate keys within the batch keep the last row; if more than
+    `max_duplicate_share` of the rows would be dropped that way, a ValueError
+    is raised instead. Everything runs in one transaction with `executemany` in
+    batches of `batch_size`. Returns a report with row counts, elapsed seconds
+    and rows/sec.
+    """
+    start = time.perf_counter()
+    key_columns = list(key_columns) if key_columns else default_key_columns(df)
+    missing = [c for c in key_columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"Key columns not in data: {missing}")
+
+    rows_in = len(df)
+    dropped = duplicate_keys(df, key_columns)
+    if rows_in and dropped / rows_in > max_duplicate_share:
+        raise ValueError(
+            f"{dropped:,} of {rows_in:,} rows share a key on {key_columns} and would be dropped; "
+            "choose key columns that identify a single row."
+        )
+    batch = _prepare(df.drop_duplicates(subset=key_columns, keep="last") if key_columns else df)
+
+    conn = _connect(db_path or io_pipeline.DB_PATH)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            mapping = _ensure_schema(conn, batch)
+            # Before the writes, so the change-log triggers see this batch
+            incremental.migrate(conn)
+            table_cols = [mapping[c] for c in batch.columns]
+            table_keys = [mapping[c] for c in key_columns]
+            cols_sql = ", ".join(map(_quote, table_cols))
+            conn.execute("DROP TABLE IF EXISTS temp.upsert_batch")
+            conn.execute(f"CREATE TEMP TABLE upsert_batch ({cols_sql})")
+            insert_batch = f"INSERT INTO temp.upsert_batch VALUES ({', '.join('?' * len(table_cols))})"
+            for offset in range(0, len(batch), batch_size):
+                chunk = batch.iloc[offset:offset + batch_size]
+                conn.executemany(insert_batch, chunk.itertuples(index=False, name=None))
+
+            updated = 0
+            if table_keys:
+                _ensure_key_index(conn, table_keys)
+                match = " AND ".join(f"s.{_quote(k)} IS u.{_quote(k)}" for k in table_keys)
+                updates = [c for c in table_cols if c not in table_keys]
+                if updates:
+                    differs = " OR ".join(f"s.{_quote(c)} IS NOT u.{_quote(c)}" for c in updates)
+                    updated = conn.execute(
+                        f"SELECT COUNT(*) FROM temp.upsert_batch u WHERE EXISTS "
+                        f"(SELECT 1 FROM sales s WHERE {match} AND ({differs}))"
+                    ).fetchone()[0]
+                    conn.execute(
+                        f"UPDATE sales AS s SET {', '.join(f'{_quote(c)} = u.{_quote(c)}' for c in updates)} "
+                        f"FROM temp.upsert_batch u WHERE {match} AND ({differs})"
+                    )
+                new_rows = f" WHERE NOT EXISTS (SELECT 1 FROM sales s WHERE {match})"
+            else:
+                new_rows = ""
+            inserted = conn.execute(
+                f"INSERT INTO sales ({cols_sql}) SELECT {cols_sql} FROM temp.upsert_batch u{new_rows}"
+            ).rowcount
+            conn.execute("DROP TABLE temp.upsert_batch")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    incr("ingest.rows", len(batch))
+    return {
+        "rows_in": rows_in,
+        "duplicates_dropped": dropped,
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": len(batch) - inserted - updated,
+        "key_columns": key_columns,
+        "seconds": elapsed,
+        "rows_per_sec": len(batch) / elapsed if elapsed else float("inf"),
+    }
@@ -0,0 +1,114 @@
+import functools
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Only the most recent samples per span are kept for percentiles
+SAMPLES_PER_SPAN = 2048
+
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=SAMPLES_PER_SPAN))
+_calls = defaultdict(int)
+_total = defaultdict(float)
+_counters = defaultdict(float)
+
+
+def record(name, seconds):
+    with _lock:
+        _samples[name].append(seconds)
+        _calls[name] += 1
+        _total[name] += seconds
+
+
+@contextmanager
+def span(name):
+    """Time a block of code under `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed(name=None):
+    """Decorator version of `span`; defaults to module.function as the name."""
+    def decorate(func):
+        span_name = name or f"{func.__module__.split('.')[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def incr(name, value=1):
+    """Add to a counter (cache hits, rows scanned, bytes read, ...)."""
+    with _lock:
+        _counters[name] += value
+
+
+def _percentile(sorted_values, q):
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+def snapshot():
+    """Current span statistics (seconds) and counters."""
+    with _lock:
+        samples = {k: sorted(v) for k, v in _samples.items()}
+        calls, total, counters = dict(_calls), dict(_total), dict(_counters)
+    spans = {}
+    for name, values in samples.items():
+        if not values:
+            continue
+        spans[name] = {
+            "count": calls[name],
+            "total": total[name],
+            "mean": total[name] / calls[name],
+            "p50": _percentile(values, 0.50),
+            "p95": _percentile(values, 0.95),
+            "p99": _percentile(values, 0.99),
+            "max": values[-1],
+        }
+    return {"spans": spans, "counters": counters}
+
+
+def export_json(indent=2):
+    return json.dumps(snapshot(), indent=indent)
+
+
+def _metric_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name).strip("_").lower()
+
+
+def export_prometheus(prefix="sales_app"):
+    """Prometheus text exposition format (summaries for spans, counters as-is)."""
+    snap = snapshot()
+    lines = [
+        f"# HELP {prefix}_span_seconds Time spent in instrumented code paths.",
+        f"# TYPE {prefix}_span_seconds summary",
+    ]
+    for name, s in sorted(snap["spans"].items()):
+        label = f'span="{name}"'
+        for q in ("0.5", "0.95", "0.99"):
+            key = {"0.5": "p50", "0.95": "p95", "0.99": "p99"}[q]
+            lines.append(f'{prefix}_span_seconds{{{label},quantile="{q}"}} {s[key]:.9f}')
+        lines.append(f"{prefix}_span_seconds_sum{{{label}}} {s['total']:.9f}")
+        lines.append(f"{prefix}_span_seconds_count{{{label}}} {s['count']}")
+    for name, value in sorted(snap["counters"].items()):
+        metric = f"{prefix}_{_metric_name(name)}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _calls.clear()
+        _total.clear()
+        _counters.clear()
@@ -1,13 +1,16 @@
 import sqlite3
 import pandas as pd
 import os
+from . import incremental, normalize
+from .instrumentation import incr, span, timed
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "sales.db")
 CSV_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "sample_sales.csv")
 
 def init_db():
     """Ensure sales table exists, load from CSV if missing."""
-    conn = sqlite3.connect(DB_PATH)
+    with span("db.open"):
+        conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
     # Check if table exists
@@ -18,15 +21,42 @@ def init_db():
         # Load from CSV
         df = pd.read_csv(CSV_PATH)
         df.to_sql("sales", conn, index=False, if_exists="replace")
+        incremental.migrate(conn)
         print("✅ Loaded sample_sales.csv into database")
 
     conn.commit()
     conn.close()
 
+def migrate():
+    """Create or update the incremental aggregates of the sales table (a write step)."""
+    conn = connect()
+    try:
+        return incremental.migrate(conn)
+    finally:
+        conn.close()
+
+def connect():
+    """Open the sales database (creating the table if needed)."""
+    init_db()
+    return sqlite3.connect(DB_PATH)
+
+def data_version():
+    """Version of the sales table contents; changes after every write to it."""
+    conn = connect()
+    try:
+        return incremental.data_version(conn)
+    finally:
+        conn.close()
+
+@timed()
 def fetch_data():
-    """Fetch data from sales table."""
+    """Fetch data from sales table (column names as stored, compact dtypes)."""
     init_db()  # make sure table exists
     conn = sqlite3.connect(DB_PATH)
     df = pd.read_sql("SELECT * FROM sales", conn)
     conn.close()
+    incr("rows_scanned", len(df))
+    df = normalize.normalize(df)
+    # In-memory size of the loaded frame; SQLite page reads are not measured
+    incr("frame_bytes_loaded", int(df.memory_usage(index=False).sum()))
     return df
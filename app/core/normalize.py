@@ -0,0 +1,108 @@
+"""Compact in-memory representation for loaded sales frames.
+
+`pd.read_csv` / `pd.read_sql` leave text as Python objects and numbers as
+64-bit. `normalize()` canonicalizes column names once, turns repeated text
+(Region, Product, Stage, ...) into categoricals and downcasts integers where
+that loses nothing, which shrinks the frame and speeds up every groupby.
+Integers are never narrowed below 32 bits, so sums and products computed
+later on the frame don't wrap around. Floats stay float64: even values that
+round-trip exactly through float32 would be summed in float32 afterwards.
+"""
+import numpy as np
+import pandas as pd
+
+from .instrumentation import incr, timed
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+# Always categorical, whatever their cardinality
+CATEGORY_COLUMNS = {"region", "product", "stage"}
+# Narrowest integer type kept; int8/int16 overflow in ordinary arithmetic
+MIN_INT_DTYPE = np.int32
+# Text columns with these names are parsed as dates when nearly all values parse
+DATE_COLUMNS = {"date", "order_date", "orderdate", "day"}
+DATE_MIN_PARSED = 0.95
+
+
+def canonical_name(name, lowercase=False):
+    """Column name with surrounding/repeated whitespace removed (optionally lowercased)."""
+    name = " ".join(str(name).split())
+    return name.lower() if lowercase else name
+
+
+def canonicalize_columns(df, lowercase=False):
+    names = [canonical_name(c, lowercase) for c in df.columns]
+    # Leave the frame alone rather than create duplicate column names
+    if len(set(names)) < len(names):
+        return df
+    return df.set_axis(names, axis=1)
+
+
+def parse_dates(df):
+    """Date-named text columns as datetime64 (left alone if too few values parse)."""
+    out = df.copy(deep=False)
+    for col in df.columns:
+        name = str(col).lower()
+        values = df[col]
+        if values.dtype != object or not (name in DATE_COLUMNS or name.endswith("_date")):
+            continue
+        parsed = pd.to_datetime(values, errors="coerce", format="mixed")
+        if parsed.notna().sum() >= DATE_MIN_PARSED * values.notna().sum():
+            out[col] = parsed
+    return out
+
+
+def categorize(df, max_ratio=CATEGORY_MAX_RATIO):
+    """Object columns with few distinct values as `category` dtype."""
+    out = df.copy(deep=False)
+    for col in df.columns:
+        values = df[col]
+        if values.dtype != object:
+            continue
+        if str(col).lower() in CATEGORY_COLUMNS or values.nunique(dropna=True) <= max_ratio * len(values):
+            out[col] = values.astype("category")
+    return out
+
+
+def downcast(df):
+    """Smallest integer types (at least 32-bit) that hold the data; floats are left as they are."""
+    out = df.copy(deep=False)
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_bool_dtype(values.dtype):
+            continue
+        if pd.api.types.is_integer_dtype(values.dtype):
+            narrowed = pd.to_numeric(values, downcast="integer")
+            if narrowed.dtype.itemsize < np.dtype(MIN_INT_DTYPE).itemsize:
+                nullable = isinstance(narrowed.dtype, pd.api.extensions.ExtensionDtype)
+                narrowed = narrowed.astype("Int32" if nullable else MIN_INT_DTYPE)
+            out[col] = narrowed
+    return out
+
+
+def memory_report(before, after):
+    """Per-column dtype and bytes before/after normalization, plus a total row."""
+    rows = []
+    for old_col, new_col in zip(before.columns, after.columns):
+        rows.append({
+            "column": new_col,
+            "dtype before": str(before[old_col].dtype),
+            "dtype after": str(after[new_col].dtype),
+            "bytes before": int(before[old_col].memory_usage(index=False, deep=True)),
+            "bytes after": int(after[new_col].memory_usage(index=False, deep=True)),
+        })
+    report = pd.DataFrame(rows)
+    total = {"column": "TOTAL", "dtype before": "", "dtype after": "",
+             "bytes before": int(report["bytes before"].sum()), "bytes after": int(report["bytes after"].sum())}
+    return pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+
+
+@timed("normalize.frame")
+def normalize(df, lowercase=False):
+    """Canonical column names, parsed dates, categorical text and downcast numerics."""
+    out = downcast(categorize(parse_dates(canonicalize_columns(df, lowercase))))
+    incr("normalize.columns_categorized", sum(
+        isinstance(out[c].dtype, pd.CategoricalDtype) and not isinstance(d, pd.CategoricalDtype)
+        for c, d in zip(out.columns, df.dtypes)
+    ))
+    return out
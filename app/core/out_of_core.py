@@ -0,0 +1,184 @@
+"""Chunked execution of the dashboard aggregations for data larger than RAM.
+
+Sources are scanned in fixed-size chunks (SQLite via `pd.read_sql(chunksize=)`,
+Parquet via row-group batches) and reduced into partial aggregates, so memory
+is bounded by chunk size + number of groups, not by the number of rows.
+"""
+import heapq
+import itertools
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from .compute_tasks import apply_filters
+from .instrumentation import incr, timed
+from .sketches import QuantileSketch
+
+DEFAULT_CHUNKSIZE = 250_000
+
+
+def scan_sqlite(db_path, query="SELECT * FROM sales", chunksize=DEFAULT_CHUNKSIZE, params=None):
+    conn = sqlite3.connect(db_path)
+    try:
+        for chunk in pd.read_sql(query, conn, params=params, chunksize=chunksize):
+            incr("rows_scanned", len(chunk))
+            yield chunk
+    finally:
+        conn.close()
+
+
+def scan_parquet(path, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path)
+    for batch in pf.iter_batches(batch_size=chunksize, columns=columns):
+        chunk = batch.to_pandas()
+        incr("rows_scanned", len(chunk))
+        yield chunk
+
+
+def scan(source, chunksize=DEFAULT_CHUNKSIZE, columns=None):
+    """Chunks of a .parquet file or of the `sales` table of a SQLite file."""
+    if str(source).endswith(".parquet"):
+        return scan_parquet(source, columns=columns, chunksize=chunksize)
+    cols = ", ".join(f'"{c}"' for c in columns) if columns else "*"
+    return scan_sqlite(source, f"SELECT {cols} FROM sales", chunksize=chunksize)
+
+
+def peek(chunks):
+    """First chunk (or None) and an iterator that still yields every chunk."""
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return None, iter(())
+    return first, itertools.chain([first], chunks)
+
+
+class GroupAggregate:
+    """Mergeable per-group sum/count (and optional quantile sketches)."""
+
+    def __init__(self, by, columns, quantile_columns=(), k=200):
+        self.by = [by] if isinstance(by, str) else list(by)
+        self.columns = [columns] if isinstance(columns, str) else list(columns)
+        self.quantile_columns = list(quantile_columns)
+        self.k = k
+        self.sums = None
+        self.counts = None
+        self.sum_dtypes = None
+        self.sketches = {}
+
+    def update(self, chunk):
+        grouped = chunk.groupby(self.by, observed=True, sort=False)[self.columns]
+        sums, counts = grouped.sum(), grouped.count()
+        if self.sums is None:
+            self.sums, self.counts = sums, counts
+            self.sum_dtypes = sums.dtypes
+        else:
+            self.sums = self.sums.add(sums, fill_value=0)
+            self.counts = self.counts.add(counts, fill_value=0)
+        for col in self.quantile_columns:
+            for key, values in chunk.groupby(self.by, observed=True, sort=False)[col]:
+                if len(self.by) == 1 and isinstance(key, tuple):
+                    key = key[0]
+                sketch = self.sketches.setdefault((key, col), QuantileSketch(self.k))
+                sketch.update(values.to_numpy())
+        return self
+
+    def merge(self, other):
+        if other.sums is None:
+            return self
+        if self.sums is None:
+            self.sums, self.counts = other.sums, other.counts
+            self.sum_dtypes = other.sum_dtypes
+        else:
+            self.sums = self.sums.add(other.sums, fill_value=0)
+            self.counts = self.counts.add(other.counts, fill_value=0)
+        for key, sketch in other.sketches.items():
+            if key in self.sketches:
+                self.sketches[key].merge(sketch)
+            else:
+                self.sketches[key] = sketch
+        return self
+
+    def result(self, aggs=("sum",), quantiles=(0.5,)):
+        if self.sums is None:
+            return pd.DataFrame()
+        parts = {}
+        for agg in aggs:
+            if agg == "sum":
+                # `add(fill_value=0)` upcasts integer sums to float
+                part = self.sums.astype(self.sum_dtypes) if not self.sums.isna().any().any() else self.sums
+            elif agg == "count":
+                part = self.counts.astype("int64")
+            elif agg == "mean":
+                part = self.sums / self.counts.replace(0, np.nan)
+            else:
+                raise ValueError(f"unsupported aggregation {agg!r}")
+            parts[agg] = part
+        out = pd.concat(parts, axis=1) if len(parts) > 1 else next(iter(parts.values()))
+        for col in self.quantile_columns:
+            for q in quantiles:
+                out[f"{col}_q{int(q * 100)}"] = [
+                    self.sketches[(key, col)].quantile(q) if (key, col) in self.sketches else np.nan
+                    for key in out.index
+                ]
+        return out.sort_index()
+
+
+@timed("out_of_core.groupby_agg")
+def groupby_agg(chunks, by, columns, aggs=("sum",), filters=None, quantile_columns=(), quantiles=(0.5,)):
+    """Group-by aggregation (sum/count/mean, sketch quantiles) over chunks."""
+    agg = GroupAggregate(by, columns, quantile_columns)
+    for chunk in chunks:
+        agg.update(apply_filters(chunk, filters))
+    return agg.result(aggs, quantiles)
+
+
+@timed("out_of_core.top_n")
+def top_n(chunks, by, column, n, filters=None):
+    """Top `n` groups by summed `column`; only the per-group sums stay in memory."""
+    sums = groupby_agg(chunks, by, column, filters=filters)
+    if sums.empty:
+        return pd.Series(dtype=float, name=column)
+    best = heapq.nlargest(n, sums[column].items(), key=lambda kv: kv[1])
+    index = pd.Index([k for k, _ in best], name=sums.index.name)
+    return pd.Series([v for _, v in best], index=index, name=column)
+
+
+@timed("out_of_core.top_rows")
+def top_rows(chunks, column, n, filters=None):
+    """The `n` rows with the largest `column`, keeping a heap of at most n rows."""
+    heap = []
+    counter = itertools.count()
+    for chunk in chunks:
+        chunk = apply_filters(chunk, filters)
+        for _, row in chunk.nlargest(n, column).iterrows():
+            item = (row[column], next(counter), row)
+            if len(heap) < n:
+                heapq.heappush(heap, item)
+            elif item[0] > heap[0][0]:
+                heapq.heapreplace(heap, item)
+    rows = [r for _, _, r in sorted(heap, key=lambda t: (-t[0], t[1]))]
+    return pd.DataFrame(rows).reset_index(drop=True)
+
+
+@timed("out_of_core.totals")
+def totals(chunks, columns, filters=None):
+    """Column sums over all chunks."""
+    out = {}
+    for chunk in chunks:
+        chunk = apply_filters(chunk, filters)
+        for c in columns:
+            if c in chunk.columns:
+                out[c] = out.get(c, 0) + chunk[c].sum()
+    return out
+
+
+@timed("out_of_core.quantiles")
+def quantiles(chunks, column, qs=(0.25, 0.5, 0.75), filters=None, k=200):
+    """Approximate quantiles of a column using a mergeable sketch."""
+    sketch = QuantileSketch(k)
+    for chunk in chunks:
+        sketch.update(apply_filters(chunk, filters)[column].to_numpy())
+    return dict(zip(qs, sketch.quantiles(qs)))
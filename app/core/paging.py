@@ -0,0 +1,216 @@
+"""Random access to pages of rows of a SQLite table or a Parquet file.
+
+Viewers ask for `page(offset, limit)` and only those rows are read, so a
+grid over a multi-million-row table costs the rows on screen, not the table.
+
+SQLite pages in the table's natural order seek from a sparse index of
+rowids (one every `ANCHOR_ROWS` matching rows) instead of skipping `offset`
+rows; sorted pages use `ORDER BY ... LIMIT/OFFSET`. Parquet pages read only
+the row groups they overlap, and the last few row groups read are kept.
+Filters are {column: [values]} as in `compute_tasks.filter_mask`.
+"""
+import bisect
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from . import out_of_core
+from .compute_tasks import apply_filters, filter_mask
+from .instrumentation import incr, timed
+
+PAGE_ROWS = 200
+ANCHOR_ROWS = 10_000
+# Parquet row groups kept decoded (each up to ~1M rows of the shown columns)
+ROW_GROUP_CACHE = 2
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class SqliteRows:
+    """Filtered, optionally sorted view of a table in a SQLite file."""
+
+    sortable = True
+
+    def __init__(self, db_path, table="sales", filters=None, sort=None, descending=False):
+        self.db_path = db_path
+        self.table = table
+        self.filters = {c: list(v) for c, v in (filters or {}).items() if v}
+        self.sort = sort
+        self.descending = descending
+        self._local = threading.local()
+        self._count = None
+        self._anchors = None
+        self.columns = [r[1] for r in self._conn().execute(f"PRAGMA table_info({_quote(table)})")]
+        if not self.columns:
+            raise ValueError(f"No table {table!r} in {db_path}")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Read-only: browsing must never lock out the app's writers
+            uri = "file:" + os.path.abspath(self.db_path) + "?mode=ro"
+            conn = self._local.conn = sqlite3.connect(uri, uri=True, timeout=10)
+        return conn
+
+    def _where(self):
+        clauses, params = [], []
+        for col, values in self.filters.items():
+            clauses.append(f"{_quote(col)} IN ({', '.join('?' * len(values))})")
+            params += values
+        return clauses, params
+
+    def count(self):
+        if self._count is None:
+            clauses, params = self._where()
+            where = " WHERE " + " AND ".join(clauses) if clauses else ""
+            self._count = self._conn().execute(f"SELECT COUNT(*) FROM {_quote(self.table)}{where}", params).fetchone()[0]
+        return self._count
+
+    def build_anchors(self):
+        """Rowid of every `ANCHOR_ROWS`-th matching row, from one scan of the rowids."""
+        if self.sort is not None or self._anchors is not None:
+            return
+        clauses, params = self._where()
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        rows = self._conn().execute(
+            f"SELECT rn - 1, rid FROM (SELECT rowid AS rid, ROW_NUMBER() OVER (ORDER BY rowid) AS rn "
+            f"FROM {_quote(self.table)}{where}) WHERE (rn - 1) % ? = 0",
+            params + [ANCHOR_ROWS],
+        ).fetchall()
+        self._anchors = ([r[0] for r in rows], [r[1] for r in rows])
+
+    @timed("paging.sqlite_page")
+    def page(self, offset, limit=PAGE_ROWS):
+        clauses, params = self._where()
+        if self.sort is None:
+            skip = offset
+            if self._anchors and self._anchors[0]:
+                i = bisect.bisect_right(self._anchors[0], offset) - 1
+                clauses.append("rowid >= ?")
+                params.append(self._anchors[1][i])
+                skip = offset - self._anchors[0][i]
+            order = "rowid"
+        else:
+            skip = offset
+            order = f"{_quote(self.sort)}{' DESC' if self.descending else ''}, rowid"
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        sql = f"SELECT * FROM {_quote(self.table)}{where} ORDER BY {order} LIMIT ? OFFSET ?"
+        cursor = self._conn().execute(sql, params + [limit, skip])
+        out = pd.DataFrame.from_records(cursor.fetchall(), columns=self.columns)
+        out.index = pd.RangeIndex(offset, offset + len(out))
+        incr("paging.rows_read", len(out))
+        return out
+
+    def chunks(self, columns=None, chunksize=out_of_core.DEFAULT_CHUNKSIZE):
+        clauses, params = self._where()
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        cols = ", ".join(_quote(c) for c in columns) if columns else "*"
+        return out_of_core.scan_sqlite(self.db_path, f"SELECT {cols} FROM {_quote(self.table)}{where}",
+                                       chunksize=chunksize, params=params)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class ParquetRows:
+    """Filtered view of a Parquet file in file order."""
+
+    sortable = False
+
+    def __init__(self, path, filters=None):
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self._file = pq.ParquetFile(path)
+        self.columns = self._file.schema_arrow.names
+        meta = self._file.metadata
+        self._starts = np.cumsum([0] + [meta.row_group(i).num_rows for i in range(meta.num_row_groups)])
+        self.filters = {c: self._coerce(c, v) for c, v in (filters or {}).items() if v}
+        self._groups = OrderedDict()
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        # Positions of matching rows, found by scanning only the filter columns
+        self._positions = None
+
+    def _coerce(self, col, values):
+        kind = self._file.schema_arrow.field(col).type
+        if str(kind).startswith(("int", "uint", "float", "double")):
+            return pd.to_numeric(pd.Series(values), errors="coerce").dropna().tolist()
+        return list(values)
+
+    def _matches(self):
+        if self._positions is None:
+            parts, start = [], 0
+            for chunk in out_of_core.scan_parquet(self.path, columns=list(self.filters)):
+                parts.append(np.flatnonzero(filter_mask(chunk, self.filters)) + start)
+                start += len(chunk)
+            self._positions = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        return self._positions
+
+    def count(self):
+        return len(self._matches()) if self.filters else int(self._starts[-1])
+
+    def build_anchors(self):
+        if self.filters:
+            self._matches()
+
+    def _row_group(self, i):
+        with self._lock:
+            if i in self._groups:
+                self._groups.move_to_end(i)
+                return self._groups[i]
+        # ParquetFile readers are not safe to share between threads
+        with self._read_lock:
+            frame = self._file.read_row_group(i).to_pandas()
+        incr("paging.row_groups_read")
+        with self._lock:
+            self._groups[i] = frame
+            while len(self._groups) > ROW_GROUP_CACHE:
+                self._groups.popitem(last=False)
+        return frame
+
+    def _take(self, positions):
+        groups = np.searchsorted(self._starts, positions, side="right") - 1
+        parts = []
+        for g in np.unique(groups):
+            local = positions[groups == g] - self._starts[g]
+            parts.append(self._row_group(int(g)).iloc[local])
+        return pd.concat(parts) if parts else pd.DataFrame(columns=self.columns)
+
+    @timed("paging.parquet_page")
+    def page(self, offset, limit=PAGE_ROWS):
+        if self.filters:
+            positions = self._matches()[offset:offset + limit]
+        else:
+            positions = np.arange(offset, min(offset + limit, int(self._starts[-1])))
+        out = self._take(positions).reset_index(drop=True)
+        out.index = pd.RangeIndex(offset, offset + len(out))
+        incr("paging.rows_read", len(out))
+        return out
+
+    def chunks(self, columns=None, chunksize=out_of_core.DEFAULT_CHUNKSIZE):
+        needed = list(dict.fromkeys((columns or self.columns) + list(self.filters)))
+        for chunk in out_of_core.scan_parquet(self.path, columns=needed, chunksize=chunksize):
+            yield apply_filters(chunk, self.filters)[columns or self.columns]
+
+    def close(self):
+        with self._lock:
+            self._groups.clear()
+
+
+def open_rows(path, filters=None, sort=None, descending=False):
+    """Rows of a .parquet file or of the `sales` table of a SQLite file."""
+    if str(path).endswith(".parquet"):
+        if sort is not None:
+            raise ValueError("Parquet files can only be browsed in file order.")
+        return ParquetRows(path, filters)
+    return SqliteRows(path, filters=filters, sort=sort, descending=descending)
@@ -0,0 +1,135 @@
+"""What-if scenario sweeps for the copilot's predict command.
+
+A query such as "predict revenue for pipeline from 1000 to 10000 step 500 and
+latitude 10..40" is parsed into a parameter grid, expanded into one feature
+matrix and scored in a single batch by the NumPy inference model. Results
+are cached per (model, grid, baseline).
+"""
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import incr, timed
+
+MAX_POINTS = 1_000_000
+# Points per axis for a "a..b" range without an explicit step
+DEFAULT_STEPS = 21
+CACHE_SIZE = 32
+
+_NUMBER = r"-?\d+(?:\.\d+)?"
+_RANGE_FROM = re.compile(rf"([a-z_]+)\s+from\s+({_NUMBER})\s+to\s+({_NUMBER})(?:\s+step\s+({_NUMBER}))?")
+_RANGE_DOTS = re.compile(rf"([a-z_]+)\s*=?\s*({_NUMBER})\s*\.\.\s*({_NUMBER})(?:\s+step\s+({_NUMBER}))?")
+_LIST = re.compile(r"([a-z_]+)\s*(?:=|in)\s*\[([^\]]*)\]")
+_SINGLE = re.compile(rf"([a-z_]+)\s*=?\s*({_NUMBER})\b")
+
+_lock = threading.Lock()
+_cache = OrderedDict()
+
+
+def _axis(start, stop, step):
+    start, stop = float(start), float(stop)
+    if step:
+        step = abs(float(step))
+        if step == 0:
+            raise ValueError("Scenario step must be positive.")
+        n = int(np.floor(abs(stop - start) / step + 1e-9)) + 1
+        return start + np.sign(stop - start or 1) * step * np.arange(n)
+    if start.is_integer() and stop.is_integer() and abs(stop - start) < DEFAULT_STEPS:
+        return np.arange(start, stop + np.sign(stop - start or 1), np.sign(stop - start or 1))
+    return np.linspace(start, stop, DEFAULT_STEPS)
+
+
+def parse_grid(text):
+    """{name: values} from ranges ("x from a to b step s", "x a..b"), lists ("x in [a, b]") and "x=v"."""
+    text = text.lower()
+    grid = {}
+    for pattern in (_RANGE_FROM, _RANGE_DOTS):
+        for m in pattern.finditer(text):
+            grid.setdefault(m.group(1), _axis(m.group(2), m.group(3), m.group(4)))
+        text = pattern.sub(" ", text)
+    for m in _LIST.finditer(text):
+        values = [float(v) for v in re.findall(_NUMBER, m.group(2))]
+        if values:
+            grid.setdefault(m.group(1), np.array(values))
+    text = _LIST.sub(" ", text)
+    for m in _SINGLE.finditer(text):
+        grid.setdefault(m.group(1), np.array([float(m.group(2))]))
+    return grid
+
+
+def resolve(grid, feature_columns):
+    """Map parsed names onto model features (case-insensitive, `Col_Value` by its prefix).
+
+    Returns ({feature: values}, [ignored names]).
+    """
+    lookup = {}
+    for c in feature_columns:
+        lookup.setdefault(c.lower(), c)
+        lookup.setdefault(c.split("_")[0].lower(), c)
+    resolved, ignored = {}, []
+    for name, values in grid.items():
+        feature = lookup.get(name)
+        if feature is None:
+            ignored.append(name)
+        else:
+            resolved[feature] = values
+    return resolved, ignored
+
+
+def grid_size(grid):
+    return int(np.prod([len(v) for v in grid.values()])) if grid else 1
+
+
+def expand(grid, feature_columns, base=None):
+    """Cartesian product of the grid as a (points, features) float32 matrix.
+
+    Features not in the grid take their value from `base` (default 0).
+    """
+    n = grid_size(grid)
+    if n > MAX_POINTS:
+        raise ValueError(f"Scenario grid has {n:,} points; the limit is {MAX_POINTS:,}.")
+    base = base or {}
+    X = np.empty((n, len(feature_columns)), dtype=np.float32)
+    names = list(grid)
+    axes = np.meshgrid(*[grid[k] for k in names], indexing="ij") if names else []
+    for j, c in enumerate(feature_columns):
+        X[:, j] = axes[names.index(c)].ravel() if c in grid else base.get(c, 0.0)
+    return X
+
+
+def _cache_key(model, grid, base):
+    return (
+        id(model), model.source_mtime,
+        tuple((k, v.tobytes()) for k, v in sorted(grid.items())),
+        tuple(sorted((base or {}).items())),
+    )
+
+
+@timed("scenarios.evaluate")
+def evaluate(model, grid, base=None):
+    """Response surface: one row per grid point with the swept features and the prediction."""
+    key = _cache_key(model, grid, base)
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            incr("scenarios.cache_hits")
+            return _cache[key]
+    X = expand(grid, model.feature_columns, base)
+    columns = [c for c in model.feature_columns if c in grid]
+    surface = pd.DataFrame(X[:, [model.feature_columns.index(c) for c in columns]], columns=columns)
+    surface[model.target_col] = model.predict(X)
+    incr("scenarios.points", len(surface))
+    with _lock:
+        _cache[key] = surface
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return surface
+
+
+def pivot(surface, target_col):
+    """2-D table of the prediction over the first two swept features (others averaged)."""
+    x, y = surface.columns[0], surface.columns[1]
+    return surface.pivot_table(index=y, columns=x, values=target_col, aggfunc="mean")
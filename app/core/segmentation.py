@@ -0,0 +1,147 @@
+"""Customer/region segmentation with automatic cluster-count selection.
+
+MiniBatchKMeans is fitted on a row sample for every k in a range, in
+parallel; the k with the best sampled silhouette score wins. Per-row labels
+are then assigned in chunks with NumPy and cached per dataset, so repeated
+"focus low revenue clusters" queries only re-aggregate stored labels.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from . import dataset_store, disk_cache
+from .instrumentation import incr, span, timed
+
+K_RANGE = range(2, 9)
+FIT_SAMPLE = 100_000
+SILHOUETTE_SAMPLE = 5_000
+LABEL_CHUNK = 500_000
+BATCH_SIZE = 4_096
+RANDOM_STATE = 42
+
+_lock = threading.Lock()
+_segmentations = {}
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="segmentation")
+
+
+class Segmentation:
+    def __init__(self, features, mean, scale, centers, scores):
+        self.features = features
+        self.mean = mean
+        self.scale = scale
+        self.centers = centers
+        self.k = len(centers)
+        # {k: {"inertia": ..., "silhouette": ...}} for every candidate
+        self.scores = scores
+        self.labels = None
+        self._profiles = {}
+        # Sessions share cached segmentations
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def assign(self, X):
+        """Nearest-center labels for raw feature rows."""
+        Z = (np.asarray(X, dtype=np.float32) - self.mean) / self.scale
+        norms = np.einsum("ij,ij->i", self.centers, self.centers)
+        return np.argmin(norms - 2.0 * (Z @ self.centers.T), axis=1).astype(np.int32)
+
+    def profile(self, df, target):
+        """Rows, total and mean of `target` and feature means per cluster, lowest total first."""
+        with self._lock:
+            if target not in self._profiles:
+                cols = list(dict.fromkeys([target] + self.features))
+                grouped = df[cols].groupby(pd.Series(self.labels, index=df.index, name="Cluster"))
+                out = grouped[target].agg(rows="count", total="sum", average="mean")
+                out = out.join(grouped[self.features].mean().add_prefix("avg "))
+                self._profiles[target] = out.sort_values("total")
+            # Callers may add columns to the frame they get
+            return self._profiles[target].copy()
+
+
+def numeric_features(df, exclude=()):
+    return [c for c in df.select_dtypes(include=[np.number]).columns if c not in exclude]
+
+
+def _fit_one(Z, k, Z_eval):
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.metrics import silhouette_score
+
+    km = MiniBatchKMeans(n_clusters=k, batch_size=BATCH_SIZE, n_init=3, random_state=RANDOM_STATE).fit(Z)
+    labels = km.predict(Z_eval)
+    score = silhouette_score(Z_eval, labels) if len(np.unique(labels)) > 1 else -1.0
+    return km.cluster_centers_.astype(np.float32), {"inertia": float(km.inertia_), "silhouette": float(score)}
+
+
+@timed("segmentation.fit")
+def fit(df, features, k_range=K_RANGE):
+    """Fit every k on a sample in parallel and keep the best silhouette.
+
+    Values of k need more complete rows than clusters; larger ones are skipped.
+    """
+    X = df[features].to_numpy(dtype=np.float32, na_value=np.nan)
+    X = X[~np.isnan(X).any(axis=1)]
+    k_range = [k for k in k_range if k < len(X)]
+    if not k_range:
+        raise ValueError("Not enough complete rows to segment.")
+    rng = np.random.default_rng(RANDOM_STATE)
+    if len(X) > FIT_SAMPLE:
+        X = X[rng.choice(len(X), FIT_SAMPLE, replace=False)]
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.0
+    Z = (X - mean) / scale
+    Z_eval = Z[rng.choice(len(Z), min(SILHOUETTE_SAMPLE, len(Z)), replace=False)]
+
+    futures = {k: _executor.submit(_fit_one, Z, k, Z_eval) for k in k_range}
+    results = {k: f.result() for k, f in futures.items()}
+    best = max(results, key=lambda k: results[k][1]["silhouette"])
+    return Segmentation(features, mean, scale, results[best][0], {k: r[1] for k, r in results.items()})
+
+
+@timed("segmentation.segment")
+def segment(df, features=None, k_range=K_RANGE):
+    """Cached segmentation of a dataset, with labels for every row (all numeric columns by default)."""
+    features = list(numeric_features(df) if features is None else features)
+    if not features:
+        raise ValueError("No numeric features to segment on.")
+    key = (dataset_store.key_of(df) or dataset_store.dataset_hash(df), tuple(features), tuple(k_range))
+    with _lock:
+        if key in _segmentations:
+            incr("segmentation.cache_hits")
+            return _segmentations[key]
+    seg = disk_cache.get_or_compute(
+        "segmentation.segment", key[0], lambda: _fit_and_label(df, features, k_range),
+        kwargs={"features": features, "k_range": list(k_range)},
+    )
+    with _lock:
+        _segmentations[key] = seg
+        _prune()
+    return seg
+
+
+def _fit_and_label(df, features, k_range):
+    seg = fit(df, features, k_range)
+    with span("segmentation.assign"):
+        labels = np.empty(len(df), dtype=np.int32)
+        for start in range(0, len(df), LABEL_CHUNK):
+            part = df[features].iloc[start:start + LABEL_CHUNK].to_numpy(dtype=np.float32, na_value=np.nan)
+            # Missing values sit at the feature mean
+            labels[start:start + LABEL_CHUNK] = seg.assign(np.where(np.isnan(part), seg.mean, part))
+        seg.labels = labels
+    return seg
+
+
+def _prune():
+    """Forget segmentations of datasets evicted from the store."""
+    for k in [k for k in _segmentations if dataset_store.get(k[0]) is None]:
+        del _segmentations[k]
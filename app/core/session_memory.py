@@ -0,0 +1,295 @@
+"""Per-session memory accounting, with idle sessions' datasets spilled to disk.
+
+Every rerun registers its session with `touch()` and ends with `finish()`.
+Sessions idle for `IDLE_SECONDS`, and the least recently active ones
+whenever the stored datasets exceed the memory budget, have their uploaded
+dataset written to Parquet (once per dataset) and replaced in their session
+state by a `SpilledDataset` placeholder. That drops their reference, so the
+dataset store can free the frame. The next rerun of such a session reloads
+the dataset before any page code runs.
+
+A session is never spilled while one of its reruns is running: each session
+has a lock that `touch()`/`finish()` and the spill take, so a rerun starting
+during a spill waits for it and then reloads the dataset.
+
+Several app instances may share the repo, so each process spills into its
+own subdirectory of `SPILL_DIR` and only ever deletes files there (plus the
+directories of processes that stopped refreshing theirs long ago).
+"""
+import os
+import shutil
+import threading
+import time
+import weakref
+
+import pandas as pd
+
+from . import dataset_store
+from .instrumentation import incr, span
+
+SPILL_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "cache", "spill")
+IDLE_SECONDS = 15 * 60
+# Over budget, sessions idle at least this long are spilled too (never one mid-rerun)
+BUDGET_IDLE_SECONDS = 30
+SWEEP_SECONDS = 60
+# Spill directories not refreshed for this long belong to processes that are gone
+ORPHAN_SECONDS = 3600
+MEMORY_BUDGET_BYTES = dataset_store.MEMORY_BUDGET_BYTES
+DATASET_KEY = "uploaded_data"
+# Copilot chat history kept per session (the system prompt is always kept)
+MAX_CHAT_MESSAGES = 100
+
+_lock = threading.Lock()
+_sessions = {}
+_sweeper = None
+_started = time.time_ns()
+
+
+class SpilledDataset:
+    """Stands in for a session's dataset while it lives on disk."""
+
+    def __init__(self, key, path, rows, nbytes):
+        self.key = key
+        self.path = path
+        self.rows = rows
+        self.nbytes = nbytes
+
+    def __repr__(self):
+        return f"SpilledDataset({self.key}, {self.rows:,} rows)"
+
+
+def _current():
+    """(session id, session state) of the running script, or (None, None) outside Streamlit."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None, None
+    # The thread-safe wrapper is recreated on every rerun; the state behind it
+    # lives as long as the session, so that is what gets tracked
+    return ctx.session_id, getattr(ctx.session_state, "_state", ctx.session_state)
+
+
+def _spill_dir():
+    """This process's own spill directory (pid and start time, so a reused pid gets a new one)."""
+    return os.path.join(SPILL_DIR, f"{os.getpid()}-{_started}")
+
+
+def _spill_path(key):
+    return os.path.join(_spill_dir(), f"{key}.parquet")
+
+
+def touch(user=None):
+    """Mark the current session's rerun as running, reload its dataset if spilled and reclaim idle memory.
+
+    Returns False when the session's spilled dataset could not be reloaded (and was dropped).
+    """
+    session_id, state = _current()
+    if session_id is None:
+        return True
+    with _lock:
+        entry = _sessions.get(session_id)
+        if entry is None or entry["state"]() is not state:
+            entry = _sessions[session_id] = {
+                "state": weakref.ref(state), "lock": threading.Lock(), "running": False, "last_seen": time.time(),
+            }
+        entry["user"] = user
+    with entry["lock"]:
+        entry["running"] = True
+        entry["last_seen"] = time.time()
+        restored = restore(state)
+    _trim_chat(state)
+    start_sweeper()
+    reclaim(exclude=session_id)
+    return restored
+
+
+def finish():
+    """Mark the current session's rerun as done; it may be spilled once idle from now on."""
+    session_id, _ = _current()
+    with _lock:
+        entry = _sessions.get(session_id)
+    if entry is None:
+        return
+    with entry["lock"]:
+        entry["running"] = False
+        entry["last_seen"] = time.time()
+
+
+def restore(state):
+    """Swap a `SpilledDataset` placeholder in `state` back for the dataset.
+
+    If the spill file is gone or unreadable the placeholder is removed and
+    False returned, so the session continues without a dataset.
+    """
+    value = state[DATASET_KEY] if DATASET_KEY in state else None
+    if not isinstance(value, SpilledDataset):
+        return True
+    with span("session_memory.reload"):
+        view = dataset_store.acquire(value.key)
+        if view is None:
+            try:
+                df = pd.read_parquet(value.path)
+            except (OSError, ValueError):
+                del state[DATASET_KEY]
+                incr("session_memory.lost_spills")
+                return False
+            view = dataset_store.acquire(dataset_store.put(df, key=value.key))
+    state[DATASET_KEY] = view
+    incr("session_memory.reloads")
+    return True
+
+
+def _trim_chat(state):
+    history = state["chat_history"] if "chat_history" in state else None
+    if isinstance(history, list) and len(history) > MAX_CHAT_MESSAGES:
+        state["chat_history"] = history[:1] + history[-(MAX_CHAT_MESSAGES - 1):]
+
+
+def spill(state):
+    """Write the session's dataset to disk and drop its in-memory reference; returns bytes released.
+
+    Callers must hold the session's lock and know no rerun of it is running (see `_spill_idle`).
+    """
+    view = state[DATASET_KEY] if DATASET_KEY in state else None
+    key = dataset_store.key_of(view) if isinstance(view, pd.DataFrame) else None
+    if key is None:
+        return 0
+    path = _spill_path(key)
+    if not os.path.exists(path):
+        os.makedirs(_spill_dir(), exist_ok=True)
+        try:
+            with span("session_memory.spill"):
+                view.to_parquet(path + ".tmp", index=True, compression="zstd")
+            os.replace(path + ".tmp", path)
+        except (ValueError, TypeError, ImportError, OSError):
+            # Frames pyarrow can't write (mixed-type object columns) stay in memory
+            incr("session_memory.spill_errors")
+            return 0
+    nbytes = _stored_bytes().get(key, 0)
+    state[DATASET_KEY] = SpilledDataset(key, path, len(view), nbytes)
+    dataset_store.release(view)
+    # Free it now unless another session still uses the same dataset
+    dataset_store.discard(key)
+    incr("session_memory.spills")
+    return nbytes
+
+
+def _stored_bytes():
+    usage = dataset_store.memory_usage()
+    return dict(zip(usage["key"], usage["bytes"]))
+
+
+def _spill_idle(entry):
+    """Spill a session unless it is running (or just being touched); returns bytes released."""
+    if not entry["lock"].acquire(blocking=False):
+        return 0
+    try:
+        state = entry["state"]()
+        if entry["running"] or state is None:
+            return 0
+        return spill(state)
+    finally:
+        entry["lock"].release()
+
+
+def reclaim(exclude=None):
+    """Spill idle sessions, and the least recently active ones while over the memory budget."""
+    now = time.time()
+    with _lock:
+        for sid in [sid for sid, e in _sessions.items() if e["state"]() is None]:
+            del _sessions[sid]
+        candidates = sorted(
+            ((e["last_seen"], sid, e) for sid, e in _sessions.items() if sid != exclude and not e["running"]),
+            key=lambda c: c[:2],
+        )
+    spilled = 0
+    for last_seen, _, entry in candidates:
+        idle = now - last_seen
+        if idle < BUDGET_IDLE_SECONDS:
+            break
+        if idle < IDLE_SECONDS and dataset_store.total_bytes() <= MEMORY_BUDGET_BYTES:
+            break
+        spilled += _spill_idle(entry)
+    _remove_unused_spills()
+    return spilled
+
+
+def _remove_unused_spills():
+    """Delete this process's spill files no session placeholder points at, and orphaned directories."""
+    own = _spill_dir()
+    if os.path.isdir(own):
+        # Marks the directory as in use for other processes' orphan check
+        os.utime(own)
+        with _lock:
+            states = [e["state"]() for e in _sessions.values()]
+        wanted = {
+            os.path.basename(v.path) for s in states if s is not None
+            for v in [s[DATASET_KEY] if DATASET_KEY in s else None] if isinstance(v, SpilledDataset)
+        }
+        for name in os.listdir(own):
+            if name.endswith(".parquet") and name not in wanted:
+                try:
+                    os.remove(os.path.join(own, name))
+                except OSError:
+                    pass
+    try:
+        names = os.listdir(SPILL_DIR)
+    except FileNotFoundError:
+        return
+    cutoff = time.time() - ORPHAN_SECONDS
+    for name in names:
+        path = os.path.join(SPILL_DIR, name)
+        try:
+            if path != own and os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def start_sweeper():
+    """Reclaim memory every `SWEEP_SECONDS` even while no session reruns."""
+    global _sweeper
+    with _lock:
+        if _sweeper is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(SWEEP_SECONDS)
+                try:
+                    reclaim()
+                except Exception:
+                    incr("session_memory.sweep_errors")
+
+        _sweeper = threading.Thread(target=run, name="session-memory", daemon=True)
+        _sweeper.start()
+
+
+def report():
+    """Memory footprint per tracked session."""
+    now = time.time()
+    with _lock:
+        entries = [(sid, e["user"], e["last_seen"], e["running"], e["state"]()) for sid, e in _sessions.items()]
+    stored = _stored_bytes()
+    rows = []
+    for sid, user, last_seen, running, state in entries:
+        if state is None:
+            continue
+        data = state[DATASET_KEY] if DATASET_KEY in state else None
+        other = sum(
+            dataset_store.frame_nbytes(state[k]) for k in state
+            if k != DATASET_KEY and isinstance(state[k], pd.DataFrame)
+        )
+        history = state["chat_history"] if "chat_history" in state else []
+        rows.append({
+            "session": sid[:8],
+            "user": user,
+            "idle s": 0 if running else round(now - last_seen),
+            "dataset": "spilled" if isinstance(data, SpilledDataset) else ("in memory" if data is not None else "-"),
+            "dataset MB": (data.nbytes if isinstance(data, SpilledDataset)
+                           else stored.get(dataset_store.key_of(data), 0)) / 1e6,
+            "other frames MB": other / 1e6,
+            "chat messages": len(history),
+        })
+    return pd.DataFrame(rows)
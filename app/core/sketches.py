@@ -0,0 +1,149 @@
+import math
+
+import numpy as np
+
+
+class QuantileSketch:
+    """KLL-style mergeable quantile sketch.
+
+    Keeps O(k log(n/k)) values regardless of how many are added; rank error
+    is roughly 1.7 / k. Values are fed in batches (NumPy arrays) and sketches
+    built on different chunks can be merged.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        self.n += values.size
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if items.size < self._capacity(h):
+                h += 1
+                continue
+            grew = h + 1 == len(self.levels)
+            if grew:
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            keep = items[-1:] if items.size % 2 else items[:0]
+            pairs = items[: items.size - keep.size]
+            promoted = pairs[self._rng.integers(0, 2)::2]
+            self.levels[h] = keep
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            # A new top level shrinks the capacity of every level below it
+            h = 0 if grew else h + 1
+
+    def _weighted(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(lvl.size, 2 ** h, dtype=float) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        return values[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs):
+        if self.n == 0:
+            return [float("nan")] * len(qs)
+        values, cum = self._weighted()
+        idx = np.searchsorted(cum, np.asarray(qs, dtype=float) * cum[-1], side="left")
+        return values[np.clip(idx, 0, values.size - 1)].tolist()
+
+    def rank_error(self):
+        """Approximate normalized rank error of quantile answers."""
+        return 1.7 / self.k
+
+    def __len__(self):
+        return self.n
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter (2**p registers, ~1.04/sqrt(2**p) error)."""
+
+    def __init__(self, p=12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values):
+        import pandas as pd
+
+        values = np.asarray(values)
+        if values.size == 0:
+            return self
+        h = pd.util.hash_array(values.astype(object) if values.dtype.kind in "OUS" else values)
+        idx = (h >> np.uint64(64 - self.p)).astype(np.intp)
+        rest = h << np.uint64(self.p)
+        # Position of the leftmost 1-bit in the remaining 64-p bits
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = np.where(rest == 0, 64 - self.p + 1, 64 - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rank)
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(int)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+
+class StratifiedReservoir:
+    """Fixed-size uniform sample per stratum (bottom-k on random priorities).
+
+    Chunks can be added in any order; each stratum keeps the `k` rows with the
+    smallest random priority, which is a uniform sample without replacement,
+    alongside the exact row count of the stratum.
+    """
+
+    def __init__(self, strata, k=500, seed=None):
+        self.strata = list(strata)
+        self.k = k
+        self.sample = None
+        self.counts = None
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk):
+        import pandas as pd
+
+        chunk = chunk.assign(_priority=self._rng.random(len(chunk)))
+        counts = chunk.groupby(self.strata, observed=True, sort=False).size()
+        self.counts = counts if self.counts is None else self.counts.add(counts, fill_value=0).astype("int64")
+        pool = chunk if self.sample is None else pd.concat([self.sample, chunk], ignore_index=True)
+        ranked = pool.sort_values("_priority", kind="stable")
+        self.sample = ranked[ranked.groupby(self.strata, observed=True, sort=False).cumcount() < self.k]
+        return self
@@ -0,0 +1,252 @@
+"""Prefix-sum calendar index for instant date-range queries.
+
+Sales are bucketed per day per (region, product) into contiguous NumPy
+arrays holding running totals, so the sum over any date range is two array
+lookups per group: `cum[:, end + 1] - cum[:, start]`. MTD/QTD/YTD, YoY and
+rolling-window comparisons are built from those lookups instead of scans.
+
+Only filters on the group columns and a range on the date column can be
+answered this way; `answers()` tells callers when they must scan instead.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from . import dataset_store, incremental, io_pipeline
+from .instrumentation import incr, timed
+
+DATE_COLUMNS = ("date", "order_date", "orderdate", "day")
+GROUP_COLUMNS = ("region", "product")
+# Upper bound on groups x days x measures before coarser grouping is used
+MAX_CELLS = 20_000_000
+ROLLING_WINDOWS = (7, 30)
+
+_lock = threading.Lock()
+_indexes = {}
+
+
+def date_column(df):
+    """First datetime column, or a column named like a date."""
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col].dtype):
+            return col
+    for col in df.columns:
+        name = str(col).lower()
+        if name in DATE_COLUMNS or name.endswith("_date"):
+            return col
+    return None
+
+
+class TimeIndex:
+    def __init__(self, first_day, groups, cums, counts, date_col=None, undated=0, ungrouped=0):
+        self.first_day = first_day
+        # One row per group: the (region, product) values of each array row
+        self.groups = groups
+        self.cums = cums
+        self.counts = counts
+        self.n_days = counts.shape[1] - 1
+        self.date_col = date_col
+        # Rows left out of the arrays: no parseable date, or a missing group value
+        self.undated = undated
+        self.ungrouped = ungrouped
+
+    @property
+    def last_day(self):
+        return self.first_day + pd.Timedelta(days=self.n_days - 1)
+
+    @property
+    def measures(self):
+        return list(self.cums)
+
+    def _pos(self, day):
+        return int(np.clip((pd.Timestamp(day).normalize() - self.first_day).days, 0, self.n_days))
+
+    def unsupported(self, filters=None):
+        """Filter columns the index can't apply: not a group column (e.g. Year, or Product after coarsening)."""
+        return [c for c, v in (filters or {}).items()
+                if not (c in self.groups.columns and not isinstance(v, dict))
+                and not (c == self.date_col and isinstance(v, dict))]
+
+    def answers(self, filters=None):
+        """Whether totals under `filters` equal those of a scan of the indexed frame."""
+        has_range = isinstance((filters or {}).get(self.date_col), dict)
+        return (not self.unsupported(filters) and not self.ungrouped
+                and (not self.undated or has_range))
+
+    def _rows(self, filters=None):
+        unsupported = self.unsupported(filters)
+        if unsupported:
+            raise ValueError(f"The calendar index can't filter on {', '.join(map(str, unsupported))}.")
+        mask = np.ones(len(self.groups), dtype=bool)
+        for col, values in (filters or {}).items():
+            if col in self.groups.columns:
+                mask &= self.groups[col].isin(values).to_numpy()
+        return mask
+
+    def _span(self, start, end, filters):
+        """Array positions [lo, hi) of start..end (inclusive), narrowed by a date range filter."""
+        lo = self._pos(start if start is not None else self.first_day)
+        hi = self._pos(pd.Timestamp(end if end is not None else self.last_day) + pd.Timedelta(days=1))
+        bounds = (filters or {}).get(self.date_col)
+        if isinstance(bounds, dict):
+            # Range filters are start <= day < stop, as in compute_tasks.filter_mask
+            lo, hi = max(lo, self._pos(bounds["range"][0])), min(hi, self._pos(bounds["range"][1]))
+        return lo, max(lo, hi)
+
+    def total(self, measure, start=None, end=None, filters=None):
+        """Sum of `measure` (row count if None) for days start..end (inclusive) in the filtered groups."""
+        lo, hi = self._span(start, end, filters)
+        cum = self.cums[measure] if measure is not None else self.counts
+        return float((cum[:, hi] - cum[:, lo])[self._rows(filters)].sum())
+
+    def group_totals(self, measures, by, start=None, end=None, filters=None):
+        """Sums of `measures` per value of the group column `by`, like a filtered groupby().sum()."""
+        lo, hi = self._span(start, end, filters)
+        rows = self._rows(filters)
+        out = pd.DataFrame({m: (self.cums[m][:, hi] - self.cums[m][:, lo])[rows] for m in measures})
+        out[by] = self.groups[by].to_numpy()[rows]
+        out["_rows"] = (self.counts[:, hi] - self.counts[:, lo])[rows]
+        out = out.groupby(by, observed=True, sort=True).sum()
+        # Groups without rows in the range don't appear in a groupby of the filtered rows
+        return out[out.pop("_rows") > 0]
+
+    def daily(self, measure, start=None, end=None, filters=None):
+        """Per-day totals as a Series (for charts)."""
+        lo, hi = self._span(start, end, filters)
+        cum = self.cums[measure][self._rows(filters)].sum(axis=0)
+        days = pd.date_range(self.first_day + pd.Timedelta(days=lo), periods=max(hi - lo, 0), freq="D")
+        return pd.Series(np.diff(cum[lo:hi + 1]), index=days, name=measure)
+
+    def periods(self, measure, asof=None, filters=None):
+        """Period-to-date and rolling totals at `asof`, each with the same period a year earlier.
+
+        Returns {period: {"value", "previous", "yoy"}} for MTD, QTD, YTD and rolling windows.
+        The periods themselves set the dates, so a date range filter is ignored;
+        any filter the index can't apply raises ValueError.
+        """
+        filters = {c: v for c, v in (filters or {}).items() if c != self.date_col}
+        asof = pd.Timestamp(asof if asof is not None else self.last_day).normalize()
+        starts = {
+            "MTD": asof.replace(day=1),
+            "QTD": asof.replace(day=1, month=3 * ((asof.month - 1) // 3) + 1),
+            "YTD": asof.replace(day=1, month=1),
+        }
+        for n in ROLLING_WINDOWS:
+            starts[f"Rolling {n}d"] = asof - pd.Timedelta(days=n - 1)
+        year = pd.DateOffset(years=1)
+        out = {}
+        for name, start in starts.items():
+            value = self.total(measure, start, asof, filters)
+            previous = self.total(measure, start - year, asof - year, filters)
+            out[name] = {"value": value, "previous": previous, "yoy": (value / previous - 1) if previous else None}
+        return out
+
+
+def _group_columns(columns):
+    lookup = {str(c).lower(): c for c in columns}
+    return [lookup[g] for g in GROUP_COLUMNS if g in lookup]
+
+
+@timed("time_index.build")
+def build(df, date_col=None, measures=None):
+    """Index the numeric `measures` of a frame by day and (region, product)."""
+    date_col = date_col or date_column(df)
+    if date_col is None:
+        raise ValueError("No date column to index.")
+    dates = df[date_col]
+    if not pd.api.types.is_datetime64_any_dtype(dates.dtype):
+        dates = pd.to_datetime(dates, errors="coerce", format="mixed")
+    days = dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+    valid = ~np.isnat(days)
+    if not valid.any():
+        raise ValueError(f"Column {date_col!r} has no parseable dates.")
+    first = days[valid].min()
+    offsets = (days - first).astype(np.int64)
+    n_days = int(offsets[valid].max()) + 1
+
+    if measures is None:
+        measures = [c for c in df.select_dtypes(include=[np.number]).columns if c != date_col]
+    group_cols = _group_columns(df.columns)
+    # Drop the finest grouping until the arrays fit
+    while group_cols:
+        n_groups = df.groupby(group_cols, observed=True).ngroups
+        if n_groups * (n_days + 1) * (len(measures) + 1) <= MAX_CELLS:
+            break
+        group_cols = group_cols[:-1]
+
+    if group_cols:
+        grouper = df.groupby(group_cols, observed=True, sort=True)
+        codes = grouper.ngroup().to_numpy()
+        groups = grouper.size().index.to_frame(index=False)[group_cols]
+    else:
+        codes = np.zeros(len(df), dtype=np.int64)
+        groups = pd.DataFrame(index=[0])
+    undated = int((~valid).sum())
+    ungrouped = int((valid & (codes < 0)).sum())
+    valid &= codes >= 0
+    n_groups = len(groups)
+    flat = codes[valid] * n_days + offsets[valid]
+
+    def prefix(weights=None):
+        per_day = np.bincount(flat, weights=weights, minlength=n_groups * n_days).reshape(n_groups, n_days)
+        cum = np.zeros((n_groups, n_days + 1), dtype=np.float64 if weights is not None else np.int64)
+        np.cumsum(per_day, axis=1, out=cum[:, 1:])
+        return cum
+
+    cums = {}
+    for m in measures:
+        values = df[m].to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+        cums[m] = prefix(np.nan_to_num(values, nan=0.0))
+    incr("time_index.cells", n_groups * (n_days + 1) * (len(measures) + 1))
+    return TimeIndex(pd.Timestamp(first), groups, cums, prefix(), date_col, undated, ungrouped)
+
+
+def for_frame(df):
+    """Cached index of a stored dataset (built once per dataset)."""
+    key = dataset_store.key_of(df) or dataset_store.dataset_hash(df)
+    with _lock:
+        index = _indexes.get(key)
+    if index is None:
+        index = build(df)
+        with _lock:
+            _indexes[key] = index
+            _prune()
+    return index
+
+
+def for_sales_db():
+    """Index of the sales table, rebuilt from the incremental aggregates when the data changes.
+
+    `sales_agg` already holds per (region, product, date) sums maintained on
+    every ingest, so a rebuild costs O(groups x days), not a table scan (until
+    they are migrated, the same groups come from one grouped scan).
+    """
+    conn = io_pipeline.connect()
+    try:
+        version = incremental.data_version(conn)
+        with _lock:
+            index = _indexes.get(("sales_db", version))
+        if index is not None:
+            return index
+        dims, measures = incremental.layout(conn)
+        if "date" not in dims:
+            return None
+        agg = incremental.groups(conn)
+        agg = agg[agg["date"].notna() & (agg["date"] != "")]
+    finally:
+        conn.close()
+    index = build(agg, "date", measures + ["row_count"])
+    # Rows, not aggregate records, per day
+    index.counts = index.cums.pop("row_count").astype(np.int64)
+    with _lock:
+        for k in [k for k in _indexes if isinstance(k, tuple) and k[0] == "sales_db"]:
+            del _indexes[k]
+        _indexes[("sales_db", version)] = index
+    return index
+
+
+def _prune():
+    """Forget indexes of datasets evicted from the store."""
+    for k in [k for k in _indexes if not isinstance(k, tuple) and dataset_store.get(k) is None]:
+        del _indexes[k]
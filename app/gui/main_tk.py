@@ -1 +1,487 @@
+"""Desktop client for browsing, charting and scoring the sales data.
 
+Run from the `app` directory:
+
+    python -m gui.main_tk                    # the app's sales database
+    python -m gui.main_tk path/to/file.parquet
+
+The grid is virtual: the Treeview holds only as many items as fit on screen
+and their values are swapped in from `core.paging` pages as you scroll, with
+a bounded page cache. Counting, page reads, model scoring and chart
+aggregation run on worker threads and hand results back to the Tk thread
+through a queue, so the window never blocks on the data. Charts are redrawn
+after every scanned chunk instead of once at the end.
+"""
+import os
+import queue
+import sys
+import threading
+import time
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import filedialog, messagebox, ttk
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import inference, io_pipeline, paging  # noqa: E402
+from core.out_of_core import GroupAggregate  # noqa: E402
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "trained_ai_model.pkl")
+CACHE_PAGES = 50
+POLL_MS = 30
+CHART_TOP = 15
+# Minimum seconds between two partial chart redraws
+CHART_REFRESH = 0.25
+CHART_CHUNK_ROWS = 100_000
+PREDICTION_COLUMN = "Prediction"
+
+
+class Worker:
+    """Background threads whose results are delivered on the Tk thread."""
+
+    def __init__(self, root, threads=2):
+        self.root = root
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="tk-worker")
+        self._results = queue.Queue()
+        self.root.after(POLL_MS, self._poll)
+
+    def submit(self, fn, on_done, on_error=None):
+        """Run `fn()` on a worker; `on_done(result)` or `on_error(exception)` runs on the Tk thread."""
+        def run():
+            try:
+                self._results.put((on_done, fn()))
+            except Exception as e:
+                self._results.put((on_error or self.report, e))
+        self._pool.submit(run)
+
+    def post(self, callback, value):
+        """Queue `callback(value)` for the Tk thread (from any thread)."""
+        self._results.put((callback, value))
+
+    def report(self, error):
+        messagebox.showerror("Error", f"{type(error).__name__}: {error}")
+
+    def _poll(self):
+        try:
+            while True:
+                callback, value = self._results.get_nowait()
+                try:
+                    callback(value)
+                except Exception as e:
+                    self.report(e)
+        except queue.Empty:
+            pass
+        self.root.after(POLL_MS, self._poll)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class VirtualGrid(ttk.Frame):
+    """Treeview showing rows first..first+visible of a source with `total` rows."""
+
+    def __init__(self, master, worker, on_sort=None):
+        super().__init__(master)
+        self.worker = worker
+        self.on_sort = on_sort
+        self.tree = ttk.Treeview(self, show="headings", selectmode="browse")
+        self.scroll = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scroll.grid(row=0, column=1, sticky="ns")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+        self.tree.bind("<Configure>", lambda e: self._resize())
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(seq, self._on_wheel)
+        self.tree.bind("<Prior>", lambda e: self.scroll_by(-self.visible) or "break")
+        self.tree.bind("<Next>", lambda e: self.scroll_by(self.visible) or "break")
+        self.loader = None
+        self.columns = []
+        self.total = 0
+        self.first = 0
+        self.visible = 0
+        self.generation = 0
+        self._pages = OrderedDict()
+        self._pending = set()
+
+    def set_source(self, loader, columns, total):
+        """Show rows served by `loader(page_number)` -> DataFrame of up to PAGE_ROWS rows."""
+        self.generation += 1
+        self.loader, self.columns, self.total, self.first = loader, list(columns), total, 0
+        self._pages.clear()
+        self._pending.clear()
+        self.tree.delete(*self.tree.get_children())
+        self.tree["columns"] = self.columns
+        for col in self.columns:
+            self.tree.heading(col, text=col, command=lambda c=col: self.on_sort and self.on_sort(c))
+            self.tree.column(col, width=110, stretch=True, anchor="w")
+        self._resize()
+
+    def _resize(self):
+        style = ttk.Style()
+        row_height = int(style.lookup("Treeview", "rowheight") or 20)
+        header = 24
+        visible = max(1, (self.tree.winfo_height() - header) // row_height)
+        items = self.tree.get_children()
+        if len(items) < visible:
+            for _ in range(visible - len(items)):
+                self.tree.insert("", "end", values=())
+        elif len(items) > visible:
+            self.tree.delete(*items[visible:])
+        self.visible = visible
+        self.refresh()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.total))
+        elif action == "scroll":
+            self.scroll_by(int(amount) * (self.visible if unit == "pages" else 1))
+
+    def _on_wheel(self, event):
+        step = -3 if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0 else 3
+        self.scroll_by(step)
+        return "break"
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.first + rows)
+
+    def scroll_to(self, row):
+        self.first = max(0, min(row, self.total - self.visible))
+        self.refresh()
+
+    def refresh(self):
+        if self.loader is None:
+            return
+        if self.total:
+            self.scroll.set(self.first / self.total, min(1.0, (self.first + self.visible) / self.total))
+        else:
+            self.scroll.set(0, 1)
+        for i, item in enumerate(self.tree.get_children()):
+            row = self.first + i
+            if row >= self.total:
+                self.tree.item(item, values=())
+                continue
+            page = self._page(row // paging.PAGE_ROWS)
+            if page is None:
+                self.tree.item(item, values=["…"] * len(self.columns))
+            else:
+                values = page.loc[row] if row in page.index else None
+                self.tree.item(item, values=[] if values is None else [_cell(v) for v in values])
+        # Read ahead so steady scrolling never waits
+        self._page((self.first + self.visible) // paging.PAGE_ROWS + 1)
+
+    def _page(self, number):
+        if number * paging.PAGE_ROWS >= self.total:
+            return None
+        if number in self._pages:
+            self._pages.move_to_end(number)
+            return self._pages[number]
+        if number not in self._pending:
+            self._pending.add(number)
+            loader, generation = self.loader, self.generation
+
+            def load():
+                # Dragging the scrollbar queues many pages; skip those scrolled past meanwhile
+                return loader(number) if self._near(number) else None
+            self.worker.submit(load, lambda df: self._loaded(generation, number, df),
+                               lambda e: self._failed(generation, number, e))
+        return None
+
+    def _near(self, number):
+        first = self.first // paging.PAGE_ROWS
+        return first - 1 <= number <= (self.first + self.visible) // paging.PAGE_ROWS + 1
+
+    def _loaded(self, generation, number, df):
+        if generation != self.generation:
+            return
+        self._pending.discard(number)
+        if df is None:
+            return
+        self._pages[number] = df
+        while len(self._pages) > CACHE_PAGES:
+            self._pages.popitem(last=False)
+        first_page = self.first // paging.PAGE_ROWS
+        if first_page <= number <= (self.first + self.visible) // paging.PAGE_ROWS:
+            self.refresh()
+
+    def _failed(self, generation, number, error):
+        if generation == self.generation:
+            self._pending.discard(number)
+            self.worker.report(error)
+
+
+def _cell(value):
+    if isinstance(value, float):
+        return "" if np.isnan(value) else f"{value:,.2f}"
+    return "" if value is None else str(value)
+
+
+class ChartPanel(ttk.Frame):
+    """Bar chart of a measure per group, redrawn as chunks are aggregated."""
+
+    def __init__(self, master):
+        super().__init__(master)
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        self.figure = Figure(figsize=(5, 4), dpi=100)
+        self.ax = self.figure.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        self._labels = None
+        self._bars = None
+
+    def clear(self, title=""):
+        self.ax.clear()
+        self.ax.set_title(title)
+        self._labels = self._bars = None
+        self.canvas.draw_idle()
+
+    def update_bars(self, series, title):
+        """Show `series` (group -> value); bars are only rebuilt when the groups change."""
+        labels = [str(k) for k in series.index]
+        values = series.to_numpy(dtype=np.float64)
+        if labels != self._labels:
+            self.ax.clear()
+            self._bars = self.ax.barh(labels, values, color="#4C72B0")
+            self.ax.invert_yaxis()
+            self._labels = labels
+        else:
+            for bar, value in zip(self._bars, values):
+                bar.set_width(value)
+        self.ax.set_xlim(0, max(values.max() * 1.05, 1) if len(values) else 1)
+        self.ax.set_title(title)
+        self.figure.tight_layout()
+        self.canvas.draw_idle()
+
+
+class SalesBrowser(tk.Tk):
+    def __init__(self, path=None):
+        super().__init__()
+        self.title("Regional Sales Analyzer")
+        self.geometry("1280x760")
+        self.worker = Worker(self)
+        self.source = None
+        self.path = None
+        self.sort = None
+        self.descending = False
+        self.filters = {}
+        self.model = None
+        self.score = tk.BooleanVar(value=False)
+        self._chart_cancel = threading.Event()
+        self._build()
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.open(path or io_pipeline.DB_PATH)
+
+    # ---------------- layout ----------------
+    def _build(self):
+        bar = ttk.Frame(self, padding=4)
+        bar.pack(fill="x")
+        ttk.Button(bar, text="Open…", command=self._choose_file).pack(side="left")
+        ttk.Separator(bar, orient="vertical").pack(side="left", fill="y", padx=6)
+        ttk.Label(bar, text="Filter").pack(side="left")
+        self.filter_col = ttk.Combobox(bar, width=14, state="readonly")
+        self.filter_col.pack(side="left", padx=2)
+        self.filter_values = ttk.Entry(bar, width=24)
+        self.filter_values.pack(side="left", padx=2)
+        self.filter_values.bind("<Return>", lambda e: self._apply_filter())
+        ttk.Button(bar, text="Apply", command=self._apply_filter).pack(side="left")
+        ttk.Button(bar, text="Clear", command=self._clear_filters).pack(side="left", padx=2)
+        ttk.Separator(bar, orient="vertical").pack(side="left", fill="y", padx=6)
+        ttk.Checkbutton(bar, text="Score rows", variable=self.score, command=self._toggle_score).pack(side="left")
+        ttk.Separator(bar, orient="vertical").pack(side="left", fill="y", padx=6)
+        ttk.Label(bar, text="Chart").pack(side="left")
+        self.chart_measure = ttk.Combobox(bar, width=14, state="readonly")
+        self.chart_measure.pack(side="left", padx=2)
+        ttk.Label(bar, text="by").pack(side="left")
+        self.chart_by = ttk.Combobox(bar, width=14, state="readonly")
+        self.chart_by.pack(side="left", padx=2)
+        ttk.Button(bar, text="Draw", command=self.draw_chart).pack(side="left")
+
+        panes = ttk.PanedWindow(self, orient="horizontal")
+        panes.pack(fill="both", expand=True)
+        self.grid_view = VirtualGrid(panes, self.worker, on_sort=self._sort_by)
+        self.chart = ChartPanel(panes)
+        panes.add(self.grid_view, weight=3)
+        panes.add(self.chart, weight=2)
+
+        self.status = tk.StringVar()
+        ttk.Label(self, textvariable=self.status, anchor="w", padding=(6, 2)).pack(fill="x")
+
+    # ---------------- data ----------------
+    def _choose_file(self):
+        path = filedialog.askopenfilename(filetypes=[("Sales data", "*.db *.sqlite *.parquet"), ("All files", "*")])
+        if path:
+            self.filters, self.sort = {}, None
+            self.open(path)
+
+    def open(self, path):
+        """(Re)open `path` with the current filters and sort; counting runs in the background."""
+        self.path = path
+        self._chart_cancel.set()
+        self.status.set(f"Opening {os.path.basename(path)}…")
+
+        def load():
+            if os.path.abspath(path) == os.path.abspath(io_pipeline.DB_PATH):
+                io_pipeline.init_db()
+            source = paging.open_rows(path, self.filters, self.sort, self.descending)
+            total = source.count()
+            source.build_anchors()
+            sample = source.page(0, 1)
+            return source, total, sample
+
+        self.worker.submit(load, self._opened)
+
+    def _opened(self, result):
+        source, total, sample = result
+        if self.source is not None:
+            self.source.close()
+        self.source = source
+        numeric = [c for c in sample.columns if pd.api.types.is_numeric_dtype(sample[c])]
+        others = [c for c in sample.columns if c not in numeric]
+        self.filter_col["values"] = list(sample.columns)
+        self.chart_measure["values"] = numeric
+        self.chart_by["values"] = others or list(sample.columns)
+        if not self.filter_col.get() and others:
+            self.filter_col.set(others[0])
+        if self.chart_measure.get() not in numeric and numeric:
+            self.chart_measure.set(numeric[-1])
+        if self.chart_by.get() not in (others or list(sample.columns)):
+            self.chart_by.set((others or list(sample.columns))[0])
+        self._show()
+        if numeric and self.chart_by.get():
+            self.draw_chart()
+
+    def _columns(self):
+        cols = list(self.source.columns)
+        return cols + [PREDICTION_COLUMN] if self.score.get() and self.model is not None else cols
+
+    def _show(self):
+        source, model = self.source, self.model if self.score.get() else None
+
+        def load_page(number):
+            df = source.page(number * paging.PAGE_ROWS)
+            if model is not None and len(df):
+                df = df.assign(**{PREDICTION_COLUMN: model.predict(model.feature_matrix(df)).astype(np.float64)})
+            return df
+
+        self.grid_view.set_source(load_page, self._columns(), source.count())
+        self.status.set(self._describe())
+
+    def _describe(self):
+        described = ", ".join(f"{c} in {v}" for c, v in self.filters.items()) or "no filter"
+        order = f"; sorted by {self.sort}{' desc' if self.descending else ''}" if self.sort else ""
+        return f"{os.path.basename(self.path)}: {self.source.count():,} rows ({described}{order})"
+
+    def _apply_filter(self):
+        col = self.filter_col.get()
+        values = [v.strip() for v in self.filter_values.get().split(",") if v.strip()]
+        if not col:
+            return
+        if values:
+            self.filters[col] = values
+        else:
+            self.filters.pop(col, None)
+        self.open(self.path)
+
+    def _clear_filters(self):
+        self.filters = {}
+        self.filter_values.delete(0, "end")
+        self.open(self.path)
+
+    def _sort_by(self, col):
+        if col == PREDICTION_COLUMN or not getattr(self.source, "sortable", False):
+            self.status.set("This source can only be shown in file order.")
+            return
+        self.descending = not self.descending if self.sort == col else False
+        self.sort = col
+        self.open(self.path)
+
+    # ---------------- scoring ----------------
+    def _toggle_score(self):
+        if not self.score.get():
+            self._show()
+            return
+        if not os.path.exists(MODEL_PATH):
+            self.score.set(False)
+            messagebox.showinfo("No model", "Train a model on the AI Copilot page first.")
+            return
+        self.status.set("Loading model…")
+        self.worker.submit(lambda: inference.load(MODEL_PATH), self._model_loaded, self._model_failed)
+
+    def _model_loaded(self, model):
+        missing = [c for c in model.feature_columns
+                   if c not in self.source.columns and not any(c.startswith(f"{col}_") for col in self.source.columns)]
+        if missing:
+            self.score.set(False)
+            self.status.set(f"The model needs columns this data lacks: {', '.join(missing[:5])}")
+            return
+        self.model = model
+        self._show()
+
+    def _model_failed(self, error):
+        self.score.set(False)
+        self.worker.report(error)
+
+    # ---------------- chart ----------------
+    def draw_chart(self):
+        by, measure = self.chart_by.get(), self.chart_measure.get()
+        if self.source is None or not by or not measure:
+            return
+        self._chart_cancel.set()
+        cancel = self._chart_cancel = threading.Event()
+        source, total = self.source, self.source.count()
+        title = f"{measure} by {by}"
+        self.chart.clear(title)
+
+        def aggregate():
+            agg = GroupAggregate(by, measure)
+            done, last = 0, 0.0
+            for chunk in source.chunks([by, measure], chunksize=CHART_CHUNK_ROWS):
+                if cancel.is_set():
+                    return None
+                agg.update(chunk)
+                done += len(chunk)
+                if time.monotonic() - last >= CHART_REFRESH:
+                    last = time.monotonic()
+                    self.worker.post(lambda part: self._chart_progress(cancel, part),
+                                     (agg.result()[measure].nlargest(CHART_TOP), done))
+            return agg.result()[measure].nlargest(CHART_TOP), done
+
+        def finished(result):
+            if result is not None:
+                self._chart_progress(cancel, result, final=True)
+
+        self.worker.submit(aggregate, finished)
+        self.status.set(f"Charting {title} over {total:,} rows…")
+
+    def _chart_progress(self, cancel, part, final=False):
+        if cancel.is_set():
+            return
+        series, done = part
+        total = self.source.count()
+        suffix = "" if final else f" ({done / total:.0%} scanned)" if total else ""
+        self.chart.update_bars(series, f"{self.chart_measure.get()} by {self.chart_by.get()}{suffix}")
+        if final:
+            self.status.set(self._describe())
+
+    def close(self):
+        self._chart_cancel.set()
+        self.worker.shutdown()
+        if self.source is not None:
+            self.source.close()
+        self.destroy()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    SalesBrowser(argv[0] if argv else None).mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,10 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import io, os, json, contextlib, joblib, re, time
+import io, os, json, contextlib, re, time
 from datetime import datetime
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LinearRegression
-from sklearn.cluster import KMeans
-from sklearn.neural_network import MLPRegressor
-from sklearn.metrics import r2_score
+from core import catalog, compute, inference, scenarios, segmentation
+from core.instrumentation import span, timed
 
 MODEL_PATH = "trained_ai_model.pkl"
 MEMORY_PATH = "memory.json"
@@ -43,29 +39,16 @@ def add_memory_entry(title, content):
 
 # ---------------- DATA HELPERS ----------------
 def brief_df_summary(df: pd.DataFrame) -> str:
+    # Column statistics come from the dataset's catalog, not a rescan
     buf = io.StringIO()
     with contextlib.redirect_stdout(buf):
-        print(f"Rows: {len(df)} | Columns: {len(df.columns)}")
-        print("\nColumns & dtypes:")
-        print(df.dtypes)
-        print("\nMissing values per column:")
-        print(df.isna().sum())
-        print("\nPreview:")
+        print(catalog.for_frame(df).summary_text())
+        print("Preview:")
         print(df.head(5).to_string())
     return buf.getvalue()
 
-def parse_feature_pairs(text):
-    d = {}
-    for k,v in re.findall(r"([A-Za-z_]+)\s*=\s*([0-9\.]+)", text):
-        try: d[k]=float(v)
-        except: d[k]=v
-    for k,v in re.findall(r"([A-Za-z_]+)\s+([0-9]+(?:\.[0-9]+)?)", text):
-        if k not in d:
-            try: d[k]=float(v)
-            except: d[k]=v
-    return d
-
 # ---------------- MAIN PAGE ----------------
+@timed("page.ai_copilot")
 def show():
     st.set_page_config(page_title="AI Copilot (Persistent ML)", layout="wide")
     st.title("🧠 AI Copilot — Trainable Local Model + Memory")
@@ -102,7 +85,8 @@ def show():
 
     st.markdown("---")
     st.subheader("🧩 Train / Retrain AI Models")
-    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    cat = catalog.for_frame(df)
+    numeric_cols = cat.numeric_columns()
     if numeric_cols:
         target_col = st.selectbox("Choose numeric target", numeric_cols, index=0)
         train_epochs = st.slider("ANN epochs", 5, 200, 50)
@@ -110,10 +94,17 @@ def show():
 
         if st.button("Train / Retrain AI Copilot"):
             with st.spinner("Training models..."):
+                # scikit-learn and joblib are only needed to train; serving uses core.inference
+                import joblib
+                from sklearn.model_selection import train_test_split
+                from sklearn.preprocessing import StandardScaler
+                from sklearn.linear_model import LinearRegression
+                from sklearn.cluster import KMeans
+                from sklearn.neural_network import MLPRegressor
+                from sklearn.metrics import r2_score
                 try:
-                    df_pre = df.copy()
-                    target = df_pre[target_col].copy()
-                    obj_cols = df_pre.select_dtypes(include=['object','category']).columns.tolist()
+                    df_pre = df
+                    obj_cols = cat.categorical_columns()
                     if target_col in obj_cols: obj_cols.remove(target_col)
                     if obj_cols: df_pre = pd.get_dummies(df_pre, columns=obj_cols, drop_first=True)
                     feature_cols = [c for c in df_pre.columns if c != target_col]
@@ -146,6 +137,7 @@ def show():
                     # Save model
                     joblib.dump({"scaler":scaler,"ann":ann,"linreg":linreg,"kmeans":kmeans,
                                  "feature_columns":X.columns.tolist(),"target_col":target_col},MODEL_PATH)
+                    inference.export(MODEL_PATH)
 
                     # Evaluation
                     st.success("✅ Models trained and saved")
@@ -183,72 +175,102 @@ def show():
             cat_candidates=[c for c in df.columns if c.startswith(cat_col)]
             if cat_candidates and num_col in df.columns:
                 cat_col_used = cat_candidates[0]
-                out = df.groupby(cat_col_used)[num_col].sum().nlargest(n)
+                out = compute.run("top_n", df, by=cat_col_used, column=num_col, n=n)
                 st.chat_message("assistant").markdown(f"🔝 Top {n} {cat_col} by {num_col}:")
                 st.dataframe(out.reset_index())
                 # Plot
                 fig, ax = plt.subplots()
                 out.reset_index().plot(kind="bar", x=cat_col_used, y=num_col, ax=ax, color="skyblue")
                 ax.set_ylabel(num_col); ax.set_title(f"Top {n} {cat_col} by {num_col}")
-                st.pyplot(fig)
+                with span("render.matplotlib"): st.pyplot(fig)
+                plt.close(fig)
                 add_memory_entry(f"Top {n} {cat_col}", f"Computed top {n}")
                 handled=True
 
         # 3) TOTAL / AVG
         if "total" in text or "average" in text:
-            num_cols=df.select_dtypes(include=[np.number]).columns.tolist()
+            num_cols=cat.numeric_columns()
             for col in ["Region","Product","Stage"]:
                 col_candidates=[c for c in df.columns if c.startswith(col)]
                 if col_candidates and num_cols:
                     cat_col_used=col_candidates[0]
                     valcol=num_cols[0]
-                    total_val=df.groupby(cat_col_used)[valcol].sum()
+                    total_val=compute.run("groupby_sum", df, by=cat_col_used, columns=valcol)
                     st.chat_message("assistant").info(f"Total {valcol} by {cat_col_used}:")
                     st.dataframe(total_val.reset_index())
                     # Plot
                     fig, ax=plt.subplots()
                     total_val.plot(kind="bar", ax=ax,color="orange")
                     ax.set_ylabel(valcol); ax.set_title(f"Total {valcol} by {cat_col_used}")
-                    st.pyplot(fig)
+                    with span("render.matplotlib"): st.pyplot(fig)
+                    plt.close(fig)
                     add_memory_entry("Total query", f"Total {valcol} by {cat_col_used}")
                     handled=True
 
         # 4) PREDICTIONS
         if "predict" in text and os.path.exists(MODEL_PATH):
             try:
-                model_bundle=joblib.load(MODEL_PATH)
-                scaler, ann, feature_cols, target_col = model_bundle["scaler"], model_bundle["ann"], model_bundle["feature_columns"], model_bundle["target_col"]
-                pairs=parse_feature_pairs(text)
-                sample_vec=[pairs.get(c.split("_")[0],0.0) for c in feature_cols]
-                sample=np.array(sample_vec).reshape(1,-1)
-                pred=ann.predict(scaler.transform(sample))[0]
-                st.chat_message("assistant").success(f"🤖 Predicted {target_col}: {pred:.2f}")
-                add_memory_entry("Prediction", f"{text} -> {pred:.2f}")
+                model=inference.load(MODEL_PATH)
+                target_col = model.target_col
+                grid, ignored = scenarios.resolve(scenarios.parse_grid(text), model.feature_columns)
+                # Features not mentioned are 0, as in single-value predictions
+                surface=scenarios.evaluate(model, grid)
+                if ignored:
+                    st.caption(f"Ignored (not model features): {', '.join(ignored)}")
+                if len(surface)==1:
+                    pred=float(surface[target_col].iloc[0])
+                    st.chat_message("assistant").success(f"🤖 Predicted {target_col}: {pred:.2f}")
+                    add_memory_entry("Prediction", f"{text} -> {pred:.2f}")
+                else:
+                    swept=[c for c in surface.columns if c!=target_col]
+                    best=surface.loc[surface[target_col].idxmax()]
+                    st.chat_message("assistant").success(
+                        f"🤖 Scenario sweep over {', '.join(swept)}: {len(surface):,} points, "
+                        f"{target_col} from {surface[target_col].min():.2f} to {surface[target_col].max():.2f}")
+                    fig, ax=plt.subplots()
+                    if len(swept)==1:
+                        st.dataframe(surface)
+                        ax.plot(surface[swept[0]], surface[target_col], color="purple")
+                        ax.set_xlabel(swept[0]); ax.set_ylabel(target_col)
+                    else:
+                        table=scenarios.pivot(surface, target_col)
+                        st.dataframe(table if table.size<=2500 else surface.nlargest(20, target_col))
+                        im=ax.pcolormesh(table.columns, table.index, table.values, shading="auto", cmap="viridis")
+                        fig.colorbar(im, ax=ax, label=target_col)
+                        ax.set_xlabel(table.columns.name); ax.set_ylabel(table.index.name)
+                    ax.set_title(f"Predicted {target_col} response surface")
+                    with span("render.matplotlib"): st.pyplot(fig)
+                    plt.close(fig)
+                    add_memory_entry("Scenario sweep", f"{text} -> best {target_col} {best[target_col]:.2f} at "
+                                     + ", ".join(f"{c}={best[c]:g}" for c in swept))
                 handled=True
             except Exception as e:
                 st.warning(f"Prediction error: {e}")
 
         # 5) CLUSTER
-        if any(w in text for w in ["cluster","focus","recommend","improve"]) and os.path.exists(MODEL_PATH):
+        if any(w in text for w in ["cluster","focus","recommend","improve","segment"]):
             try:
-                model_bundle=joblib.load(MODEL_PATH)
-                scaler, kmeans, feature_cols, target_col = model_bundle["scaler"], model_bundle["kmeans"], model_bundle["feature_columns"], model_bundle["target_col"]
-                df_pre=df.copy()
-                obj_cols=df_pre.select_dtypes(include=['object','category']).columns.tolist()
-                if obj_cols: df_pre=pd.get_dummies(df_pre, columns=obj_cols, drop_first=True)
-                X_all=df_pre.reindex(columns=feature_cols, fill_value=0).values
-                labels=kmeans.predict(scaler.transform(X_all))
-                df["Cluster"]=labels
-                cluster_rev=df.groupby("Cluster")[target_col].sum().sort_values()
-                worst=cluster_rev.index[0]
-                st.chat_message("assistant").info(f"🔎 Cluster {worst} has lowest total {target_col}")
-                st.dataframe(cluster_rev.reset_index().rename(columns={target_col:"TotalRevenue"}))
+                num_cols=cat.numeric_columns()
+                # Rank segments by the measure named in the query, else Revenue
+                mentioned=[c for c in num_cols if c.lower() in text]
+                target_col=(mentioned or [c for c in num_cols if c=="Revenue"] or num_cols)[0]
+                with st.spinner("Segmenting dataset..."):
+                    seg=segmentation.segment(df, features=[c for c in num_cols if c!=target_col])
+                profile=seg.profile(df, target_col)
+                worst=profile.index[0]
+                best_sil=seg.scores[seg.k]["silhouette"]
+                st.chat_message("assistant").info(
+                    f"🔎 Cluster {worst} of {seg.k} has lowest total {target_col} (k chosen by silhouette {best_sil:.2f})")
+                st.dataframe(profile.reset_index())
+                with st.expander("Cluster-count selection"):
+                    st.dataframe(pd.DataFrame(seg.scores).T.rename_axis("k").reset_index())
                 # Cluster plot
                 fig, ax=plt.subplots()
-                cluster_rev.plot(kind="bar", ax=ax, color="lightgreen")
+                profile["total"].plot(kind="bar", ax=ax, color="lightgreen")
                 ax.set_ylabel(target_col); ax.set_title("Total per Cluster")
-                st.pyplot(fig)
-                add_memory_entry("Recommendation", f"Focus cluster {worst}")
+                with span("render.matplotlib"): st.pyplot(fig)
+                plt.close(fig)
+                add_memory_entry("Recommendation", f"Focus cluster {worst} (lowest total {target_col})")
                 handled=True
             except Exception as e:
                 st.warning(f"Clustering failed: {e}")
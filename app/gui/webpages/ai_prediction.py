@@ -1,11 +1,12 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error
 from io import BytesIO
+from core import artifacts, catalog, compute, dataset_store
+from core.chart_data import downsample_scatter
+from core.instrumentation import span, timed
 
+@timed("page.ai_prediction")
 def show():
     st.title("🤖 AI Predictions")
     
@@ -53,7 +54,7 @@ def show():
     st.dataframe(df.head())
 
     # 🎯 Select target column
-    numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns.tolist()
+    numeric_cols = catalog.for_frame(df).numeric_columns()
     if not numeric_cols:
         st.error("❌ No numeric columns found for prediction.")
         return
@@ -71,23 +72,14 @@ def show():
         st.warning("⚠️ Please select at least one feature to train the model.")
         return
 
-    # 🧑‍💻 Train-test split
-    X = df[feature_cols]
     y = df[target_col]
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
-
-    # 🤖 Train model
-    model = LinearRegression()
-    model.fit(X_train, y_train)
-
-    # 🔮 Predictions
-    predictions = model.predict(X_test)
+    # 🤖 Train model (on the shared compute backend when one is configured)
+    fit = compute.run("fit_linear", df, features=feature_cols, target=target_col)
+    y_test, predictions = fit["y_test"], fit["predictions"]
 
     # 📈 Model Performance (card style)
-    mse = mean_squared_error(y_test, predictions)
+    mse = fit["mse"]
     st.subheader("📊 Model Performance")
     st.markdown(
         f"""
@@ -109,19 +101,31 @@ def show():
     # 📉 Plot
     st.subheader("📉 Actual vs Predicted Plot")
     fig, ax = plt.subplots()
-    ax.scatter(y_test, predictions, alpha=0.7, color="#3498db", edgecolor="white")
+    # Large test sets are LTTB-downsampled so the figure stays a fixed size
+    plot_x, plot_y = downsample_scatter(y_test, predictions)
+    ax.scatter(plot_x, plot_y, alpha=0.7, color="#3498db", edgecolor="white")
     ax.plot([y.min(), y.max()], [y.min(), y.max()], "r--", lw=2)
     ax.set_xlabel("Actual")
     ax.set_ylabel("Predicted")
     ax.set_title(f"Actual vs Predicted {target_col}")
-    st.pyplot(fig)
+    with span("render.matplotlib"):
+        st.pyplot(fig)
 
     # ================== 💾 SAVE/DOWNLOAD SECTION ==================
     st.subheader("💾 Save Results")
 
+    # Results are also kept in the user's artifacts for the Reports page
+    user = st.session_state.get("username") or artifacts.SHARED_USER
+    # Reruns (widget changes elsewhere, downloads) only re-save when the prediction changed
+    key = dataset_store.key_of(df) or dataset_store.dataset_hash(df)
+    prediction_id = (user, key, target_col, tuple(feature_cols))
+    changed = st.session_state.get("saved_prediction") != prediction_id
+
     # Save DataFrame as CSV
     csv_buffer = BytesIO()
     results.to_csv(csv_buffer, index=False)
+    if changed:
+        artifacts.put(user, "predictions_results.csv", csv_buffer.getvalue())
     st.download_button(
         label="⬇️ Download Predictions (CSV)",
         data=csv_buffer.getvalue(),
@@ -132,6 +136,9 @@ def show():
     # Save Plot as PNG
     img_buffer = BytesIO()
     fig.savefig(img_buffer, format="png", bbox_inches="tight")
+    if changed:
+        artifacts.put(user, "predictions_plot.png", img_buffer.getvalue())
+        st.session_state["saved_prediction"] = prediction_id
     st.download_button(
         label="⬇️ Download Plot (PNG)",
         data=img_buffer.getvalue(),
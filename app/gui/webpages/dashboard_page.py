@@ -1,7 +1,9 @@
 import streamlit as st
 from streamlit_lottie import st_lottie
 import requests
+from core.instrumentation import timed
 
+@timed("net.lottie")
 def load_lottie_url(url: str):
     try:
         r = requests.get(url)
@@ -11,6 +13,7 @@ def load_lottie_url(url: str):
     except:
         return None
 
+@timed("page.dashboard")
 def show():
     st.title("🚀 Welcome to the Sales Dashboard")
 
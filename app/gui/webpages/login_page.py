@@ -2,6 +2,7 @@ import streamlit as st
 # security/auth.py
 import sqlite3
 from passlib.hash import bcrypt  
+from core.instrumentation import timed
 
 DB = "users.db"
 
@@ -36,6 +37,7 @@ def verify_user(username: str, password: str) -> bool:
 
 init_db()
 
+@timed("page.login")
 def show():
     if "logged_in" not in st.session_state:
         st.session_state["logged_in"] = False
@@ -1,17 +1,22 @@
 import streamlit as st
-import os
+import pandas as pd
+from datetime import datetime
 from streamlit_lottie import st_lottie
 import requests
+from core import artifacts
+from core.instrumentation import timed
 
+# Files older versions wrote here are shown as shared artifacts
 REPORTS_DIR = "uploads"
-os.makedirs(REPORTS_DIR, exist_ok=True)
 
+@timed("net.lottie")
 def load_lottieurl(url: str):
     r = requests.get(url)
     if r.status_code != 200:
         return None
     return r.json()
 
+@timed("page.reports")
 def show():
     st.title("📑 Download Reports")
 
@@ -21,19 +26,37 @@ def show():
 
     st.markdown("Download your **Visualizations** and **AI Prediction Reports** directly to your computer 📊💻")
 
-    files = os.listdir(REPORTS_DIR)
-    if files:
-        for file in files:
-            file_path = os.path.join(REPORTS_DIR, file)
-            with open(file_path, "rb") as f:
-                st.download_button(
-                    label=f"⬇️ Download {file}",
-                    data=f,
-                    file_name=file,
-                    mime="application/octet-stream",
-                    key=f"download-{file}" 
-                )
-    else:
+    user = st.session_state.get("username") or artifacts.SHARED_USER
+    artifacts.import_directory(REPORTS_DIR)
+    items = artifacts.list_artifacts(user)
+    if user != artifacts.SHARED_USER:
+        items += artifacts.list_artifacts(artifacts.SHARED_USER)
+    if not items:
         st.info("📂 No reports generated yet. Please run visualizations or predictions first.")
+        return
 
-    
\ No newline at end of file
+    st.dataframe(pd.DataFrame([
+        {"file": a["name"], "owner": a["user"] or "shared", "size KB": a["size"] / 1024,
+         "stored KB": a["stored_size"] / 1024, "created": datetime.fromtimestamp(a["created"])}
+        for a in items
+    ]), hide_index=True, use_container_width=True)
+
+    # Only the chosen artifact is read, not every file on each render
+    choice = st.selectbox("Report", range(len(items)),
+                          format_func=lambda i: f"{items[i]['name']} ({items[i]['user'] or 'shared'})")
+    item = items[choice]
+    st.download_button(
+        label=f"⬇️ Download {item['name']}",
+        data=artifacts.read(item["user"], item["name"]),
+        file_name=item["name"],
+        mime=item["content_type"],
+        key=f"download-{item['user']}-{item['name']}"
+    )
+    # Shared artifacts can't be deleted from here, whoever is logged in
+    if user != artifacts.SHARED_USER and item["user"] == user and st.button("🗑️ Delete"):
+        artifacts.delete(user, item["name"])
+        st.rerun()
+
+    used = artifacts.usage(user)
+    st.caption(f"{used['artifacts']} files, {used['bytes'] / 1e6:,.1f} MB of "
+               f"{artifacts.USER_QUOTA_BYTES / 1e6:,.0f} MB quota")
@@ -1,18 +1,64 @@
 import streamlit as st
 import pandas as pd
+import sqlite3
 import requests
+from core import approx, catalog, dataset_store, excel_ingest, ingest, io_pipeline, normalize
+from core.instrumentation import timed
 try:
     from streamlit_lottie import st_lottie
 except ImportError:
     st_lottie = None
     st.warning("The 'streamlit_lottie' package is not installed. Please install it with 'pip install streamlit-lottie' to enable animations.")
 
+@timed("net.lottie")
 def load_lottieurl(url: str):
     r = requests.get(url)
     if r.status_code != 200:
         return None
     return r.json()
 
+def share_dataset(df):
+    """Shared view of `df` with its column catalog and, when large, its sketches (no widgets)."""
+    # Identical uploads from different sessions share one frame
+    view = dataset_store.share(df)
+    # Column statistics for pickers, filters and the copilot summary
+    catalog.for_frame(view)
+    if len(df) >= approx.APPROX_MIN_ROWS:
+        approx.build(view)
+    return view
+
+def set_session_dataset(df):
+    """Put `df` in session state as a shared, deduplicated dataset."""
+    if "uploaded_data" in st.session_state:
+        dataset_store.release(st.session_state["uploaded_data"])
+    large = len(df) >= approx.APPROX_MIN_ROWS
+    with st.spinner("Building sketches for instant previews..." if large else "Preparing dataset..."):
+        st.session_state["uploaded_data"] = share_dataset(df)
+
+def excel_picker(uploaded_file):
+    """Sheet and column pickers for a workbook; returns (frame, load id) once loaded."""
+    path, digest = excel_ingest.stage(uploaded_file.getvalue(), uploaded_file.name, uploaded_file.file_id)
+    sheets = {s["sheet"]: s["rows"] for s in excel_ingest.list_sheets(path)}
+    chosen = st.multiselect(
+        "📑 Sheets", list(sheets), default=list(sheets)[:1],
+        format_func=lambda s: f"{s} (~{sheets[s]:,} rows)" if sheets[s] is not None else s
+    )
+    if not chosen:
+        return None, None
+    all_cols = list(dict.fromkeys(c for s in chosen for c in excel_ingest.sheet_columns(path, s)))
+    columns = st.multiselect("🧾 Columns", all_cols, default=all_cols)
+    if not columns or not st.button("Load workbook"):
+        return None, None
+
+    bar = st.progress(0.0, text="Parsing sheets...")
+
+    def progress(done, total, sheet):
+        bar.progress(done / total, text=f"Parsed {done}/{total} sheets" + (f" — {sheet}" if sheet else ""))
+
+    df = excel_ingest.load(path, digest, chosen, None if len(columns) == len(all_cols) else columns, progress)
+    return df, f"{uploaded_file.file_id}:{chosen}:{columns}"
+
+@timed("page.upload")
 def show():
     st.title("📂 Upload Sales Data")
     st.markdown("### Upload your CSV or Excel files for analysis")
@@ -30,23 +76,81 @@ def show():
 
         if uploaded_file is not None:
             try:
+                raw, load_id = None, None
                 if uploaded_file.name.endswith(".csv"):
-                    df = pd.read_csv(uploaded_file)
+                    # The uploader keeps its file across reruns; parse and normalize it only once
+                    if st.session_state.get("uploaded_file_id") != uploaded_file.file_id:
+                        raw, load_id = pd.read_csv(uploaded_file), uploaded_file.file_id
                 else:
-                    df = pd.read_excel(uploaded_file)
+                    raw, load_id = excel_picker(uploaded_file)
 
-                st.session_state["uploaded_data"] = df
+                if raw is not None:
+                    df = normalize.normalize(raw)
+                    st.session_state["memory_report"] = normalize.memory_report(raw, df)
+                    del raw
 
-                st.success("✅ Data uploaded successfully!")
-                st.dataframe(df.head())
+                    set_session_dataset(df)
+                    st.session_state["uploaded_file_id"] = load_id
+
+                if str(st.session_state.get("uploaded_file_id", "")).startswith(uploaded_file.file_id):
+                    st.success("✅ Data uploaded successfully!")
+                    st.dataframe(st.session_state["uploaded_data"].head())
+
+                report = st.session_state.get("memory_report")
+                if report is not None:
+                    before, after = report["bytes before"].iloc[-1], report["bytes after"].iloc[-1]
+                    with st.expander(f"🧮 Memory: {before / 1e6:,.1f} MB → {after / 1e6:,.1f} MB"):
+                        st.dataframe(report, hide_index=True)
+
+                if "uploaded_data" in st.session_state:
+                    with st.expander("📋 Column statistics"):
+                        st.dataframe(catalog.for_frame(st.session_state["uploaded_data"]).to_frame(), hide_index=True)
 
             except Exception as e:
                 st.error(f"❌ Error loading file: {e}")
 
     st.markdown("---")
     st.info("💡 Tip: Only CSV or Excel files are supported at the moment.")
+
+    if "uploaded_data" in st.session_state:
+        with st.expander("💾 Save to sales database"):
+            data = st.session_state["uploaded_data"]
+            key_cols = st.multiselect(
+                "Key columns (rows with the same key are updated instead of duplicated; none appends every row)",
+                data.columns.tolist(),
+                default=ingest.default_key_columns(data)
+            )
+            duplicates = ingest.duplicate_keys(data, key_cols)
+            allow_duplicates = False
+            if duplicates > ingest.MAX_DUPLICATE_SHARE * len(data):
+                st.warning(
+                    f"⚠️ {duplicates:,} of {len(data):,} rows repeat a key on {', '.join(key_cols)}; "
+                    "only the last row of each key would be saved."
+                )
+                allow_duplicates = st.checkbox("Drop those rows anyway")
+            if st.button("Save / update rows"):
+                try:
+                    with st.spinner("Writing to the sales database..."):
+                        report = ingest.upsert_frame(
+                            data, key_cols, max_duplicate_share=1.0 if allow_duplicates else ingest.MAX_DUPLICATE_SHARE
+                        )
+                    st.success(
+                        f"✅ {report['inserted']:,} rows inserted, {report['updated']:,} updated, "
+                        f"{report['unchanged']:,} unchanged "
+                        f"({report['duplicates_dropped']:,} duplicate keys dropped) — "
+                        f"{report['rows_per_sec']:,.0f} rows/sec"
+                    )
+                except (ValueError, sqlite3.Error) as e:
+                    st.error(f"❌ Could not save: {e}")
+
+    if st.button("📥 Load from sales database"):
+        set_session_dataset(io_pipeline.fetch_data())
+        st.success("✅ Loaded the persisted sales table.")
+
     if "uploaded_data" in st.session_state:
         if st.button("Clear Uploaded Data"):
-            del st.session_state["uploaded_data"]
+            dataset_store.release(st.session_state.pop("uploaded_data"))
+            st.session_state.pop("uploaded_file_id", None)
+            st.session_state.pop("memory_report", None)
             st.success("🗑️ Uploaded data cleared.")
 
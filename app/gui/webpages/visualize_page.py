@@ -2,14 +2,14 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import plotly.express as px
+import plotly.graph_objects as go
 import requests
-import os
 import random
 from streamlit_lottie import st_lottie
+from core import approx, catalog, compute, time_index
+from core.instrumentation import timed
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
+@timed("net.lottie")
 def load_lottieurl(url: str):
     try:
         r = requests.get(url)
@@ -30,12 +30,7 @@ def get_random_lottie():
 
 lottie_viz = get_random_lottie()
 
-def save_chart(fig, filename):
-    filepath = os.path.join(UPLOAD_DIR, filename)
-    fig.savefig(filepath, bbox_inches="tight")
-    return filepath
-
-
+@timed("page.visualize")
 def show():
     st.set_page_config(page_title="Regional Sales Dashboard", layout="wide")
     st.title("📊 Regional Sales Dashboard")
@@ -49,41 +44,101 @@ def show():
        
         st.sidebar.header("🔽 Filters")
 
-        if "Year" in df.columns:
-            year_filter = st.sidebar.multiselect(
-                "Select Year(s)",
-                sorted(df["Year"].unique()),
-                default=df["Year"].unique()
-            )
-            df = df[df["Year"].isin(year_filter)]
-
-        if "Region" in df.columns:
-            region_filter = st.sidebar.multiselect(
-                "Select Region(s)",
-                df["Region"].unique(),
-                default=df["Region"].unique()
-            )
-            df = df[df["Region"].isin(region_filter)]
-
-        if "Product" in df.columns:
-            product_filter = st.sidebar.multiselect(
-                "Select Product(s)",
-                df["Product"].unique(),
-                default=df["Product"].unique()
-            )
-            df = df[df["Product"].isin(product_filter)]
+        # Filters are applied by the compute backend together with each aggregation
+        filters = {}
+        # Filters that keep every value are left out of the approximate queries
+        active_filters = {}
+        cat = catalog.for_frame(df)
+        for col, label in (("Year", "Select Year(s)"), ("Region", "Select Region(s)"), ("Product", "Select Product(s)")):
+            if col not in df.columns:
+                continue
+            options = cat.options(col)
+            if options is None:
+                # Too many distinct values for a picker: filter on typed values instead
+                typed = st.sidebar.text_input(f"{label} (comma separated, empty for all)", key=f"filter_text_{col}")
+                selected = [v.strip() for v in typed.split(",") if v.strip()]
+                if selected and cat[col]["kind"] == "numeric":
+                    selected = pd.to_numeric(pd.Series(selected), errors="coerce").dropna().tolist()
+            else:
+                selected = st.sidebar.multiselect(label, options, default=options)
+            # An empty selection means no filter; `isin([])` would drop every row
+            if selected:
+                filters[col] = selected
+                if options is None or len(selected) < len(options):
+                    active_filters[col] = selected
 
-        
-        total_revenue = df["Revenue"].sum() if "Revenue" in df.columns else None
-        pipeline = df["Pipeline"].sum() if "Pipeline" in df.columns else None
-        revenue_goal = df["RevenueGoal"].sum() if "RevenueGoal" in df.columns else None
+        # Date ranges and period comparisons come from the prefix-sum calendar index
+        date_col = time_index.date_column(df)
+        tindex = None
+        if date_col is not None:
+            try:
+                tindex = time_index.for_frame(df)
+            except ValueError:
+                date_col = None
+        if tindex is not None:
+            first, last = tindex.first_day.date(), tindex.last_day.date()
+            picked = st.sidebar.date_input("Select date range", (first, last), min_value=first, max_value=last)
+            if isinstance(picked, (tuple, list)) and len(picked) == 2 and tuple(picked) != (first, last):
+                start, end = pd.Timestamp(picked[0]), pd.Timestamp(picked[1])
+                filters[date_col] = active_filters[date_col] = {"range": (start, end + pd.Timedelta(days=1))}
+
+        # Large datasets render from the ingestion-time sketches first
+        summary = None
+        if len(df) >= approx.APPROX_MIN_ROWS:
+            if st.sidebar.toggle("⚡ Approximate mode", value=True,
+                                 help="Instant estimates with 95% error bounds while exact results compute in the background."):
+                summary = approx.get(df) or approx.build(df)
+
+        # Totals the calendar index can answer exactly take two array lookups per group, not a scan
+        indexed = tindex is not None and tindex.answers(active_filters)
+
+        def grouped(by, columns):
+            if indexed and by in tindex.groups.columns and set(columns) <= set(tindex.measures):
+                return tindex.group_totals(columns, by, filters=active_filters)
+            return compute.run("groupby_sum", df, by=by, columns=columns, filters=filters)
+
+        kpi_columns = ["Revenue", "Pipeline", "RevenueGoal"]
+        errors = {}
+        if indexed and set(kpi_columns) & set(tindex.measures):
+            sums = {c: tindex.total(c, filters=active_filters) for c in kpi_columns if c in tindex.measures}
+        elif summary is not None:
+            exact_sums = approx.exact(df, "column_sums", columns=kpi_columns, filters=active_filters)
+            if exact_sums.done():
+                sums = exact_sums.result()
+            else:
+                estimates = summary.sums(kpi_columns, active_filters)
+                sums = {c: v for c, (v, _) in estimates.items()}
+                errors = {c: e for c, (_, e) in estimates.items()}
+        else:
+            sums = compute.run("column_sums", df, columns=kpi_columns, filters=filters)
+        total_revenue = sums.get("Revenue")
+        pipeline = sums.get("Pipeline")
+        revenue_goal = sums.get("RevenueGoal")
         forecast = (total_revenue / revenue_goal * 100) if total_revenue and revenue_goal else None
 
+        def bound(col):
+            return f"± ${errors[col]:,.0f} (95%)" if col in errors else None
+
         kpi1, kpi2, kpi3, kpi4 = st.columns(4)
-        kpi1.metric("💰 Revenue Won", f"${total_revenue:,.2f}" if total_revenue else "N/A")
-        kpi2.metric("📦 Qualified Pipeline", f"${pipeline:,.2f}" if pipeline else "N/A")
-        kpi3.metric("🎯 Revenue Goal", f"${revenue_goal:,.2f}" if revenue_goal else "N/A")
+        kpi1.metric("💰 Revenue Won", f"${total_revenue:,.2f}" if total_revenue else "N/A", help=bound("Revenue"))
+        kpi2.metric("📦 Qualified Pipeline", f"${pipeline:,.2f}" if pipeline else "N/A", help=bound("Pipeline"))
+        kpi3.metric("🎯 Revenue Goal", f"${revenue_goal:,.2f}" if revenue_goal else "N/A", help=bound("RevenueGoal"))
         kpi4.metric("📈 Forecast %", f"{forecast:.1f}%" if forecast else "N/A")
+        if errors:
+            st.caption("⚡ Approximate KPIs (hover for error bounds) — exact totals are being computed in the background.")
+            if st.button("🔄 Refine"):
+                st.rerun()
+
+        if tindex is not None and "Revenue" in tindex.measures:
+            asof = filters[date_col]["range"][1] - pd.Timedelta(days=1) if date_col in filters else tindex.last_day
+            unsupported = tindex.unsupported(active_filters)
+            if unsupported:
+                st.caption(f"📅 Period comparisons are not available with a {', '.join(map(str, unsupported))} filter.")
+            else:
+                periods = tindex.periods("Revenue", asof, active_filters)
+                st.caption(f"📅 Revenue as of {asof:%Y-%m-%d} vs the same period a year earlier")
+                for col, (name, p) in zip(st.columns(len(periods)), periods.items()):
+                    col.metric(name, f"${p['value']:,.0f}", f"{p['yoy']:+.1%}" if p["yoy"] is not None else None)
 
         st.markdown("---")
 
@@ -95,7 +150,7 @@ def show():
         with row1_col1:
             st.subheader("🔄 Revenue by Sales Stage")
             if {"Stage", "Revenue"}.issubset(df.columns):
-                stage_rev = df.groupby("Stage")["Revenue"].sum().reset_index()
+                stage_rev = compute.run("groupby_sum", df, by="Stage", columns="Revenue", filters=filters).reset_index()
                 fig = px.funnel(
                     stage_rev,
                     x="Revenue",
@@ -110,7 +165,7 @@ def show():
         with row1_col2:
             st.subheader("📦 Revenue Won & Pipeline by Product")
             if {"Product", "Revenue", "Pipeline"}.issubset(df.columns):
-                prod = df.groupby("Product")[["Revenue", "Pipeline"]].sum().reset_index()
+                prod = grouped("Product", ["Revenue", "Pipeline"]).reset_index()
                 fig = px.bar(
                     prod,
                     x="Product",
@@ -125,7 +180,7 @@ def show():
         with row2_col1:
             st.subheader("🌍 Forecast by Territory")
             if {"Region", "Revenue", "Latitude", "Longitude"}.issubset(df.columns):
-                region_sales = df.groupby(["Region", "Latitude", "Longitude"])["Revenue"].sum().reset_index()
+                region_sales = compute.run("groupby_sum", df, by=["Region", "Latitude", "Longitude"], columns="Revenue", filters=filters).reset_index()
                 try:
                     fig = px.scatter_geo(
                         region_sales,
@@ -147,7 +202,7 @@ def show():
         with row2_col2:
             st.subheader("📊 Forecast by Product")
             if {"Product", "Revenue", "Pipeline"}.issubset(df.columns):
-                prod = df.groupby("Product")[["Revenue", "Pipeline"]].sum()
+                prod = grouped("Product", ["Revenue", "Pipeline"])
                 prod["Forecast%"] = (prod["Revenue"] / prod["Pipeline"].replace(0, 1)) * 100
                 st.dataframe(prod.reset_index())
             else:
@@ -157,7 +212,47 @@ def show():
         st.subheader("📈 Extra Analysis")
 
         if "Revenue" in df.columns:
-            fig = px.box(df, y="Revenue", title="Revenue Distribution")
+            exact_box = None
+            if summary is not None:
+                exact_box = approx.exact(df, "box_stats", column="Revenue", filters=active_filters)
+            if exact_box is not None and not exact_box.done():
+                (low, q1, median, q3, high), rank_error = summary.quantiles("Revenue", filters=active_filters)
+                fig = go.Figure(go.Box(
+                    name="Revenue", q1=[q1], median=[median], q3=[q3], lowerfence=[low], upperfence=[high]
+                ))
+                fig.update_layout(title=f"Revenue Distribution (approx., ±{rank_error:.1%} rank error)")
+            else:
+                # Only the box statistics (and a capped outlier sample) are sent to the browser
+                if exact_box is not None:
+                    stats = exact_box.result()
+                else:
+                    stats = compute.run("box_stats", df, column="Revenue", filters=filters)
+                fig = go.Figure()
+                if stats:
+                    fig.add_trace(go.Box(
+                        name="Revenue", q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+                        lowerfence=[stats["lowerfence"]], upperfence=[stats["upperfence"]], mean=[stats["mean"]]
+                    ))
+                    if stats["outliers"]:
+                        fig.add_trace(go.Scatter(
+                            x=["Revenue"] * len(stats["outliers"]), y=stats["outliers"], mode="markers",
+                            marker=dict(size=4, opacity=0.5), name="Outliers", showlegend=False
+                        ))
+                fig.update_layout(title="Revenue Distribution")
+            st.plotly_chart(fig, use_container_width=True)
+            if exact_box is not None and not exact_box.done():
+                st.caption("⚡ Approximate quartiles — the exact box plot is being computed in the background.")
+                if st.button("🔄 Refine", key="refine_box"):
+                    st.rerun()
+
+            hist = compute.run("histogram", df, column="Revenue", bins=40, filters=filters)
+            edges = hist["edges"]
+            fig = go.Figure(go.Bar(
+                x=[(lo + hi) / 2 for lo, hi in zip(edges[:-1], edges[1:])],
+                y=hist["counts"],
+                width=[hi - lo for lo, hi in zip(edges[:-1], edges[1:])],
+            ))
+            fig.update_layout(title="Revenue Histogram", xaxis_title="Revenue", yaxis_title="Deals", bargap=0)
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("⚠️ Revenue column not found. Box plot cannot be displayed.")
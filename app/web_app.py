@@ -1,3 +1,5 @@
+import os
+import pandas as pd
 import streamlit as st
 from gui.webpages import (
     dashboard_page,
@@ -11,7 +13,21 @@ from gui.webpages import (
 from streamlit_lottie import st_lottie
 import requests
 import random
+from core import ai, analysis, disk_cache, inference, instrumentation, io_pipeline, session_memory
 
+# Sessions get shallow views of the shared frames (core.dataset_store); copy-on-write
+# keeps a session's edits from leaking into the frame every other session is looking at
+pd.set_option("mode.copy_on_write", True)
+
+# Comma separated users who may open the debug panel; nobody unless configured.
+# Usernames alone can't be trusted here since anyone can sign up under any free name
+ADMIN_USERS_ENV = "SALES_ADMIN_USERS"
+
+
+def admin_users():
+    return {u.strip() for u in os.environ.get(ADMIN_USERS_ENV, "").split(",") if u.strip()}
+
+@instrumentation.timed("net.lottie")
 def load_lottieurl(url: str):
     try:
         r = requests.get(url, timeout=5)
@@ -30,6 +46,52 @@ def get_random_lottie():
     ]
     return load_lottieurl(random.choice(lottie_urls))
 
+def show_debug_panel():
+    """Admin-only view of the in-process timing spans and counters."""
+    snap = instrumentation.snapshot()
+    st.markdown("---")
+    st.subheader("🛠️ Performance debug panel")
+    if snap["spans"]:
+        rows = [
+            {"span": name, "calls": s["count"], "p50 ms": s["p50"] * 1000,
+             "p95 ms": s["p95"] * 1000, "p99 ms": s["p99"] * 1000, "total s": s["total"]}
+            for name, s in sorted(snap["spans"].items(), key=lambda kv: -kv[1]["total"])
+        ]
+        st.dataframe(rows, use_container_width=True)
+    else:
+        st.info("No spans recorded yet.")
+    if snap["counters"]:
+        st.json(snap["counters"])
+    sessions = session_memory.report()
+    if not sessions.empty:
+        st.caption("Session memory")
+        st.dataframe(sessions, use_container_width=True)
+    cache_stats = disk_cache.stats()
+    if cache_stats:
+        st.caption("Persistent result cache")
+        st.dataframe(cache_stats, use_container_width=True)
+    col1, col2, col3 = st.columns(3)
+    col1.download_button("⬇️ JSON", instrumentation.export_json(), file_name="metrics.json", mime="application/json")
+    col2.download_button("⬇️ Prometheus", instrumentation.export_prometheus(), file_name="metrics.prom", mime="text/plain")
+    if col3.button("Reset metrics"):
+        instrumentation.reset()
+        st.rerun()
+    if st.button("Clear result cache"):
+        disk_cache.clear()
+        st.rerun()
+
+def warm_caches():
+    """Migrate the sales aggregates, fill the persistent cache and page in the model once per server process."""
+    disk_cache.warm_up([
+        io_pipeline.migrate,
+        analysis.sales_summary,
+        ai.predict_sales_trend,
+        # This process trains with scikit-learn anyway, so it may export a stale artifact
+        lambda: inference.export_if_stale(ai_copilot.MODEL_PATH),
+        lambda: inference.load(ai_copilot.MODEL_PATH),
+    ])
+
+warm_caches()
 lottie_menu = get_random_lottie()
 
 # ---------------- Session Setup ----------------
@@ -38,42 +100,57 @@ if "logged_in" not in st.session_state:
 if "username" not in st.session_state:
     st.session_state["username"] = ""
 
-# ---------------- Login Handling ----------------
-if not st.session_state["logged_in"]:
-    login_page.show()  
-else:
-    with st.sidebar:
-        st.title("📌 Navigation")
-
-        if lottie_menu:
-            st_lottie(lottie_menu, height=120, key="menu_anim")
-
-        page = st.radio(
-            "Go to",
-            ("Dashboard", "Upload Data", "Reports", "Visualizations", "AI Predictions", "AI Copilot"),
-            format_func=lambda x: f"➡️ {x}"
-        )
-
-        st.markdown("---")
-        st.sidebar.success(f"👤 Logged in as {st.session_state['username']}")
-
-        if st.button("🚪 Logout"):
-            st.session_state["logged_in"] = False
-            st.session_state["username"] = ""
-            st.rerun()
-
-    # ---------------- Page Routing ----------------
-    if page == "Dashboard":
-        dashboard_page.show()
-    elif page == "Upload Data":
-        upload_page.show()
-    elif page == "Reports":
-        reports_page.show()
-    elif page == "Visualizations":
-        visualize_page.show()
-    elif page == "AI Predictions":
-        ai_prediction.show()
-    elif page == "AI Copilot":
-        ai_copilot.show()
+# Reload this session's dataset if it was spilled while idle, and spill other idle sessions
+if not session_memory.touch(st.session_state["username"]):
+    st.warning("Your uploaded dataset was cleared from the server while you were away. Please upload it again.")
+
+# Until the script ends (also via st.rerun/st.stop), this session must not be spilled
+try:
+    # ---------------- Login Handling ----------------
+    if not st.session_state["logged_in"]:
+        login_page.show()  
     else:
-        st.error("Page not found.")
+        with st.sidebar:
+            st.title("📌 Navigation")
+
+            if lottie_menu:
+                st_lottie(lottie_menu, height=120, key="menu_anim")
+
+            page = st.radio(
+                "Go to",
+                ("Dashboard", "Upload Data", "Reports", "Visualizations", "AI Predictions", "AI Copilot"),
+                format_func=lambda x: f"➡️ {x}"
+            )
+
+            st.markdown("---")
+            st.sidebar.success(f"👤 Logged in as {st.session_state['username']}")
+
+            show_debug = False
+            if st.session_state["username"] in admin_users():
+                show_debug = st.checkbox("🛠️ Debug panel")
+
+            if st.button("🚪 Logout"):
+                st.session_state["logged_in"] = False
+                st.session_state["username"] = ""
+                st.rerun()
+
+        # ---------------- Page Routing ----------------
+        if page == "Dashboard":
+            dashboard_page.show()
+        elif page == "Upload Data":
+            upload_page.show()
+        elif page == "Reports":
+            reports_page.show()
+        elif page == "Visualizations":
+            visualize_page.show()
+        elif page == "AI Predictions":
+            ai_prediction.show()
+        elif page == "AI Copilot":
+            ai_copilot.show()
+        else:
+            st.error("Page not found.")
+
+        if show_debug:
+            show_debug_panel()
+finally:
+    session_memory.finish()
@@ -0,0 +1,305 @@
+"""Concurrent-session load test for the Streamlit app.
+
+From the repository root:
+
+    python -m benchmarks.load_test --sessions 40 --concurrency 4 --rows 10000,1000000
+    python -m benchmarks.load_test --rows 100000 --save-baseline
+    python -m benchmarks.load_test --rows 100000 --queries "summary|cluster focus"
+
+Each simulated session drives `app/web_app.py` through Streamlit's `AppTest`
+(in-process, no browser): login, upload, visualize filters, AI Predictions
+and copilot queries. AppTest swaps a process-wide runtime on every run, so
+concurrent sessions run in separate worker processes (`--concurrency`); the
+sessions given to one worker share its caches like sessions of one server do.
+Network calls (Lottie animations) are answered offline, and the app's
+working files (users.db, memory.json, uploads/) live in a temporary directory.
+So do a copy of the sales database and the result cache, spill, artifact and
+Excel cache directories: workers of one run share them like server
+instances sharing a checkout, but runs never read or fill the app's own.
+
+AppTest cannot drive the file uploader, so the upload step runs the upload
+page's own handling (`normalize`, then `upload_page.share_dataset`, which
+also builds the sketches of large frames) before rendering the page.
+
+Reports p50/p95/p99 rerun latency per step, peak RSS and throughput. Runs are
+appended to data/benchmarks/load_history.jsonl. Any page exception or error
+message, or a p95 slower than the baseline by more than --threshold, makes
+the run exit with 1 (and refuses to save a baseline).
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from benchmarks.run import _git_commit  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "app", "web_app.py")
+MODEL_PATH = os.path.join(ROOT, "trained_ai_model.pkl")
+HISTORY_PATH = os.path.join(ROOT, "data", "benchmarks", "load_history.jsonl")
+BASELINE_PATH = os.path.join(ROOT, "data", "benchmarks", "load_baseline.json")
+USERNAME, PASSWORD = "loadtest", "loadtest-password"
+DEFAULT_QUERIES = "summary|top 3 product by revenue|total revenue by region|cluster focus"
+
+# Per worker process
+_frames = {}
+
+
+class _Offline:
+    status_code = 503
+
+    def json(self):
+        return {}
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes, or None if unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _isolate(base_dir):
+    """Point the app's module-level data paths into the run's directory."""
+    from core import artifacts, disk_cache, excel_ingest, io_pipeline, session_memory
+
+    cache = os.path.join(base_dir, "cache")
+    disk_cache.CACHE_PATH = os.path.join(cache, "results.db")
+    session_memory.SPILL_DIR = os.path.join(cache, "spill")
+    excel_ingest.CACHE_DIR = os.path.join(cache, "excel")
+    artifacts.STORE_DIR = os.path.join(base_dir, "artifacts")
+    io_pipeline.DB_PATH = os.path.join(base_dir, "sales.db")
+
+
+def _init_worker(base_dir):
+    import warnings
+
+    import requests
+
+    warnings.filterwarnings("ignore")
+    requests.get = lambda *args, **kwargs: _Offline()
+    _isolate(base_dir)
+    workdir = tempfile.mkdtemp(prefix="worker-", dir=base_dir)
+    shutil.copy(os.path.join(base_dir, "users.db"), workdir)
+    if os.path.exists(MODEL_PATH):
+        os.symlink(MODEL_PATH, os.path.join(workdir, os.path.basename(MODEL_PATH)))
+    os.chdir(workdir)
+
+
+def _frame(rows):
+    if rows not in _frames:
+        from benchmarks.synthetic import generate_sales
+        _frames[rows] = generate_sales(rows)
+    return _frames[rows]
+
+
+def run_session(rows, queries, timeout):
+    """One analyst session; returns [(step, seconds, error)] and the worker's peak RSS."""
+    from streamlit.testing.v1 import AppTest
+
+    from core import normalize
+    from gui.webpages import upload_page
+
+    samples = []
+
+    def step(name, action):
+        start = time.perf_counter()
+        try:
+            at = action()
+            # Exceptions the page let through and ones it caught and showed with st.error
+            errors = [e.value for e in at.exception] + [e.value for e in at.error] if at is not None else []
+            error = "; ".join(map(str, errors)) or None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        samples.append((name, time.perf_counter() - start, error))
+        return error is None
+
+    def go_to(page):
+        return at.sidebar.radio[0].set_value(page).run()
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    if not step("login.page", at.run):
+        return samples, _peak_rss()
+    at.text_input(key="login_username").input(USERNAME)
+    at.text_input(key="login_password").input(PASSWORD)
+    if not step("login.submit", lambda: [b for b in at.button if b.label == "LOGIN"][0].click().run()) or not at.session_state["logged_in"]:
+        return samples, _peak_rss()
+
+    def ingest():
+        # The upload widget can't be driven by AppTest; run the page's handling of a parsed file
+        raw = _frame(rows)
+        df = normalize.normalize(raw)
+        at.session_state["memory_report"] = normalize.memory_report(raw, df)
+        at.session_state["uploaded_data"] = upload_page.share_dataset(df)
+    if not step("upload.ingest", ingest) or not step("upload.page", lambda: go_to("Upload Data")):
+        return samples, _peak_rss()
+
+    if step("visualize.page", lambda: go_to("Visualizations")):
+        region = [m for m in at.sidebar.multiselect if m.label == "Select Region(s)"]
+        if region:
+            step("visualize.filter", lambda: region[0].set_value(region[0].value[: max(1, len(region[0].value) // 2)]).run())
+
+    if step("predictions.page", lambda: go_to("AI Predictions")) and at.selectbox:
+        target = at.selectbox[0]
+        if len(target.options) > 1:
+            step("predictions.target", lambda: target.select(target.options[1]).run())
+
+    if step("copilot.page", lambda: go_to("AI Copilot")):
+        for query in queries:
+            def ask():
+                at.text_input[0].input(query)
+                return [b for b in at.button if b.label == "Send"][0].click().run()
+            step("copilot.query", ask)
+    return samples, _peak_rss()
+
+
+def _percentiles(values):
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": len(values), "p50": p50, "p95": p95, "p99": p99, "max": max(values)}
+
+
+def run_load(rows, sessions, concurrency, queries, timeout=120):
+    """Run `sessions` sessions over `concurrency` worker processes and summarise them."""
+    base_dir = tempfile.mkdtemp(prefix="sales-load-")
+    cwd = os.getcwd()
+    try:
+        from core import io_pipeline
+        if os.path.exists(io_pipeline.DB_PATH):
+            shutil.copy(io_pipeline.DB_PATH, os.path.join(base_dir, "sales.db"))
+        # Register the load-test user with the app's own login code
+        os.chdir(base_dir)
+        from gui.webpages import login_page
+        login_page.add_user(USERNAME, PASSWORD)
+        os.chdir(cwd)
+
+        # Workers must find these by module name: AppTest replaces their __main__
+        from benchmarks import load_test
+
+        samples, peaks, errors = defaultdict(list), {}, []
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=concurrency, initializer=load_test._init_worker,
+                                 initargs=(base_dir,)) as pool:
+            futures = [pool.submit(load_test.run_session, rows, queries, timeout) for _ in range(sessions)]
+            for i, future in enumerate(as_completed(futures)):
+                session, peak = future.result()
+                for name, seconds, error in session:
+                    samples[name].append(seconds)
+                    if error:
+                        errors.append(f"{name}: {error}")
+                peaks[i] = peak
+        wall = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+    reruns = sum(len(v) for v in samples.values())
+    peak_values = [p for p in peaks.values() if p is not None]
+    return {
+        "rows": rows,
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "wall_seconds": wall,
+        "reruns_per_sec": reruns / wall,
+        "sessions_per_min": sessions * 60 / wall,
+        "peak_rss_bytes": max(peak_values) if peak_values else None,
+        "errors": errors[:20],
+        "error_count": len(errors),
+        "steps": {name: _percentiles(values) for name, values in samples.items()},
+    }
+
+
+def print_report(result):
+    print(f"\n{result['rows']:,} rows, {result['sessions']} sessions, concurrency {result['concurrency']}")
+    print(f"{'step':22s} {'n':>5s} {'p50 ms':>10s} {'p95 ms':>10s} {'p99 ms':>10s} {'max ms':>10s}")
+    for name, s in result["steps"].items():
+        print(f"{name:22s} {s['count']:5d} {s['p50'] * 1000:10.1f} {s['p95'] * 1000:10.1f} "
+              f"{s['p99'] * 1000:10.1f} {s['max'] * 1000:10.1f}")
+    peak = result["peak_rss_bytes"]
+    print(f"throughput: {result['reruns_per_sec']:.2f} reruns/s, {result['sessions_per_min']:.1f} sessions/min; "
+          + (f"peak RSS per worker: {peak / 1e6:,.0f} MB" if peak else "peak RSS: n/a"))
+    if result["error_count"]:
+        print(f"❌ {result['error_count']} failed steps, e.g. {result['errors'][0]}")
+
+
+def compare(results, baseline, threshold):
+    """Steps whose p95 got slower than baseline * (1 + threshold)."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for name, s in result["steps"].items():
+            before = base["steps"].get(name)
+            if before and before["p95"] and s["p95"] / before["p95"] > 1 + threshold:
+                regressions.append({"run": key, "step": name, "baseline": before["p95"],
+                                    "current": s["p95"], "ratio": s["p95"] / before["p95"]})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regional sales concurrent-session load test")
+    parser.add_argument("--rows", default="10000", help="comma separated dataset sizes")
+    parser.add_argument("--sessions", type=int, default=20, help="sessions per dataset size")
+    parser.add_argument("--concurrency", type=int, default=4, help="sessions running at once (worker processes)")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="copilot queries, separated by |")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per rerun")
+    parser.add_argument("--threshold", type=float, default=0.3,
+                        help="allowed p95 slowdown against the baseline (0.3 = 30%%)")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    queries = [q.strip() for q in args.queries.split("|") if q.strip()]
+    results = {}
+    for rows in (int(r) for r in args.rows.split(",") if r):
+        result = run_load(rows, args.sessions, args.concurrency, queries, args.timeout)
+        print_report(result)
+        results[f"{rows}x{args.concurrency}"] = result
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "commit": _git_commit(),
+            "cpus": os.cpu_count(),
+            "results": results,
+        }) + "\n")
+
+    failed = any(r["error_count"] for r in results.values())
+    if args.save_baseline:
+        if failed:
+            print("❌ Not saving a baseline from a run with failed steps")
+            return 1
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"❌ Regression: {r['run']} {r['step']} p95 {r['baseline'] * 1000:.1f} ms -> "
+                  f"{r['current'] * 1000:.1f} ms ({r['ratio']:.2f}x)")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""Benchmarks for the core hot paths.
+
+From the repository root:
+
+    python -m benchmarks.run --sizes 10000,1000000,10000000
+    python -m benchmarks.run --sizes 10000 --save-baseline
+    python -m benchmarks.run --sizes 10000 --only copilot
+
+Every run is appended to data/benchmarks/history.jsonl (not tracked by git);
+timings slower than the baseline by more than --threshold are reported and make the run exit with 1.
+The persistent result cache is disabled while benchmarks run, so cached
+functions are timed computing their result.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from benchmarks.synthetic import generate_sales, write_sales_db  # noqa: E402
+
+# Machine-specific results stay out of the source tree
+RESULTS_DIR = os.path.join(ROOT, "data", "benchmarks")
+HISTORY_PATH = os.path.join(RESULTS_DIR, "history.jsonl")
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+MODEL_PATH = os.path.join(ROOT, "trained_ai_model.pkl")
+BENCHMARKS = []
+
+
+def benchmark(name, group):
+    def register(func):
+        BENCHMARKS.append((name, group, func))
+        return func
+    return register
+
+
+# ---------------- DB-backed core functions ----------------
+@benchmark("io_pipeline.fetch_data", "core")
+def bench_fetch_data(ctx):
+    from core import io_pipeline
+    return io_pipeline.fetch_data
+
+
+@benchmark("analysis.sales_summary", "core")
+def bench_sales_summary(ctx):
+    from core import analysis
+    return analysis.sales_summary
+
+
+@benchmark("analysis.sales_summary_pandas", "core")
+def bench_sales_summary_pandas(ctx):
+    # The load-and-groupby path, which sales_summary skips while the aggregates exist
+    from core import analysis, io_pipeline
+    return lambda: analysis.summarize_frame(io_pipeline.fetch_data())
+
+
+@benchmark("ai.predict_sales_trend", "core")
+def bench_predict_sales_trend(ctx):
+    from core import ai
+    return ai.predict_sales_trend
+
+
+@benchmark("export.export_report", "core")
+def bench_export_report(ctx):
+    from core import export
+    out = os.path.join(ctx["tmp"], "report.pdf")
+    return lambda: export.export_report(out)
+
+
+# ---------------- page code paths on an uploaded frame ----------------
+@benchmark("visualize.aggregations", "visualize")
+def bench_visualize(ctx):
+    from core import compute_tasks as t
+    df = ctx["frame"]
+    filters = {
+        "Year": sorted(df["Year"].unique()),
+        "Region": df["Region"].unique(),
+        "Product": df["Product"].unique(),
+    }
+
+    def run():
+        t.column_sums(df, ["Revenue", "Pipeline", "RevenueGoal"], filters=filters)
+        t.groupby_sum(df, "Stage", "Revenue", filters=filters)
+        t.groupby_sum(df, "Product", ["Revenue", "Pipeline"], filters=filters)
+        t.groupby_sum(df, ["Region", "Latitude", "Longitude"], "Revenue", filters=filters)
+    return run
+
+
+@benchmark("ai_prediction.fit_linear", "prediction")
+def bench_fit_linear(ctx):
+    from core import compute_tasks as t
+    df = ctx["frame"]
+    return lambda: t.fit_linear(df, ["Pipeline", "RevenueGoal", "Units_Sold"], "Revenue")
+
+
+@benchmark("copilot.top_n", "copilot")
+def bench_copilot_top_n(ctx):
+    from core import compute_tasks as t
+    return lambda: t.top_n(ctx["frame"], "Product", "Revenue", 3)
+
+
+@benchmark("copilot.total", "copilot")
+def bench_copilot_total(ctx):
+    from core import compute_tasks as t
+    df = ctx["frame"]
+    return lambda: [t.groupby_sum(df, c, "Year") for c in ("Region", "Product", "Stage")]
+
+
+@benchmark("copilot.segment", "copilot")
+def bench_copilot_segment(ctx):
+    from core import segmentation
+    df = ctx["frame"]
+    features = segmentation.numeric_features(df, exclude=("Revenue",))
+    return lambda: segmentation.fit(df, features)
+
+
+@benchmark("copilot.cluster", "copilot")
+def bench_copilot_cluster(ctx):
+    from core import compute_tasks as t
+    return lambda: t.cluster_labels(ctx["frame"])
+
+
+@benchmark("copilot.predict", "copilot")
+def bench_copilot_predict(ctx):
+    import numpy as np
+    from core import inference
+    model = inference.load(MODEL_PATH)
+    sample = np.zeros((1, len(model.feature_columns)))
+    return lambda: model.predict(sample)
+
+
+# ---------------- runner ----------------
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _time(func, repeat):
+    func()  # warm-up: imports, page cache, lazy model loads
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "repeat": repeat,
+    }
+
+
+def run_benchmarks(sizes, repeat=3, only=None):
+    import warnings
+    from core import disk_cache, io_pipeline
+
+    warnings.filterwarnings("ignore")
+    results = {}
+    disabled = os.environ.get(disk_cache.DISABLE_ENV)
+    # Time computations, not cache hits, and leave the app's cache file alone
+    os.environ[disk_cache.DISABLE_ENV] = "1"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for rows in sizes:
+                db_path = write_sales_db(os.path.join(tmp, f"sales_{rows}.db"), rows)
+                io_pipeline.DB_PATH = db_path
+                io_pipeline.migrate()
+                ctx = {"tmp": tmp, "rows": rows, "frame": generate_sales(rows)}
+                for name, group, setup in BENCHMARKS:
+                    if only and only not in (group, name):
+                        continue
+                    key = f"{name}@{rows}"
+                    try:
+                        results[key] = _time(setup(ctx), repeat)
+                    except ImportError as e:
+                        results[key] = {"skipped": str(e)}
+                    print(f"{key:45s} " + (
+                        f"{results[key]['median'] * 1000:10.2f} ms" if "median" in results[key]
+                        else f"skipped ({results[key]['skipped']})"
+                    ))
+                os.remove(db_path)
+    finally:
+        if disabled is None:
+            os.environ.pop(disk_cache.DISABLE_ENV, None)
+        else:
+            os.environ[disk_cache.DISABLE_ENV] = disabled
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Benchmarks whose median got slower than baseline * (1 + threshold)."""
+    regressions = []
+    for key, res in results.items():
+        base = baseline.get(key)
+        if not base or "median" not in res or "median" not in base:
+            continue
+        ratio = res["median"] / base["median"] if base["median"] else float("inf")
+        if ratio > 1 + threshold:
+            regressions.append({"benchmark": key, "baseline": base["median"],
+                                "current": res["median"], "ratio": ratio})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regional sales benchmarks")
+    parser.add_argument("--sizes", default="10000,1000000,10000000",
+                        help="comma separated row counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="run a single benchmark or group (core, visualize, prediction, copilot)")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown against the baseline (0.2 = 20%%)")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results = run_benchmarks(sizes, args.repeat, args.only)
+
+    record = {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"❌ Regression: {r['benchmark']} {r['baseline'] * 1000:.2f} ms -> "
+                  f"{r['current'] * 1000:.2f} ms ({r['ratio']:.2f}x)")
+        if regressions:
+            return 1
+        print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Synthetic sales data for benchmarks and load tests."""
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+REGIONS = [
+    ("North", 52.5, 13.4), ("South", 41.9, 12.5), ("East", 52.2, 21.0),
+    ("West", 48.9, 2.35), ("Central", 50.1, 14.4), ("Nordics", 59.3, 18.1),
+    ("Iberia", 40.4, -3.7), ("Balkans", 44.8, 20.5),
+]
+STAGES = ["Lead", "Qualified", "Proposal", "Negotiation", "Won"]
+
+
+def product_names(n, prefix="Product"):
+    """`n` distinct names: A..Z, then A1..Z1, A2..."""
+    return np.array([f"{prefix} {chr(65 + i % 26)}{i // 26 or ''}" for i in range(n)])
+
+
+def generate_sales(rows, regions=4, products=5, stages=5, years=(2021, 2025), seed=42):
+    """Frame shaped like the uploaded sales exports (Region/Product/Stage/Year/...)."""
+    rng = np.random.default_rng(seed)
+    regions = min(regions, len(REGIONS))
+    region_idx = rng.integers(0, regions, rows)
+    names = np.array([r[0] for r in REGIONS[:regions]])
+    lat = np.array([r[1] for r in REGIONS[:regions]])
+    lon = np.array([r[2] for r in REGIONS[:regions]])
+    stage_names = np.array((STAGES * (stages // len(STAGES) + 1))[:stages])
+
+    revenue = np.round(rng.gamma(2.0, 5000.0, rows), 2)
+    pipeline = np.round(revenue * rng.uniform(1.0, 3.0, rows), 2)
+    return pd.DataFrame({
+        "Year": rng.integers(years[0], years[1] + 1, rows),
+        "Region": names[region_idx],
+        "Product": product_names(products)[rng.integers(0, products, rows)],
+        "Stage": stage_names[rng.integers(0, stages, rows)],
+        "Latitude": lat[region_idx],
+        "Longitude": lon[region_idx],
+        "Revenue": revenue,
+        "Pipeline": pipeline,
+        "RevenueGoal": np.round(revenue * rng.uniform(0.8, 1.5, rows), 2),
+        "Units_Sold": rng.integers(1, 200, rows),
+    })
+
+
+def generate_db_rows(rows, regions=4, products=5, years=(2021, 2025), seed=42):
+    """Rows for the `sales` table read by `io_pipeline.fetch_data`."""
+    rng = np.random.default_rng(seed)
+    regions = min(regions, len(REGIONS))
+    start = np.datetime64(f"{years[0]}-01-01")
+    days = (np.datetime64(f"{years[1] + 1}-01-01") - start).astype(int)
+    return pd.DataFrame({
+        "region": np.array([r[0] for r in REGIONS[:regions]])[rng.integers(0, regions, rows)],
+        "product": product_names(products, "Widget")[rng.integers(0, products, rows)],
+        "quantity": rng.integers(1, 100, rows),
+        "price": np.round(rng.uniform(5.0, 250.0, rows), 2),
+        "date": (start + rng.integers(0, days, rows)).astype(str),
+    })
+
+
+def write_sales_db(path, rows, chunk=1_000_000, seed=42, **kwargs):
+    """Create a SQLite file with a synthetic `sales` table of `rows` rows."""
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        generate_db_rows(n, seed=seed + start, **kwargs).to_sql(
+            "sales", conn, index=False, if_exists="append"
+        )
+    conn.commit()
+    conn.close()
+    return path
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The app imports its modules as `core...`/`gui...` from app/, benchmarks from the root
+sys.path.insert(0, os.path.join(ROOT, "app"))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def no_disk_cache(monkeypatch):
+    """Keep tests out of the app's persistent result cache."""
+    monkeypatch.setenv("SALES_DISK_CACHE_DISABLED", "1")
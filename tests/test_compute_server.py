@@ -0,0 +1,58 @@
+from multiprocessing import resource_tracker
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_sales
+from core import compute, compute_server, compute_tasks, normalize
+
+KEY = "test-dataset"
+
+
+@pytest.fixture
+def published():
+    df = normalize.normalize(generate_sales(5_000, seed=4))
+    df.loc[df.index[::7], "Pipeline"] = np.nan
+    name = compute_server._publish(KEY, compute._to_ipc(df))
+    yield df, name
+    compute_server._worker_frames.clear()
+    with compute_server._shared_lock:
+        shm = compute_server._shared.pop(KEY)
+    # _attach unregistered the block in this (server and worker) process
+    resource_tracker.register(shm._name, "shared_memory")
+    shm.close()
+    shm.unlink()
+
+
+def test_worker_frame_equals_the_published_frame(published):
+    df, name = published
+    pd.testing.assert_frame_equal(compute_server._attach(KEY, name), df)
+
+
+def test_numeric_columns_are_views_of_shared_memory(published):
+    _, name = published
+    mapped = compute_server._attach(KEY, name)
+    block = np.frombuffer(compute_server._worker_frames[KEY][0].buf, dtype=np.uint8)
+    # NaN-holding Pipeline too: the client stores NaN as values, not Arrow nulls
+    for col in ["Revenue", "Pipeline", "Units_Sold", "Year"]:
+        assert np.shares_memory(mapped[col].to_numpy(), block), col
+    assert np.shares_memory(mapped["Region"].cat.codes.to_numpy(), block)
+    assert not mapped["Revenue"].to_numpy().flags.writeable
+
+
+def test_tasks_on_the_mapped_frame_match_local(published):
+    df, name = published
+    mapped = compute_server._attach(KEY, name)
+    filters = {"Region": list(df["Region"].cat.categories[:2])}
+    for task, kwargs in [
+        ("groupby_sum", {"by": "Product", "columns": ["Revenue", "Pipeline"], "filters": filters}),
+        ("column_sums", {"columns": ["Revenue", "Pipeline"]}),
+        ("top_n", {"by": "Product", "column": "Revenue", "n": 3}),
+        ("box_stats", {"column": "Revenue", "filters": filters}),
+        ("histogram", {"column": "Units_Sold", "bins": 10}),
+        ("fit_linear", {"features": ["RevenueGoal", "Units_Sold"], "target": "Revenue"}),
+    ]:
+        got = compute_tasks.TASKS[task](mapped, **kwargs)
+        expected = compute_tasks.TASKS[task](df, **kwargs)
+        assert repr(got) == repr(expected), task
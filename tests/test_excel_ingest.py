@@ -0,0 +1,71 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from core import excel_ingest  # noqa: E402
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Sales"
+    ws.append(["Region", "Revenue", "Revenue", "Date", "Shipped", 2024, 2024, "Revenue.1"])
+    for i in range(6):
+        shipped = "pending" if i == 3 else datetime.datetime(2024, 2, i + 1, 8, 30)
+        ws.append(["North" if i % 2 else "South", i * 1.5, i * 10, datetime.datetime(2024, 1, i + 1),
+                   shipped, i, i + 1, 99 - i])
+    for r in range(2, 8):
+        ws.cell(r, 4).number_format = "yyyy-mm-dd"
+        ws.cell(r, 5).number_format = "dd/mm/yyyy hh:mm"
+    other = wb.create_sheet("Empty top")
+    other.append([])
+    other.append(["id", "amount"])
+    other.append([1, 2.5])
+    path = tmp_path / "book.xlsx"
+    wb.save(path)
+    return str(path)
+
+
+def assert_same(ours, theirs):
+    assert list(ours.columns) == list(theirs.columns)
+    for col in ours.columns:
+        assert ours[col].tolist() == theirs[col].tolist(), col
+
+
+def test_read_sheet_matches_pandas(workbook):
+    expected = pd.read_excel(workbook, sheet_name="Sales", engine="openpyxl")
+    ours = excel_ingest.read_sheet(workbook, "Sales")
+    assert_same(ours, expected)
+    assert excel_ingest.sheet_columns(workbook, "Sales") == list(expected.columns)
+    assert list(expected.columns)[1:3] == ["Revenue", "Revenue.2"]
+    assert pd.api.types.is_datetime64_any_dtype(ours["Date"])
+    # One text cell keeps the others as dates instead of Excel serials
+    assert ours["Shipped"][3] == "pending"
+    assert ours["Shipped"][0] == datetime.datetime(2024, 2, 1, 8, 30)
+
+
+def test_projection_uses_renamed_headers(workbook):
+    ours = excel_ingest.read_sheet(workbook, "Sales", {"Revenue.2", "2024.1"})
+    expected = pd.read_excel(workbook, sheet_name="Sales", engine="openpyxl",
+                             usecols=lambda c: c in {"Revenue.2", "2024.1"})
+    assert_same(ours, expected)
+
+
+def test_header_is_the_first_non_empty_row(workbook):
+    ours = excel_ingest.read_sheet(workbook, "Empty top")
+    assert list(ours.columns) == ["id", "amount"]
+    assert ours.to_dict("records") == [{"id": 1, "amount": 2.5}]
+
+
+def test_load_caches_parsed_sheets(workbook, tmp_path, monkeypatch):
+    monkeypatch.setattr(excel_ingest, "CACHE_DIR", str(tmp_path / "cache"))
+    with open(workbook, "rb") as f:
+        path, digest = excel_ingest.stage(f.read())
+    first = excel_ingest.load(path, digest, ["Sales", "Empty top"])
+    again = excel_ingest.load(path, digest, ["Sales", "Empty top"])
+    pd.testing.assert_frame_equal(first, again)
+    assert first["Sheet"].value_counts().to_dict() == {"Sales": 6, "Empty top": 1}
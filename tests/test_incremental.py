@@ -0,0 +1,106 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import incremental
+
+
+def make_db(path, rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "id": np.arange(rows),
+        "date": rng.choice(["2024-01-01", "2024-01-02", "2024-02-01"], rows),
+        "region": rng.choice(["North", "South", "", None], rows),
+        "product": rng.choice(["A", "B", "C"], rows),
+        "quantity": rng.integers(1, 10, rows),
+        "price": rng.uniform(1, 50, rows).round(2),
+    })
+    df["sales"] = df["quantity"] * df["price"]
+    conn = sqlite3.connect(path)
+    df.to_sql("sales", conn, index=False)
+    return conn
+
+
+def table(conn):
+    return pd.read_sql("SELECT * FROM sales", conn)
+
+
+def check_against_recompute(conn):
+    df = table(conn)
+    got = incremental.summary(conn, ["region"], ["quantity", "sales"])
+    expected = df.groupby("region", as_index=False)[["quantity", "sales"]].sum()
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+    got = incremental.summary(conn, ["product", "date"], ["sales"])
+    expected = df.groupby(["product", "date"], as_index=False)[["sales"]].sum()
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+    stats = incremental.column_stats(conn, "price")
+    assert stats["count"] == df["price"].count()
+    assert stats["sum"] == pytest.approx(df["price"].sum())
+    assert stats["mean"] == pytest.approx(df["price"].mean())
+    assert incremental.median(conn, "sales") == pytest.approx(df["sales"].median())
+
+    groups = incremental.groups(conn)
+    assert groups["row_count"].sum() == len(df)
+    assert groups["quantity"].sum() == df["quantity"].sum()
+
+
+def test_reads_scan_without_creating_tables(tmp_path):
+    conn = make_db(tmp_path / "sales.db")
+    check_against_recompute(conn)
+    assert not incremental.installed(conn)
+    assert incremental.refresh(conn) is False
+    names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master")}
+    assert names == {"sales"}
+    assert incremental.data_version(conn).startswith("scan.")
+
+
+def test_aggregates_follow_inserts_updates_and_deletes(tmp_path):
+    conn = make_db(tmp_path / "sales.db")
+    assert incremental.migrate(conn) == 400
+    assert incremental.installed(conn)
+    check_against_recompute(conn)
+    version = incremental.data_version(conn)
+
+    with conn:
+        conn.execute("INSERT INTO sales VALUES (1000, '2024-03-01', 'West', 'D', 3, 2.5, 7.5)")
+        conn.execute("INSERT INTO sales VALUES (1001, '2024-03-01', NULL, 'D', 4, 1.0, 4.0)")
+        conn.execute("UPDATE sales SET region = '', sales = sales * 2 WHERE product = 'A'")
+        conn.execute("UPDATE sales SET price = NULL WHERE id % 7 = 0")
+        conn.execute("DELETE FROM sales WHERE region = 'South' AND quantity > 5")
+    assert incremental.data_version(conn) != version
+    check_against_recompute(conn)
+    assert conn.execute("SELECT COUNT(*) FROM sales_changes").fetchone()[0] == 0
+
+    with conn:
+        conn.execute("DELETE FROM sales")
+    assert incremental.summary(conn, "region", ["sales"]).empty
+    assert incremental.column_stats(conn, "price")["count"] == 0
+    assert np.isnan(incremental.median(conn, "sales"))
+
+
+def test_empty_region_is_a_group_and_null_is_dropped(tmp_path):
+    conn = make_db(tmp_path / "sales.db")
+    incremental.migrate(conn)
+    regions = incremental.summary(conn, "region", ["sales"])["region"].tolist()
+    assert "" in regions and None not in regions
+    assert None in incremental.groups(conn)["region"].tolist()
+
+
+def test_migrate_rebuilds_after_a_column_change(tmp_path):
+    conn = make_db(tmp_path / "sales.db")
+    incremental.migrate(conn)
+    # As ingest does when an upload brings a new column
+    with conn:
+        conn.execute("ALTER TABLE sales ADD COLUMN customer TEXT")
+        conn.execute("ALTER TABLE sales RENAME COLUMN price TO unit_price")
+    assert not incremental.installed(conn)
+    assert incremental.summary(conn, "product", ["quantity"]).shape[0] == 3
+    assert incremental.migrate(conn) == 400
+    assert incremental.measures(conn) == ["quantity", "sales"]
+    got = incremental.summary(conn, "product", ["quantity"])
+    expected = table(conn).groupby("product", as_index=False)[["quantity"]].sum()
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
@@ -0,0 +1,89 @@
+import os
+
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.cluster import KMeans
+from sklearn.linear_model import LinearRegression
+from sklearn.neural_network import MLPRegressor
+from sklearn.preprocessing import StandardScaler
+
+from core import inference
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "Units_Sold": rng.integers(1, 100, 300).astype(float),
+        "Pipeline": rng.uniform(0, 1_000, 300),
+        "Region": rng.choice(["North", "South", "West"], 300),
+    })
+    df["Revenue"] = 3 * df["Units_Sold"] + 0.5 * df["Pipeline"] + df["Region"].eq("West") * 50
+    return df
+
+
+@pytest.fixture
+def bundle(tmp_path, frame):
+    X = pd.get_dummies(frame.drop(columns="Revenue"), drop_first=True).astype(float)
+    scaler = StandardScaler().fit(X)
+    Xs = scaler.transform(X)
+    ann = MLPRegressor(hidden_layer_sizes=(16, 8), max_iter=300, random_state=0).fit(Xs, frame["Revenue"])
+    linreg = LinearRegression().fit(Xs, frame["Revenue"])
+    kmeans = KMeans(n_clusters=4, random_state=42, n_init=10).fit(Xs)
+    path = str(tmp_path / "model.joblib")
+    joblib.dump({"scaler": scaler, "ann": ann, "linreg": linreg, "kmeans": kmeans,
+                 "feature_columns": list(X.columns), "target_col": "Revenue"}, path)
+    return path, X, Xs, ann, linreg, kmeans
+
+
+@pytest.mark.filterwarnings("ignore::sklearn.exceptions.ConvergenceWarning")
+def test_predictions_match_sklearn(bundle, frame):
+    path, X, Xs, ann, linreg, kmeans = bundle
+    inference.export(path)
+    model = inference.load(path)
+
+    np.testing.assert_allclose(model.feature_matrix(frame.drop(columns="Revenue")), X.to_numpy(), rtol=1e-6)
+    np.testing.assert_allclose(model.predict(X.to_numpy()), ann.predict(Xs), rtol=1e-4, atol=1e-2)
+    np.testing.assert_allclose(model.predict_linear(X.to_numpy()), linreg.predict(Xs), rtol=1e-4, atol=1e-2)
+    centroids = np.load(os.path.join(inference.artifact_path(path), "centroids.npy"))
+    assert centroids.dtype == np.float32 and centroids.flags["C_CONTIGUOUS"]
+    np.testing.assert_allclose(centroids, kmeans.cluster_centers_, rtol=1e-6)
+    np.testing.assert_array_equal(model.cluster(X.to_numpy()), kmeans.predict(Xs))
+    # Categorical text columns give the same one-hot features as object ones
+    categorical = frame.drop(columns="Revenue").astype({"Region": "category"})
+    np.testing.assert_array_equal(model.feature_matrix(categorical), model.feature_matrix(frame))
+
+
+@pytest.mark.filterwarnings("ignore::sklearn.exceptions.ConvergenceWarning")
+def test_load_refuses_missing_or_stale_artifacts(bundle, tmp_path):
+    path = bundle[0]
+    with pytest.raises(FileNotFoundError):
+        inference.load(str(tmp_path / "absent.joblib"))
+    with pytest.raises(inference.StaleArtifact):
+        inference.load(path)
+    assert not os.path.exists(inference.artifact_path(path))
+
+    assert inference.export_if_stale(path) is True
+    assert inference.is_current(path)
+    assert inference.export_if_stale(path) is False
+    inference.load(path)
+
+    # Artifacts of an older export format are stale too
+    header_path = os.path.join(inference.artifact_path(path), inference.HEADER_FILE)
+    with open(header_path, encoding="utf-8") as f:
+        header = json.load(f)
+    header.pop("version")
+    with open(header_path, "w", encoding="utf-8") as f:
+        json.dump(header, f)
+    assert not inference.is_current(path)
+    inference.export(path)
+
+    mtime = os.path.getmtime(path) + 10
+    os.utime(path, (mtime, mtime))
+    assert not inference.is_current(path)
+    with pytest.raises(inference.StaleArtifact):
+        inference.load(path)
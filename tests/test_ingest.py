@@ -0,0 +1,87 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from core import incremental, ingest
+
+
+def read(db):
+    with sqlite3.connect(db) as conn:
+        return pd.read_sql("SELECT * FROM sales", conn)
+
+
+def orders(ids, amounts, region="North"):
+    return pd.DataFrame({"order_id": ids, "region": region, "product": "A", "sales": amounts})
+
+
+def test_default_key_columns():
+    assert ingest.default_key_columns(orders([1, 2, 3], [1.0, 2.0, 3.0])) == ["order_id"]
+    # Repeated or missing IDs, and dimension columns, are never used as a key
+    assert ingest.default_key_columns(orders([1, 1, 2], [1.0, 2.0, 3.0])) == []
+    assert ingest.default_key_columns(orders([1, None, 2], [1.0, 2.0, 3.0])) == []
+    assert ingest.default_key_columns(pd.DataFrame({"region": ["N", "S"], "sales": [1, 2]})) == []
+
+
+def test_upsert_counts_inserted_updated_unchanged(tmp_path):
+    db = tmp_path / "sales.db"
+    report = ingest.upsert_frame(orders([1, 2, 3], [10.0, 20.0, 30.0]), db_path=db)
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (3, 0, 0)
+    assert report["key_columns"] == ["order_id"]
+
+    report = ingest.upsert_frame(orders([2, 3, 4], [20.0, 35.0, 40.0]), db_path=db)
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (1, 1, 1)
+    stored = read(db).sort_values("order_id")
+    assert stored["order_id"].tolist() == [1, 2, 3, 4]
+    assert stored["sales"].tolist() == [10.0, 20.0, 35.0, 40.0]
+
+
+def test_rows_without_a_key_are_appended(tmp_path):
+    db = tmp_path / "sales.db"
+    same = pd.DataFrame({"region": ["North", "North"], "product": ["A", "A"], "sales": [5.0, 5.0]})
+    ingest.upsert_frame(same, db_path=db)
+    report = ingest.upsert_frame(same, db_path=db)
+    assert report["key_columns"] == [] and report["inserted"] == 2
+    assert len(read(db)) == 4
+
+
+def test_duplicate_keys_keep_the_last_row_or_refuse(tmp_path):
+    db = tmp_path / "sales.db"
+    batch = orders(list(range(200)) + [5], [1.0] * 200 + [99.0])
+    report = ingest.upsert_frame(batch, key_columns=["order_id"], db_path=db)
+    assert report["duplicates_dropped"] == 1 and report["inserted"] == 200
+    assert read(db).set_index("order_id").loc[5, "sales"] == 99.0
+
+    composite = pd.DataFrame({"region": ["N", "N", "S", "S"], "product": ["A", "A", "A", "B"],
+                              "sales": [1.0, 2.0, 3.0, 4.0]})
+    with pytest.raises(ValueError, match="share a key"):
+        ingest.upsert_frame(composite, key_columns=["region", "product"], db_path=db)
+    with pytest.raises(ValueError, match="not in data"):
+        ingest.upsert_frame(composite, key_columns=["order_id"], db_path=db)
+    assert len(read(db)) == 200
+
+
+def test_null_keys_match_each_other(tmp_path):
+    db = tmp_path / "sales.db"
+    first = pd.DataFrame({"region": ["North", None], "product": ["A", "A"], "sales": [1.0, 2.0]})
+    ingest.upsert_frame(first, key_columns=["region", "product"], db_path=db)
+    second = pd.DataFrame({"region": [None], "product": ["A"], "sales": [7.0]})
+    report = ingest.upsert_frame(second, key_columns=["region", "product"], db_path=db)
+    assert (report["inserted"], report["updated"]) == (0, 1)
+    stored = read(db)
+    assert len(stored) == 2
+    assert stored.loc[stored["region"].isna(), "sales"].tolist() == [7.0]
+
+
+def test_key_index_is_not_unique_and_aggregates_follow(tmp_path):
+    db = tmp_path / "sales.db"
+    ingest.upsert_frame(orders([1, 2], [1.0, 2.0]), db_path=db)
+    # A later upsert on another key may store rows the first key would call duplicates
+    ingest.upsert_frame(orders([1, 1], [3.0, 4.0], region=["South", "West"]), key_columns=["region"], db_path=db)
+    with sqlite3.connect(db) as conn:
+        unique = conn.execute("SELECT COUNT(*) FROM pragma_index_list('sales') WHERE \"unique\"").fetchone()[0]
+        assert unique == 0
+        assert incremental.installed(conn)
+        got = incremental.summary(conn, "region", ["sales"])
+    expected = read(db).groupby("region", as_index=False)[["sales"]].sum()
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
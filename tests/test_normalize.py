@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_sales
+from core import normalize
+
+
+def test_float_measures_stay_float64_and_sum_exactly():
+    df = generate_sales(200_000, seed=1)
+    # Whole-dollar revenues round-trip through float32 but don't sum in it
+    df["Revenue"] = df["Revenue"].round()
+    out = normalize.normalize(df)
+    assert out["Revenue"].dtype == np.float64
+    assert out["Revenue"].sum() == df["Revenue"].sum()
+    pd.testing.assert_series_equal(out.groupby("Region", observed=True)["Revenue"].sum(),
+                                   df.groupby("Region", observed=True)["Revenue"].sum(), check_index_type=False,
+                                   check_categorical=False)
+
+
+def test_integers_and_text_are_compacted():
+    df = pd.DataFrame({"Units": np.arange(1_000, dtype=np.int64), "Region": ["North", "South"] * 500,
+                       "Note": [f"n{i}" for i in range(1_000)]})
+    out = normalize.normalize(df)
+    assert out["Units"].dtype == np.int32
+    assert isinstance(out["Region"].dtype, pd.CategoricalDtype)
+    assert out["Note"].dtype == object
+    report = normalize.memory_report(df, out)
+    assert report.iloc[-1]["bytes after"] < report.iloc[-1]["bytes before"]
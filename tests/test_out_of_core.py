@@ -0,0 +1,76 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_sales
+from core import out_of_core
+
+
+@pytest.fixture
+def frame():
+    return generate_sales(5_000, products=30, seed=7)
+
+
+def chunks_of(df, size=700):
+    return (df.iloc[i:i + size] for i in range(0, len(df), size))
+
+
+def test_groupby_agg_matches_pandas(frame):
+    out = out_of_core.groupby_agg(chunks_of(frame), ["Region", "Product"], ["Revenue", "Units_Sold"],
+                                  aggs=("sum", "count", "mean"))
+    grouped = frame.groupby(["Region", "Product"])[["Revenue", "Units_Sold"]]
+    pd.testing.assert_frame_equal(out["sum"], grouped.sum(), check_dtype=False)
+    pd.testing.assert_frame_equal(out["count"], grouped.count())
+    pd.testing.assert_frame_equal(out["mean"], grouped.mean())
+
+
+def test_groupby_agg_keeps_integer_sums(frame):
+    out = out_of_core.groupby_agg(chunks_of(frame), "Region", "Units_Sold")
+    assert out["Units_Sold"].dtype == frame["Units_Sold"].dtype
+
+
+def test_groupby_agg_applies_filters(frame):
+    filters = {"Stage": ["Won"], "Region": ["North", "South"]}
+    out = out_of_core.groupby_agg(chunks_of(frame), "Product", "Revenue", filters=filters)
+    kept = frame[frame["Stage"].eq("Won") & frame["Region"].isin(["North", "South"])]
+    pd.testing.assert_series_equal(out["Revenue"], kept.groupby("Product")["Revenue"].sum(), check_dtype=False)
+
+
+def test_top_n_and_top_rows(frame):
+    top = out_of_core.top_n(chunks_of(frame), "Product", "Revenue", 5)
+    expected = frame.groupby("Product")["Revenue"].sum().nlargest(5)
+    assert list(top.index) == list(expected.index)
+    np.testing.assert_allclose(top.to_numpy(), expected.to_numpy())
+
+    rows = out_of_core.top_rows(chunks_of(frame), "Revenue", 10)
+    np.testing.assert_allclose(rows["Revenue"].to_numpy(), frame["Revenue"].nlargest(10).to_numpy())
+
+
+def test_totals(frame):
+    out = out_of_core.totals(chunks_of(frame), ["Revenue", "Pipeline", "Missing"])
+    assert set(out) == {"Revenue", "Pipeline"}
+    assert out["Revenue"] == pytest.approx(frame["Revenue"].sum())
+
+
+def test_scan_sqlite_and_parquet_yield_every_row(frame, tmp_path):
+    db = tmp_path / "sales.db"
+    with sqlite3.connect(db) as conn:
+        frame.to_sql("sales", conn, index=False)
+    parquet = tmp_path / "sales.parquet"
+    frame.to_parquet(parquet, row_group_size=1_000)
+
+    for source in (str(db), str(parquet)):
+        chunks = list(out_of_core.scan(source, chunksize=1_200, columns=["Region", "Revenue"]))
+        assert max(len(c) for c in chunks) <= 1_200
+        combined = pd.concat(chunks, ignore_index=True)
+        assert list(combined.columns) == ["Region", "Revenue"]
+        np.testing.assert_allclose(combined["Revenue"].to_numpy(), frame["Revenue"].to_numpy())
+
+
+def test_peek_keeps_the_first_chunk(frame):
+    first, chunks = out_of_core.peek(chunks_of(frame))
+    assert len(first) == 700
+    assert sum(len(c) for c in chunks) == len(frame)
+    assert out_of_core.peek(iter(()))[0] is None
@@ -0,0 +1,107 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_sales
+from core import paging
+
+OFFSETS = [0, 1, 199, 2_499, 2_500, 4_321, 9_990, 9_999, 10_000, 12_000]
+
+
+@pytest.fixture(scope="module")
+def frame():
+    df = generate_sales(10_000, products=8, seed=3)
+    df["Region"] = df["Region"].astype(object)
+    return df
+
+
+@pytest.fixture(scope="module")
+def db(frame, tmp_path_factory):
+    path = tmp_path_factory.mktemp("paging") / "sales.db"
+    with sqlite3.connect(path) as conn:
+        frame.to_sql("sales", conn, index=False)
+        # Deleted rows leave holes in the rowids that anchors must skip
+        conn.execute("DELETE FROM sales WHERE rowid % 13 = 0")
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def stored(db):
+    with sqlite3.connect(db) as conn:
+        return pd.read_sql("SELECT * FROM sales ORDER BY rowid", conn)
+
+
+def check_pages(rows, expected, limit=37):
+    assert rows.count() == len(expected)
+    for offset in OFFSETS:
+        page = rows.page(offset, limit)
+        want = expected.iloc[offset:offset + limit]
+        assert list(page.index) == list(range(offset, offset + len(want)))
+        pd.testing.assert_frame_equal(page.reset_index(drop=True), want.reset_index(drop=True), check_dtype=False)
+
+
+@pytest.mark.parametrize("anchors", [False, True])
+def test_sqlite_natural_order(db, stored, monkeypatch, anchors):
+    monkeypatch.setattr(paging, "ANCHOR_ROWS", 1_000)
+    rows = paging.SqliteRows(db)
+    if anchors:
+        rows.build_anchors()
+        assert len(rows._anchors[0]) == -(-len(stored) // 1_000)
+    check_pages(rows, stored)
+
+
+def test_sqlite_filters_with_anchors(db, stored, monkeypatch):
+    monkeypatch.setattr(paging, "ANCHOR_ROWS", 500)
+    filters = {"Region": ["North", "West"], "Stage": ["Won"], "Product": []}
+    rows = paging.SqliteRows(db, filters=filters)
+    assert "Product" not in rows.filters
+    rows.build_anchors()
+    check_pages(rows, stored[stored["Region"].isin(["North", "West"]) & stored["Stage"].eq("Won")])
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_sqlite_sorted(db, stored, descending):
+    rows = paging.open_rows(db, filters={"Stage": ["Lost"]}, sort="Revenue", descending=descending)
+    rows.build_anchors()
+    assert rows._anchors is None
+    expected = stored[stored["Stage"].eq("Lost")]
+    # Ties keep table order, as the rowid tiebreak does
+    expected = expected.sort_values("Revenue", ascending=not descending, kind="stable")
+    check_pages(rows, expected)
+
+
+def test_sqlite_rows_is_read_only(db):
+    rows = paging.SqliteRows(db)
+    with pytest.raises(sqlite3.OperationalError):
+        rows._conn().execute("DELETE FROM sales")
+    rows.close()
+    with pytest.raises(ValueError):
+        paging.SqliteRows(db, table="missing")
+
+
+@pytest.fixture(scope="module")
+def parquet(frame, tmp_path_factory):
+    path = tmp_path_factory.mktemp("paging") / "sales.parquet"
+    frame.to_parquet(path, index=False, row_group_size=1_500)
+    return str(path)
+
+
+def test_parquet_pages_across_row_groups(parquet, frame, monkeypatch):
+    monkeypatch.setattr(paging, "ROW_GROUP_CACHE", 1)
+    rows = paging.open_rows(parquet)
+    assert len(rows._starts) - 1 == 7
+    check_pages(rows, frame, limit=1_600)
+    assert len(rows._groups) == 1
+
+
+def test_parquet_filters(parquet, frame):
+    # Numeric filter values arrive as text from the UI
+    rows = paging.ParquetRows(parquet, filters={"Region": ["South"], "Year": [str(frame["Year"].iloc[0])]})
+    expected = frame[frame["Region"].eq("South") & frame["Year"].eq(frame["Year"].iloc[0])]
+    check_pages(rows, expected)
+    chunks = pd.concat(rows.chunks(columns=["Revenue"], chunksize=700), ignore_index=True)
+    np.testing.assert_allclose(chunks["Revenue"], expected["Revenue"])
+    with pytest.raises(ValueError):
+        paging.open_rows(parquet, sort="Revenue")
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from core import scenarios
+
+FEATURES = ["Pipeline", "Latitude", "Units_Sold", "Region_South", "Region_West"]
+
+
+def test_parse_ranges_lists_and_single_values():
+    grid = scenarios.parse_grid(
+        "predict revenue for Pipeline from 1000 to 3000 step 500 and latitude 10..40 "
+        "with units_sold in [5, 7.5, 10] and longitude=-3"
+    )
+    np.testing.assert_array_equal(grid["pipeline"], [1000, 1500, 2000, 2500, 3000])
+    np.testing.assert_allclose(grid["latitude"], np.linspace(10, 40, scenarios.DEFAULT_STEPS))
+    np.testing.assert_array_equal(grid["units_sold"], [5, 7.5, 10])
+    np.testing.assert_array_equal(grid["longitude"], [-3])
+    # Range bounds are not re-read as single values
+    assert set(grid) == {"pipeline", "latitude", "units_sold", "longitude"}
+
+
+def test_axes():
+    np.testing.assert_array_equal(scenarios.parse_grid("x 1..5")["x"], [1, 2, 3, 4, 5])
+    np.testing.assert_array_equal(scenarios.parse_grid("x from 10 to 4 step 3")["x"], [10, 7, 4])
+    np.testing.assert_allclose(scenarios.parse_grid("x from 0 to 1 step 0.3")["x"], [0, 0.3, 0.6, 0.9])
+    np.testing.assert_array_equal(scenarios.parse_grid("x 2..2")["x"], [2])
+    with pytest.raises(ValueError):
+        scenarios.parse_grid("x from 1 to 5 step 0")
+
+
+def test_resolve_maps_names_onto_features():
+    grid = {"pipeline": np.array([1.0]), "region": np.array([1.0]), "bogus": np.array([2.0])}
+    resolved, ignored = scenarios.resolve(grid, FEATURES)
+    assert set(resolved) == {"Pipeline", "Region_South"}
+    assert ignored == ["bogus"]
+
+
+def test_expand_is_the_cartesian_product():
+    grid = {"Pipeline": np.array([1.0, 2.0, 3.0]), "Latitude": np.array([10.0, 20.0])}
+    assert scenarios.grid_size(grid) == 6 and scenarios.grid_size({}) == 1
+    X = scenarios.expand(grid, FEATURES, base={"Units_Sold": 4.0})
+    assert X.shape == (6, len(FEATURES)) and X.dtype == np.float32
+    assert {tuple(r) for r in X[:, :2]} == {(p, l) for p in (1, 2, 3) for l in (10, 20)}
+    assert (X[:, 2] == 4).all() and (X[:, 3:] == 0).all()
+    np.testing.assert_array_equal(scenarios.expand({}, FEATURES, {"Pipeline": 7.0})[:, 0], [7.0])
+
+
+def test_expand_refuses_oversized_grids():
+    axis = np.arange(1_001, dtype=float)
+    with pytest.raises(ValueError, match="limit"):
+        scenarios.expand({"Pipeline": axis, "Latitude": axis}, FEATURES)
+
+
+class LinearModel:
+    feature_columns = FEATURES
+    target_col = "Revenue"
+    source_mtime = 0.0
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        return X @ np.arange(1, len(FEATURES) + 1, dtype=np.float32)
+
+
+def test_evaluate_scores_every_point_once_and_caches():
+    model = LinearModel()
+    grid = scenarios.resolve(scenarios.parse_grid("pipeline 1..3 latitude in [0, 1]"), FEATURES)[0]
+    surface = scenarios.evaluate(model, grid, {"Units_Sold": 2.0})
+    assert list(surface.columns) == ["Pipeline", "Latitude", "Revenue"]
+    np.testing.assert_allclose(surface["Revenue"], surface["Pipeline"] + 2 * surface["Latitude"] + 3 * 2.0)
+    assert scenarios.evaluate(model, grid, {"Units_Sold": 2.0}) is surface
+    assert model.calls == 1
+    table = scenarios.pivot(surface, "Revenue")
+    assert table.shape == (2, 3)
+
+
+def test_unmentioned_features_default_to_zero():
+    model = LinearModel()
+    grid = scenarios.resolve(scenarios.parse_grid("predict revenue for pipeline=3 units_sold=2"), FEATURES)[0]
+    surface = scenarios.evaluate(model, grid)
+    # Same as the copilot's pre-sweep prediction: [3, 0, 2, 0, 0] scored once
+    assert len(surface) == 1
+    assert surface["Revenue"].iloc[0] == 3 * 1 + 2 * 3
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import segmentation
+
+
+def blobs(rows_per_blob, centers=((0, 0), (10, 10), (0, 10)), seed=0):
+    rng = np.random.default_rng(seed)
+    points = np.vstack([rng.normal(c, 0.5, (rows_per_blob, 2)) for c in centers])
+    return pd.DataFrame({"Pipeline": points[:, 0], "Units_Sold": points[:, 1],
+                         "Revenue": points.sum(axis=1)})
+
+
+def test_fit_finds_the_blobs():
+    seg = segmentation.fit(blobs(300), ["Pipeline", "Units_Sold"])
+    assert seg.k == 3
+    assert set(seg.scores) == set(segmentation.K_RANGE)
+
+
+def test_small_frames_only_try_k_below_the_row_count():
+    df = blobs(1).iloc[:3]
+    df = pd.concat([df, df + 0.1], ignore_index=True).head(5)
+    seg = segmentation.fit(df, ["Pipeline", "Units_Sold"])
+    assert set(seg.scores) == {2, 3, 4}
+    with pytest.raises(ValueError, match="Not enough"):
+        segmentation.fit(df.head(2), ["Pipeline", "Units_Sold"])
+
+
+def test_segment_labels_rows_and_profiles():
+    df = blobs(200).iloc[::-1].reset_index(drop=True)
+    seg = segmentation.segment(df, features=["Pipeline", "Units_Sold"])
+    assert len(seg.labels) == len(df)
+    profile = seg.profile(df, "Revenue")
+    assert profile["rows"].sum() == len(df)
+    assert profile["total"].is_monotonic_increasing
+    profile["extra"] = 1
+    assert "extra" not in seg.profile(df, "Revenue")
+
+
+def test_segment_rejects_an_empty_feature_list():
+    with pytest.raises(ValueError, match="No numeric features"):
+        segmentation.segment(blobs(10), features=[])
@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+import weakref
+
+import pandas as pd
+import pytest
+
+from core import dataset_store, session_memory
+
+
+@pytest.fixture(autouse=True)
+def spill_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_memory, "SPILL_DIR", str(tmp_path / "spill"))
+    return tmp_path / "spill"
+
+
+class State(dict):
+    """Stands in for a session state (which is weak-referenceable)."""
+
+
+def spilled_state(seed):
+    df = pd.DataFrame({"Region": ["North", "South"] * 50, "Revenue": range(seed, seed + 100)})
+    state = State({session_memory.DATASET_KEY: dataset_store.share(df)})
+    assert session_memory.spill(state) >= 0
+    assert isinstance(state[session_memory.DATASET_KEY], session_memory.SpilledDataset)
+    return state, df
+
+
+def test_spill_and_restore_round_trip():
+    state, df = spilled_state(0)
+    assert os.path.dirname(state[session_memory.DATASET_KEY].path) == session_memory._spill_dir()
+    assert session_memory.restore(state) is True
+    pd.testing.assert_frame_equal(state[session_memory.DATASET_KEY], df)
+
+
+def test_missing_spill_file_drops_the_placeholder():
+    state, _ = spilled_state(1_000)
+    os.remove(state[session_memory.DATASET_KEY].path)
+    assert session_memory.restore(state) is False
+    assert session_memory.DATASET_KEY not in state
+
+
+def test_cleanup_leaves_other_processes_spills(spill_dir, monkeypatch):
+    state, _ = spilled_state(2_000)
+    monkeypatch.setitem(session_memory._sessions, "idle", {
+        "state": weakref.ref(state), "lock": threading.Lock(), "running": False, "last_seen": time.time(),
+    })
+    other = spill_dir / "999999-1"
+    other.mkdir()
+    (other / "theirs.parquet").write_bytes(b"x")
+    orphan = spill_dir / "999998-1"
+    orphan.mkdir()
+    (orphan / "old.parquet").write_bytes(b"x")
+    stale = time.time() - session_memory.ORPHAN_SECONDS - 60
+    os.utime(orphan, (stale, stale))
+    unused = os.path.join(session_memory._spill_dir(), "unused.parquet")
+    open(unused, "wb").close()
+
+    session_memory._remove_unused_spills()
+    assert (other / "theirs.parquet").exists()
+    assert not orphan.exists()
+    assert not os.path.exists(unused)
+    assert os.path.exists(state[session_memory.DATASET_KEY].path)
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import generate_sales
+from core import approx
+from core.sketches import HyperLogLog, QuantileSketch, StratifiedReservoir
+
+QS = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+
+def rank_of(values, x):
+    return np.searchsorted(np.sort(values), x, side="right") / len(values)
+
+
+def test_quantile_sketch_within_rank_error():
+    values = np.random.default_rng(0).lognormal(size=200_000)
+    sketch = QuantileSketch(seed=1)
+    for part in np.array_split(values, 40):
+        sketch.update(part)
+    assert len(sketch) == len(values)
+    assert sum(level.size for level in sketch.levels) < 5_000
+    for q, x in zip(QS, sketch.quantiles(QS)):
+        assert abs(rank_of(values, x) - q) <= 2 * sketch.rank_error()
+
+
+def test_quantile_sketch_merge_matches_single_stream():
+    rng = np.random.default_rng(2)
+    values = np.concatenate([rng.normal(0, 1, 50_000), rng.normal(10, 3, 30_000)])
+    merged = QuantileSketch(seed=3)
+    for part in np.array_split(values, 8):
+        merged.merge(QuantileSketch(seed=4).update(part))
+    assert len(merged) == len(values)
+    for q, x in zip(QS, merged.quantiles(QS)):
+        assert abs(rank_of(values, x) - q) <= 2 * merged.rank_error()
+
+
+def test_quantile_sketch_ignores_nan_and_small_inputs_are_exact():
+    sketch = QuantileSketch().update([3.0, np.nan, 1.0, 2.0])
+    assert len(sketch) == 3
+    assert sketch.quantiles([0.0, 0.5, 1.0]) == [1.0, 2.0, 3.0]
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+@pytest.mark.parametrize("distinct", [50, 5_000, 200_000])
+def test_hyperloglog_count(distinct):
+    values = np.arange(distinct).repeat(3)
+    hll = HyperLogLog().update(values)
+    assert abs(hll.count() - distinct) <= 3 * hll.relative_error() * distinct
+
+
+def test_hyperloglog_merge_and_strings():
+    left = HyperLogLog().update(np.array([f"id-{i}" for i in range(30_000)], dtype=object))
+    right = HyperLogLog().update(np.array([f"id-{i}" for i in range(20_000, 50_000)], dtype=object))
+    merged = HyperLogLog().merge(left).merge(right)
+    assert abs(merged.count() - 50_000) <= 3 * merged.relative_error() * 50_000
+
+
+def test_stratified_reservoir_sizes_and_counts():
+    df = generate_sales(20_000, products=5, seed=5)
+    reservoir = StratifiedReservoir(["Region", "Product"], k=100, seed=6)
+    for start in range(0, len(df), 3_000):
+        reservoir.update(df.iloc[start:start + 3_000])
+    expected = df.groupby(["Region", "Product"]).size()
+    pd.testing.assert_series_equal(reservoir.counts.sort_index(), expected, check_names=False)
+    sizes = reservoir.sample.groupby(["Region", "Product"]).size()
+    assert (sizes == expected.clip(upper=100).reindex(sizes.index)).all()
+    # Sampled rows are real rows of the input
+    assert len(reservoir.sample.drop(columns="_priority").merge(df.drop_duplicates())) == len(reservoir.sample)
+
+
+def test_weighted_quantiles():
+    values = np.array([5.0, 1.0, 3.0, 2.0, 4.0])
+    assert approx.weighted_quantiles(values, np.ones(5), [0.0, 0.5, 1.0]) == [1.0, 3.0, 5.0]
+    # Weight 3 on the value 1 moves the median onto it
+    assert approx.weighted_quantiles(values, np.array([1, 3, 1, 1, 1.0]), [0.5]) == [2.0]
+    assert approx.weighted_quantiles(values, np.array([1, 7, 1, 1, 1.0]), [0.5]) == [1.0]
+
+
+def test_approx_summary_against_exact():
+    df = generate_sales(30_000, products=4, seed=8)
+    summary = approx.ApproxSummary(df.columns)
+    for start in range(0, len(df), 7_000):
+        summary.update(df.iloc[start:start + 7_000])
+
+    filters = {"Region": ["North"], "Stage": ["Won"]}
+    kept = df[df["Region"].eq("North") & df["Stage"].eq("Won")]["Revenue"]
+    estimate, half_width = summary.sums(["Revenue"], filters)["Revenue"]
+    assert abs(estimate - kept.sum()) <= max(3 * half_width, 0.05 * kept.sum())
+
+    quantiles, error = summary.quantiles("Revenue", [0.25, 0.5, 0.75], filters)
+    for q, x in zip([0.25, 0.5, 0.75], quantiles):
+        assert abs(rank_of(kept.to_numpy(), x) - q) <= 3 * error
+
+    quantiles, error = summary.quantiles("Revenue", [0.5], {"Region": ["North"]})
+    north = df.loc[df["Region"].eq("North"), "Revenue"].to_numpy()
+    assert abs(rank_of(north, quantiles[0]) - 0.5) <= 2 * error